@@ -0,0 +1,21 @@
+from ActionType import *
+
+class Action:
+    """
+    A single input decided by the DecisionMaker: the type of the input and
+    the square it is performed on.
+    """
+
+    type = ActionType.REVEAL
+    square = None
+
+    def __init__(self, type, square):
+        self.type = type
+        self.square = square
+
+    @property
+    def center_coordinates(self):
+        return self.square.center_coordinates
+
+    def __repr__(self):
+        return "Action({}, ({},{}))".format(self.type, self.square.row_index, self.square.column_index)
@@ -0,0 +1,12 @@
+class ActionType:
+    """
+    The inputs that can be performed on a square of the game.
+    """
+
+    # Left click, checks an unchecked square.
+    REVEAL = "reveal"
+    # Right click, marks an unchecked square as a mine.
+    FLAG = "flag"
+    # Both buttons on a number, checks all of its neighbours that are not
+    # flagged once the flags around it match its value.
+    CHORD = "chord"
@@ -0,0 +1,291 @@
+from Game import *
+from BoardRenderer import *
+from SyntheticCapture import *
+from SessionReplay import *
+
+import cv2
+import json
+import platform
+import tracemalloc
+import numpy as np
+import time as t
+import logging as l
+
+class Benchmark:
+    """
+    Class for measuring the accuracy and the latency of the recognition on a
+    fixed corpus of labelled frames. Each corpus is a sequence of frames of a
+    single game (synthetic ones rendered by the BoardRenderer or recorded
+    sessions) which is run through the same steps as an update of the Game.
+    The results (latency percentiles of each step, frames per second, peak
+    memory and misclassified squares) are returned as dictionary and can be
+    saved as JSON, such that changes of the recognition can be compared.
+    """
+
+    # Must be increased whenever the format of the results changes.
+    format_version = 1
+
+    # (rows, columns, mines) of the synthetic corpora.
+    board_sizes = {
+        "beginner": (9, 9, 10),
+        "intermediate": (16, 16, 40),
+        "expert": (16, 30, 99),
+        "oversized": (48, 80, 770)
+    }
+    # Measured steps in the order they are executed.
+    stages = ["get_field_information", "is_finished"]
+    _percentiles = [50, 95, 99]
+
+    _frames_per_corpus = 25
+    _seed = 0
+    _scale = 1.0
+    _noise_level = 1.0
+
+    # [{"name", "initial_image", "frames": [(image, labels)], "finished_images"}, ...]
+    _corpora = []
+
+    def __init__(self, frames_per_corpus = 25, seed = 0, scale = 1.0, noise_level = 1.0):
+        self._frames_per_corpus = frames_per_corpus
+        self._seed = seed
+        self._scale = scale
+        self._noise_level = noise_level
+        self._corpora = []
+
+    def add_synthetic_corpora(self):
+        """
+        Function for adding a synthetic corpus for each of the board sizes.
+        """
+
+        for name, (rows, columns, mine_count) in self.board_sizes.items():
+            self.add_synthetic_corpus(name, rows, columns, mine_count)
+
+    def add_synthetic_corpus(self, name, rows, columns, mine_count):
+        """
+        Function for adding a synthetic game: the squares are revealed in a
+        random order until all squares that are not mines are checked, while
+        half of the mines are flagged along the way. The last frame shows the
+        mines (flagged ones keep their flag) together with the end dialog.
+        The same seed always results in the same corpus.
+        """
+
+        renderer = BoardRenderer(self._scale, self._seed)
+        renderer.set_noise(self._noise_level)
+        random = np.random.RandomState(self._seed)
+
+        solution = renderer.random_values(rows, columns, mine_count, revealed_ratio = 1.0, show_mines = True)
+        shading = random.randint(0, len(renderer._unchecked_paths), (rows, columns))
+        safe_indices = np.flatnonzero(solution >= 0)
+        reveal_order = random.permutation(safe_indices)
+        flag_order = random.permutation(np.flatnonzero(solution == BoardRenderer.mine_value))
+        flag_order = flag_order[:len(flag_order) // 2]
+
+        values = np.full((rows, columns), BoardRenderer.unchecked_value, np.int8)
+        corpus = {
+            "name": name,
+            "initial_image": renderer.render(values, shading),
+            "frames": [],
+            "finished_images": []
+        }
+
+        # Each frame reveals an equal share of the remaining squares.
+        for frame_index in range(1, self._frames_per_corpus + 1):
+            revealed = reveal_order[:len(reveal_order) * frame_index // self._frames_per_corpus]
+            values.flat[revealed] = solution.flat[revealed]
+            values.flat[flag_order[:len(flag_order) * frame_index // self._frames_per_corpus]] = BoardRenderer.flag_value
+            corpus["frames"].append((renderer.render(values, shading), values.copy()))
+
+        solution.flat[flag_order] = BoardRenderer.flag_value
+        corpus["finished_images"].append(renderer.render(solution, shading, show_finished = True))
+        self._corpora.append(corpus)
+
+    def add_session_corpus(self, path, name = None):
+        """
+        Function for adding the frames of a recorded session. The recorded
+        fields are used as labels, frames of a finished game are only used for
+        the end detection.
+        """
+
+        replay = SessionReplay(path)
+        corpus = {
+            "name": name if name is not None else path,
+            "initial_image": replay.read_frame(0),
+            "frames": [],
+            "finished_images": []
+        }
+
+        for record_index in range(1, len(replay)):
+            record = replay.get_record(record_index)
+            if record["state"] != GameState.RUNNING:
+                corpus["finished_images"].append(replay.read_frame(record_index))
+            elif record["field"] is not None:
+                corpus["frames"].append((replay.read_frame(record_index), self.decode_field(record["field"])))
+
+        replay.close()
+        self._corpora.append(corpus)
+
+    def run(self):
+        """
+        Function for running all corpora. Debug logging is disabled in the
+        meantime since it would dominate the measured times.
+        """
+
+        results = {
+            "version": self.format_version,
+            "metadata": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "opencv": cv2.__version__,
+                "frames_per_corpus": self._frames_per_corpus,
+                "seed": self._seed,
+                "scale": self._scale,
+                "noise_level": self._noise_level
+            },
+            "corpora": {}
+        }
+
+        l.disable(l.DEBUG)
+        try:
+            for corpus in self._corpora:
+                results["corpora"][corpus["name"]] = self.run_corpus(corpus)
+        finally:
+            l.disable(l.NOTSET)
+
+        for name, result in results["corpora"].items():
+            l.info("{}: {:.1f} fps, {:.3%} misclassified, p95 {}".format(name, result["fps"], result["misclassification_rate"], {stage: round(value["p95"], 3) for stage, value in result["stages"].items()}))
+
+        return results
+
+    def run_corpus(self, corpus):
+        """
+        Function for running the steps of a game update on each frame of a
+        corpus. Latencies are measured in a first pass, the peak memory in a
+        second one since tracing the allocations slows everything down.
+        """
+
+        durations, field_errors = self.measure_corpus(corpus)
+
+        tracemalloc.start()
+        self.measure_corpus(corpus)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        game = self.create_game(corpus)
+        finished_errors = 0
+        for image in corpus["finished_images"]:
+            finished_errors += not game._open_cv.is_finished(Frame(image))
+        for image, _ in corpus["frames"]:
+            finished_errors += game._open_cv.is_finished(Frame(image))
+
+        total_duration = sum(sum(stage_durations) for stage_durations in durations.values())
+        cell_count = sum(labels.size for _, labels in corpus["frames"])
+        misclassified_count = sum(field_errors.values())
+
+        return {
+            "frames": len(corpus["frames"]),
+            "stages": {stage: self.summarize(stage_durations) for stage, stage_durations in durations.items()},
+            "fps": len(corpus["frames"]) / total_duration if total_duration > 0 else 0.0,
+            "peak_memory": peak_memory,
+            "cells": cell_count,
+            "misclassified_cells": misclassified_count,
+            "misclassification_rate": misclassified_count / cell_count if cell_count > 0 else 0.0,
+            # {"expected->recognized": count}
+            "confusion": field_errors,
+            "finished_errors": finished_errors
+        }
+
+    def measure_corpus(self, corpus):
+        """
+        Function for measuring the time each step takes on each frame of the
+        corpus. Returns the durations (in seconds) of each step as well as the
+        misclassified squares.
+        """
+
+        game = self.create_game(corpus)
+        durations = {stage: [] for stage in self.stages}
+        field_errors = {}
+
+        for image, labels in corpus["frames"]:
+            # Each frame is new, such that its conversions are part of the
+            # measured time.
+            frame = Frame(image)
+
+            start = t.perf_counter()
+            field = game._open_cv.get_field_information(frame)
+            recognized = t.perf_counter()
+            game._open_cv.is_finished(frame)
+            checked = t.perf_counter()
+
+            durations["get_field_information"].append(recognized - start)
+            durations["is_finished"].append(checked - recognized)
+
+            for expected, recognized_value in self.compare_board(field, labels):
+                key = "{}->{}".format(expected, recognized_value)
+                field_errors[key] = field_errors.get(key, 0) + 1
+
+        return durations, field_errors
+
+    def create_game(self, corpus):
+        """
+        Function for creating a game whose field dimensions are initialized with
+        the first frame of the corpus.
+        """
+
+        game = Game()
+        game._open_cv.set_show_template_matching_results(False)
+        game.update_field_dimensions(SyntheticCapture([corpus["initial_image"]]))
+        return game
+
+    def compare_board(self, board, labels):
+        """
+        Function for comparing a recognized board with the expected values.
+        Returns the (expected, recognized) values of all differing squares.
+        Missing squares are recognized as None.
+        """
+
+        rows, columns = min(board.rows, labels.shape[0]), min(board.columns, labels.shape[1])
+        is_missing = np.ones(labels.shape, np.bool_)
+        is_missing[:rows, :columns] = False
+        is_different = is_missing.copy()
+        is_different[:rows, :columns] = board.states[:rows, :columns] != labels[:rows, :columns]
+
+        differences = []
+        for row_index, column_index in np.argwhere(is_different):
+            recognized = None if is_missing[row_index, column_index] else int(board.states[row_index, column_index])
+            differences.append((int(labels[row_index, column_index]), recognized))
+        return differences
+
+    def summarize(self, durations):
+        """
+        Function for summarizing the durations of a step. All values are in
+        milliseconds.
+        """
+
+        if len(durations) == 0:
+            return {"mean": 0.0, **{"p{}".format(percentile): 0.0 for percentile in self._percentiles}}
+
+        milliseconds = np.array(durations) * 1000.0
+        summary = {"mean": float(milliseconds.mean())}
+        for percentile, value in zip(self._percentiles, np.percentile(milliseconds, self._percentiles)):
+            summary["p{}".format(percentile)] = float(value)
+        return summary
+
+    @staticmethod
+    def decode_field(lines):
+        """
+        Function for converting a field recorded by the SessionRecorder back
+        into a matrix of values.
+        """
+
+        mapping = {"?": BoardRenderer.unchecked_value, "*": BoardRenderer.mine_value, "F": BoardRenderer.flag_value}
+        return np.array([[mapping[char] if char in mapping else int(char) for char in line] for line in lines], np.int8)
+
+    @staticmethod
+    def save(results, path):
+        """
+        Function for writing the results to a JSON file.
+        """
+
+        with open(path, "w") as file:
+            json.dump(results, file, indent = 2, sort_keys = True)
+
+        l.info("Benchmark results written to {}".format(path))
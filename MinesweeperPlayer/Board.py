@@ -0,0 +1,116 @@
+from BoardGeometry import *
+from Square import *
+
+import numpy as np
+
+class Board:
+    """
+    The game field backed by arrays instead of individual objects. The state
+    of all squares is stored in a single matrix (unchecked, mine, flag or the
+    value 0 - 8 of a checked square) while the center coordinates are stored
+    in a table that does not change during a game and is shared by all boards
+    of it. Squares are only created as views when they are accessed, i.e. by
+    board[row_index][column_index].
+    """
+
+    # Encoding of the states. Checked squares are represented by their value.
+    unchecked_value = -1
+    mine_value = -2
+    flag_value = -3
+
+    # (rows, columns) int8 matrix of the states.
+    states = None
+    # (rows, columns, 2) int32 table of the (x, y) center coordinates.
+    coordinates = None
+    rows = 0
+    columns = 0
+
+    def __init__(self, states, coordinates):
+        self.states = np.asarray(states, np.int8)
+        self.coordinates = coordinates
+        self.rows, self.columns = self.states.shape
+
+    @staticmethod
+    def create_coordinates(lattice):
+        """
+        Function for creating the (read only) coordinate table of all squares
+        of a lattice.
+        """
+
+        coordinates = np.empty((lattice.rows, lattice.columns, 2), np.int32)
+        coordinates[:, :, 0] = lattice.center_xs()[None, :]
+        coordinates[:, :, 1] = lattice.center_ys()[:, None]
+        coordinates.setflags(write = False)
+        return coordinates
+
+    @staticmethod
+    def from_lattice(lattice, states = None):
+        """
+        Function for creating a board along a lattice. All squares are unchecked
+        if no states are provided.
+        """
+
+        if states is None:
+            states = np.full((lattice.rows, lattice.columns), Board.unchecked_value, np.int8)
+        return Board(states, Board.create_coordinates(lattice))
+
+    def with_states(self, states):
+        """
+        Function for creating a board with different states but the same
+        coordinates (which are shared and not copied).
+        """
+
+        return Board(states, self.coordinates)
+
+    def copy(self):
+        """
+        Function for copying the board. Only the states are copied.
+        """
+
+        return self.with_states(self.states.copy())
+
+    @property
+    def geometry(self):
+        """
+        The neighbourhood tables shared by all boards of this size.
+        """
+
+        return BoardGeometry.get(self.rows, self.columns)
+
+    def square(self, row_index, column_index):
+        """
+        Function for retrieving the view of a single square.
+        """
+
+        return Square(self, row_index, column_index)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row_index):
+        if row_index < 0:
+            row_index += self.rows
+        if row_index < 0 or row_index >= self.rows:
+            raise IndexError("Row {} is outside the board.".format(row_index))
+
+        return [Square(self, row_index, column_index) for column_index in range(0, self.columns)]
+
+    def __iter__(self):
+        for row_index in range(0, self.rows):
+            yield self[row_index]
+
+    def count(self, state):
+        """
+        Function for counting the squares with the provided state.
+        """
+
+        return int(np.count_nonzero(self.states == state))
+
+    def to_lines(self):
+        """
+        Function for converting the states into a list of strings. Unchecked
+        squares are represented by "?", mines by "*" and flags by "F".
+        """
+
+        symbols = {self.unchecked_value: "?", self.mine_value: "*", self.flag_value: "F"}
+        return ["".join(symbols.get(state, str(state)) for state in row) for row in self.states.tolist()]
@@ -0,0 +1,120 @@
+import numpy as np
+
+class BoardGeometry:
+    """
+    The neighbourhood of all squares of a field size, built once and shared
+    by everything working with fields of that size. The neighbours of the
+    square with the flat index i (row * columns + column) are stored in a
+    compressed form: indices[offsets[i]:offsets[i + 1]]. Squares outside the
+    field do not exist in these tables, which keeps all checks of the field
+    borders in this class.
+    """
+
+    # {(rows, columns): geometry} of all sizes that were requested.
+    _geometries = {}
+
+    rows = 0
+    columns = 0
+    # int32 arrays of the start of each square's neighbours (size + 1) and
+    # the concatenated neighbour indices.
+    offsets = None
+    indices = None
+    # (rows + 2, columns + 2) int32 table of the flat indices with a border of
+    # -1 around the field.
+    padded_indices = None
+    # (rows, columns) bool masks of the squares on the border (any edge) and
+    # in the corners of the field.
+    border_mask = None
+    corner_mask = None
+    # (rows, columns) number of neighbours of each square (3, 5 or 8).
+    neighbour_counts = None
+    # Tuples of the neighbours of each square (for loops over single squares).
+    _neighbour_lists = None
+    # {offsets: tuples of the window squares of each square}
+    _windows = {}
+
+    # Relative (row, column) positions of the eight neighbours.
+    _directions = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy != 0 or dx != 0]
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+
+        self.padded_indices = np.full((rows + 2, columns + 2), -1, np.int32)
+        self.padded_indices[1:-1, 1:-1] = np.arange(rows * columns, dtype = np.int32).reshape(rows, columns)
+
+        # (rows * columns, 8) neighbour table, -1 for positions outside the field.
+        table = np.stack([self.padded_indices[1 + dy:1 + dy + rows, 1 + dx:1 + dx + columns].ravel() for dy, dx in self._directions], axis = 1)
+        is_inside = table >= 0
+
+        self.offsets = np.zeros(rows * columns + 1, np.int32)
+        np.cumsum(is_inside.sum(axis = 1), out = self.offsets[1:])
+        self.indices = table[is_inside].astype(np.int32)
+        self.neighbour_counts = np.diff(self.offsets).reshape(rows, columns)
+
+        self.border_mask = self.neighbour_counts < len(self._directions)
+        self.corner_mask = self.neighbour_counts <= 3
+
+        self._windows = {}
+        self._neighbour_lists = [tuple(self.indices[start:end].tolist()) for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())]
+
+        for array in (self.offsets, self.indices, self.padded_indices, self.border_mask, self.corner_mask, self.neighbour_counts):
+            array.setflags(write = False)
+
+    @staticmethod
+    def get(rows, columns):
+        """
+        Function for retrieving the (shared) geometry of a field size.
+        """
+
+        key = (rows, columns)
+        if key not in BoardGeometry._geometries:
+            BoardGeometry._geometries[key] = BoardGeometry(rows, columns)
+        return BoardGeometry._geometries[key]
+
+    def neighbours(self, index):
+        """
+        Function for retrieving the indices of the (up to eight) squares
+        around the one with the provided flat index.
+        """
+
+        return self._neighbour_lists[index]
+
+    def get_windows(self, offsets):
+        """
+        Function for retrieving the squares at the relative (row, column)
+        offsets of each square. Returns a tuple of flat indices per square,
+        squares outside the field are -1.
+        """
+
+        offsets = tuple(offsets)
+        if offsets not in self._windows:
+            rows, columns = np.divmod(np.arange(self.rows * self.columns), self.columns)
+            table = np.full((self.rows * self.columns, len(offsets)), -1, np.int32)
+            for position, (dy, dx) in enumerate(offsets):
+                neighbour_rows, neighbour_columns = rows + dy, columns + dx
+                is_inside = (neighbour_rows >= 0) & (neighbour_rows < self.rows) & (neighbour_columns >= 0) & (neighbour_columns < self.columns)
+                table[is_inside, position] = neighbour_rows[is_inside] * self.columns + neighbour_columns[is_inside]
+            self._windows[offsets] = [tuple(window) for window in table.tolist()]
+
+        return self._windows[offsets]
+
+    def windows(self, values, fill_value = 0):
+        """
+        Function for creating the 3x3 windows around all squares of a
+        (rows, columns) array. Returns a (rows, columns, 3, 3) view of a padded
+        copy, positions outside the field contain the fill value.
+        """
+
+        padded = np.pad(np.asarray(values), 1, mode = "constant", constant_values = fill_value)
+        row_stride, column_stride = padded.strides
+        return np.lib.stride_tricks.as_strided(padded, (self.rows, self.columns, 3, 3), (row_stride, column_stride, row_stride, column_stride), writeable = False)
+
+    def count_neighbours(self, mask):
+        """
+        Function for counting the neighbours of each square for which the
+        (rows, columns) mask is set.
+        """
+
+        counts = self.windows(np.asarray(mask, np.int8)).sum(axis = (2, 3), dtype = np.int8)
+        return counts - np.asarray(mask, np.int8)
@@ -0,0 +1,372 @@
+from Lattice import *
+from Board import *
+from TemplateBank import *
+
+import cv2
+import numpy as np
+import logging as l
+
+class BoardRenderer:
+    """
+    Class for rendering screenshots of the game's window from a board state
+    without the game itself. The images are composed of the templates in the
+    resources folder (including the digits of the counters below the field),
+    which is why the recognition can be tested (and timed) on any platform
+    and with any board size. The board state is a matrix of the values used
+    by the recognition: -1 for unchecked squares, -2 for mines, -3 for flags
+    and 0 - 8 for checked ones. The rendered images are RGB arrays and can be
+    passed to a SyntheticCapture.
+    """
+
+    unchecked_value = Board.unchecked_value
+    mine_value = Board.mine_value
+    flag_value = Board.flag_value
+
+    _unchecked_paths = [
+        "resources/squares_unchecked/square_dark.png",
+        "resources/squares_unchecked/square_medium.png",
+        "resources/squares_unchecked/square_light.png"
+    ]
+    _checked_paths = ["resources/squares_checked/square_{}.png".format(value) for value in range(1, 9)]
+    # Revealed mine of the real game (drawn on an unchecked square).
+    _mine_path = "resources/squares_checked/square_mine.png"
+    _finished_path = "resources/utilities/finished.png"
+    _digit_paths = ["resources/digits/digit_{}.png".format(digit) for digit in range(10)]
+
+    # Size (width, height) of a square (and the distance between two neighbouring
+    # ones) at scale 1.0.
+    _square_size = (18, 18)
+    # Colors (RGB) of the parts that are not taken from the templates.
+    _window_color = (185, 209, 234)
+    _field_border_color = (75, 100, 140)
+    _dialog_color = (240, 240, 240)
+    _dialog_border_color = (100, 100, 100)
+    # Flags are drawn on an unchecked square: a red pennant on a dark pole.
+    _flag_color = (220, 30, 25)
+    _flag_pole_color = (40, 40, 40)
+    _counter_border_color = (43, 51, 97)
+    # Distance between the field and the counters at scale 1.0.
+    _counter_gap = 8
+    # Difference of the grid lines between checked squares to their background.
+    _grid_line_darkening = 12
+    # Size (width, height) of the end dialog relative to the finished button.
+    _dialog_size_ratio = (2.6, 5.0)
+
+    scale = 1.0
+    # (width, height) of a square in the rendered images.
+    pitch = (18, 18)
+
+    # Stack of all squares that can be rendered: the unchecked variants, the
+    # checked ones (0 - 8), the mine and the flag.
+    _tiles = None
+    _tile_lines = None
+    # Index of the first checked tile, of the mine tile and of the flag tile
+    # in _tiles.
+    _checked_offset = 0
+    _mine_index = 0
+    _flag_index = 0
+    _finished_image = None
+    # Images of the digits 0 - 9 and the background color of the counters.
+    _digit_images = []
+    _counter_color = None
+    # Image of the window without any squares and the parameters it was drawn for.
+    _background = None
+    _background_key = None
+
+    _random = None
+    # Pool of noise values (positive and negative part), slices of it are added
+    # to the rendered images.
+    _noise_pool = None
+    # Additional size of the pool, which determines the possible positions of
+    # the slices.
+    _noise_pool_margin = 32
+    _noise_level = 0.0
+
+    def __init__(self, scale = 1.0, seed = None):
+        self.scale = scale
+        self._random = np.random.RandomState(seed)
+        self.pitch = (max(1, int(round(self._square_size[0] * scale))), max(1, int(round(self._square_size[1] * scale))))
+        self.build_tiles()
+
+        l.debug("BoardRenderer initialized with scale {} (pitch {}).".format(scale, self.pitch))
+
+    def build_tiles(self):
+        """
+        Function for composing (and scaling) the images of all possible squares
+        once, such that rendering a board only requires copying them.
+        """
+
+        unchecked_tiles = [self.load(path)[:, :, :3] for path in self._unchecked_paths]
+        digits = [self.load(path) for path in self._checked_paths]
+
+        # The digit templates contain a part of the checked square's background.
+        background_color = np.median(np.array([digit[0, 0, :3] for digit in digits]), axis = 0).astype(np.uint8)
+        empty_tile = np.empty((self._square_size[1], self._square_size[0], 3), np.uint8)
+        empty_tile[:] = background_color
+        empty_tile[-1, :] = np.maximum(background_color.astype(np.int16) - self._grid_line_darkening, 0)
+        empty_tile[:, -1] = empty_tile[-1, 0]
+
+        checked_tiles = [empty_tile]
+        for digit in digits:
+            tile = empty_tile.copy()
+            height, width = digit.shape[:2]
+            top, left = (self._square_size[1] - height) // 2, (self._square_size[0] - width) // 2
+            alpha = digit[:, :, 3:4].astype(np.float32) / 255.0
+            region = tile[top:top + height, left:left + width].astype(np.float32)
+            tile[top:top + height, left:left + width] = (region * (1.0 - alpha) + digit[:, :, :3] * alpha).astype(np.uint8)
+            checked_tiles.append(tile)
+
+        mine_tile = cv2.resize(self.load(self._mine_path)[:, :, :3], self._square_size, interpolation = cv2.INTER_AREA)
+
+        flag_tile = self.draw_flag(unchecked_tiles[1].copy())
+
+        tiles = unchecked_tiles + checked_tiles + [mine_tile, flag_tile]
+        if self.pitch != self._square_size:
+            tiles = [cv2.resize(tile, self.pitch, interpolation = self.get_interpolation()) for tile in tiles]
+
+        self._tiles = np.stack(tiles)
+        # [y] -> (tiles, pitch_x, 3) containing the y-th line of pixels of each tile.
+        self._tile_lines = np.ascontiguousarray(self._tiles.transpose(1, 0, 2, 3))
+        self._checked_offset = len(unchecked_tiles)
+        self._mine_index = len(tiles) - 2
+        self._flag_index = len(tiles) - 1
+
+        self._finished_image = self.load_scaled(self._finished_path)
+
+        # The digit templates are cut from the counters and contain their
+        # background.
+        self._digit_images = [self.load_scaled(path) for path in self._digit_paths]
+        borders = np.concatenate([np.concatenate((digit[0], digit[-1], digit[:, 0], digit[:, -1])) for digit in self._digit_images])
+        self._counter_color = tuple(int(value) for value in np.median(borders, axis = 0))
+
+    def load_scaled(self, path):
+        """
+        Function for loading a template as RGB array scaled like the squares.
+        """
+
+        image = self.load(path)[:, :, :3]
+        if self.scale != 1.0:
+            size = (max(1, int(round(image.shape[1] * self.scale))), max(1, int(round(image.shape[0] * self.scale))))
+            image = cv2.resize(image, size, interpolation = self.get_interpolation())
+        return image
+
+    def draw_flag(self, tile):
+        """
+        Function for drawing a flag onto an unchecked square (of the unscaled
+        size).
+        """
+
+        width, height = self._square_size
+        center_x = width // 2
+        cv2.line(tile, (center_x + 1, height // 4), (center_x + 1, height - 5), self._flag_pole_color, 1)
+        cv2.line(tile, (center_x - 2, height - 5), (center_x + 4, height - 5), self._flag_pole_color, 1)
+        pennant = np.array([[center_x + 1, height // 4], [center_x + 1, height // 2 + 1], [center_x - 4, (height // 4 + height // 2 + 1) // 2]], np.int32)
+        cv2.fillConvexPoly(tile, pennant, self._flag_color)
+
+        return tile
+
+    def load(self, path):
+        """
+        Function for loading a template as RGB(A) array.
+        """
+
+        image = cv2.imread(TemplateBank.get_path(path), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise FileNotFoundError("Template {} could not be loaded.".format(path))
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+        conversion = cv2.COLOR_BGRA2RGBA if image.shape[2] == 4 else cv2.COLOR_BGR2RGB
+        return cv2.cvtColor(image, conversion)
+
+    def get_interpolation(self):
+        """
+        Function for retrieving the interpolation used for scaling the templates.
+        """
+
+        return cv2.INTER_AREA if self.scale < 1.0 else cv2.INTER_LINEAR
+
+    def get_window_size(self, rows, columns, offset = (30, 60), margin = (30, 40)):
+        """
+        Function for retrieving the size (width, height) of a rendered image.
+        """
+
+        width = offset[0] + columns * self.pitch[0] + margin[0]
+        height = offset[1] + rows * self.pitch[1] + margin[1]
+        return width, height
+
+    def get_lattice(self, rows, columns, offset = (30, 60)):
+        """
+        Function for retrieving the lattice of the squares in a rendered image
+        (the ground truth for the recognition of the field).
+        """
+
+        origin = (offset[0] + self.pitch[0] // 2, offset[1] + self.pitch[1] // 2)
+        return Lattice(origin, (float(self.pitch[0]), float(self.pitch[1])), rows, columns)
+
+    def random_values(self, rows, columns, mine_count, revealed_ratio = 0.5, show_mines = False, flagged_ratio = 0.0):
+        """
+        Function for generating a valid board state: mines are placed randomly
+        and the checked squares show the number of neighbouring mines. Only the
+        provided ratio of the squares that are not mines is checked and the
+        provided ratio of the mines is flagged.
+        """
+
+        mine_count = min(mine_count, rows * columns)
+        mines = np.zeros(rows * columns, np.bool_)
+        mines[self._random.choice(rows * columns, mine_count, replace = False)] = True
+        mines = mines.reshape(rows, columns)
+
+        values = BoardGeometry.get(rows, columns).count_neighbours(mines)
+        is_revealed = self._random.random_sample((rows, columns)) < revealed_ratio
+        values[~is_revealed | mines] = self.unchecked_value
+        if show_mines:
+            values[mines] = self.mine_value
+        values[mines & (self._random.random_sample((rows, columns)) < flagged_ratio)] = self.flag_value
+
+        return values
+
+    def set_noise(self, noise_level):
+        """
+        Function for setting the standard deviation of the noise added to the
+        rendered images (0 disables the noise).
+        """
+
+        self._noise_level = noise_level
+        self._noise_pool = None
+
+    def get_noise(self, shape):
+        """
+        Function for retrieving noise of the provided shape as positive and
+        negative parts (saturated adding and subtracting them is faster than
+        converting the image). The noise is taken from a random position of a
+        pool that is only generated once for each image size.
+        """
+
+        pool_shape = (shape[0] + self._noise_pool_margin, shape[1] + self._noise_pool_margin, shape[2])
+        if self._noise_pool is None or self._noise_pool[0].shape != pool_shape:
+            noise = np.rint(self._random.standard_normal(pool_shape).astype(np.float32) * self._noise_level)
+            self._noise_pool = (np.clip(noise, 0, 255).astype(np.uint8), np.clip(-noise, 0, 255).astype(np.uint8))
+
+        top, left = self._random.randint(0, self._noise_pool_margin + 1, 2)
+        return [pool[top:top + shape[0], left:left + shape[1]] for pool in self._noise_pool]
+
+    def render(self, values, shading = None, offset = (30, 60), show_finished = False, counters = None):
+        """
+        Function for rendering a screenshot of the window showing the provided
+        board state. The shading selects the variant (0 = dark, 1 = medium,
+        2 = light) of each unchecked square, either as a single value or a
+        matrix. Random variants are used if none is provided. The counters
+        (mine counter, timer) are drawn below the field if provided.
+        """
+
+        values = np.asarray(values, np.int8)
+        rows, columns = values.shape
+        width, height = self.get_window_size(rows, columns, offset)
+
+        if shading is None:
+            shading = self._random.randint(0, self._checked_offset, (rows, columns))
+        shading = np.broadcast_to(np.asarray(shading, np.intp), (rows, columns))
+
+        # Index of the tile of each square.
+        indices = np.where(values >= 0, values.astype(np.intp) + self._checked_offset, shading)
+        indices[values == self.mine_value] = self._mine_index
+        indices[values == self.flag_value] = self._flag_index
+
+        image = self.get_background((width, height), (rows, columns), offset).copy()
+
+        # The field viewed as (rows, pitch_y, columns, pitch_x, 3) is filled one
+        # line of pixels of the squares at a time.
+        field = image[offset[1]:offset[1] + rows * self.pitch[1], offset[0]:offset[0] + columns * self.pitch[0]]
+        field = field.reshape(rows, self.pitch[1], columns, self.pitch[0], 3)
+        for y in range(self.pitch[1]):
+            field[:, y] = self._tile_lines[y][indices]
+
+        if counters is not None:
+            self.render_counters(image, counters, (rows, columns), offset)
+        if show_finished:
+            self.render_finished_dialog(image)
+
+        if self._noise_level > 0:
+            positive_noise, negative_noise = self.get_noise(image.shape)
+            cv2.add(image, positive_noise, dst = image)
+            cv2.subtract(image, negative_noise, dst = image)
+
+        return image
+
+    def get_background(self, size, field_size, offset):
+        """
+        Function for retrieving the image of the window without any squares.
+        It is only drawn once for each size and position of the field.
+        """
+
+        key = (size, field_size, offset)
+        if self._background_key != key:
+            width, height = size
+            rows, columns = field_size
+            background = np.empty((height, width, 3), np.uint8)
+            background[:] = self._window_color
+            right, bottom = offset[0] + columns * self.pitch[0], offset[1] + rows * self.pitch[1]
+            cv2.rectangle(background, (offset[0] - 1, offset[1] - 1), (right, bottom), self._field_border_color, 1)
+
+            self._background = background
+            self._background_key = key
+
+        return self._background
+
+    def render_finished_dialog(self, image):
+        """
+        Function for drawing the end dialog (containing the finished button) at
+        the center of the image.
+        """
+
+        button_height, button_width = self._finished_image.shape[:2]
+        height, width = image.shape[:2]
+        dialog_width = min(width, int(button_width * self._dialog_size_ratio[0]))
+        dialog_height = min(height, int(button_height * self._dialog_size_ratio[1]))
+
+        left, top = (width - dialog_width) // 2, (height - dialog_height) // 2
+        cv2.rectangle(image, (left, top), (left + dialog_width - 1, top + dialog_height - 1), self._dialog_color, -1)
+        cv2.rectangle(image, (left, top), (left + dialog_width - 1, top + dialog_height - 1), self._dialog_border_color, 1)
+
+        # The button is placed at the bottom of the dialog.
+        button_left = max(0, (width - button_width) // 2)
+        button_top = max(0, min(height - button_height, top + dialog_height - button_height * 2))
+        visible_width = min(button_width, width - button_left)
+        image[button_top:button_top + button_height, button_left:button_left + visible_width] = self._finished_image[:, :visible_width]
+
+    def render_counters(self, image, counters, field_size, offset):
+        """
+        Function for drawing the counters (mine counter, timer) below the
+        field: the timer at its left and the mine counter at its right side.
+        """
+
+        mine_counter, timer = counters
+        rows, columns = field_size
+        digit_height, digit_width = self._digit_images[0].shape[:2]
+        width, height = digit_width * 4 + 1, digit_height + 5
+        top = offset[1] + rows * self.pitch[1] + int(round(self._counter_gap * self.scale))
+
+        self.render_counter(image, timer, offset[0], top, (width, height))
+        self.render_counter(image, mine_counter, offset[0] + columns * self.pitch[0] - width, top, (width, height))
+
+    def render_counter(self, image, value, left, top, size):
+        """
+        Function for drawing a single counter (box of the provided size) with
+        its digits centered.
+        """
+
+        width, height = size
+        if top + height > image.shape[0] or left < 0 or left + width > image.shape[1]:
+            l.warning("The counters do not fit into the image.")
+            return
+
+        cv2.rectangle(image, (left, top), (left + width - 1, top + height - 1), self._counter_color, -1)
+        cv2.rectangle(image, (left, top), (left + width - 1, top + height - 1), self._counter_border_color, 1)
+
+        digits = [self._digit_images[int(digit)] for digit in str(value)]
+        digit_height, digit_width = digits[0].shape[:2]
+        digit_left = left + (width - digit_width * len(digits)) // 2
+        digit_top = top + (height - digit_height) // 2
+        for index, digit in enumerate(digits):
+            image[digit_top:digit_top + digit_height, digit_left + index * digit_width:digit_left + (index + 1) * digit_width] = digit
@@ -0,0 +1,83 @@
+import numpy as np
+
+class CaptureBackend:
+    """
+    Base class for all sources of images of the game's window. Each capture is
+    returned as a contiguous RGB array (height, width, 3). Captures are written
+    into a preallocated buffer (one per size, i.e. the whole window and the
+    area used for waiting until the field settled), which is why the returned
+    array is overwritten by the next capture of the same size and must be
+    copied in order to be kept.
+    """
+
+    # (left, top, right, bottom) inside the captured area that each capture is
+    # cropped to. None captures the whole area.
+    _bbox = None
+    # {shape: buffer}, the least recently added one is dropped once there
+    # are more than the maximum (i.e. after the window was resized).
+    _buffers = {}
+    _max_buffer_count = 4
+
+    def __init__(self, bbox = None):
+        self._bbox = bbox
+        self._buffers = {}
+
+    def set_bbox(self, bbox):
+        """
+        Function for setting the area (left, top, right, bottom) that all 
+        following captures are cropped to.
+        """
+
+        self._bbox = bbox
+
+    def grab(self, bbox = None):
+        """
+        Function for capturing an image. The provided bounding box (left, top, 
+        right, bottom) overrides the one of the backend.
+        """
+
+        if bbox is None:
+            bbox = self._bbox
+        return self.grab_into_buffer(bbox)
+
+    def grab_into_buffer(self, bbox):
+        """
+        Function for capturing an image into the preallocated buffer. Must be 
+        implemented by each backend.
+        """
+
+        raise NotImplementedError()
+
+    def get_buffer(self, shape):
+        """
+        Function for retrieving the buffer of the provided shape. Each shape 
+        is only allocated once.
+        """
+
+        shape = tuple(shape)
+        if shape not in self._buffers:
+            if len(self._buffers) >= self._max_buffer_count:
+                del self._buffers[next(iter(self._buffers))]
+            self._buffers[shape] = np.empty(shape, np.uint8)
+        return self._buffers[shape]
+
+    def store(self, image, bbox = None):
+        """
+        Function for cropping an RGB(A) image and copying it into the buffer.
+        """
+
+        image = np.asarray(image)
+        if bbox is not None:
+            left, top, right, bottom = (max(0, int(value)) for value in bbox)
+            image = image[top:bottom, left:right]
+
+        buffer = self.get_buffer((image.shape[0], image.shape[1], 3))
+        np.copyto(buffer, image[:, :, :3])
+        return buffer
+
+    def close(self):
+        """
+        Function for releasing all resources of the backend.
+        """
+
+        self._buffers = {}
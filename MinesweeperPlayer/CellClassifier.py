@@ -0,0 +1,297 @@
+from Board import *
+
+import cv2
+import numpy as np
+import logging as l
+
+class CellClassifier:
+    """
+    Class for recognizing all squares of the game field at once. Instead of
+    sweeping each template over the whole window, the image is cut into one
+    tile per square along the field's lattice and all tiles are compared
+    against the templates in a single batched operation.
+    """
+
+    # Value returned for squares that are still unchecked.
+    unchecked_value = Board.unchecked_value
+    # Value returned for squares showing a mine.
+    mine_value = Board.mine_value
+    # Value returned for flagged squares.
+    flag_value = Board.flag_value
+
+    _lattice = None
+    # Number of pixels a tile may be shifted in each direction in order to
+    # compensate small deviations between the lattice and the image.
+    _search_radius = 1
+    _canny_params = (275, 320)
+
+    # (keys, normalized templates, thresholds, (height, width))
+    _unchecked_bank = None
+    _checked_bank = None
+    # Revealed mines cover the whole square like the unchecked ones.
+    _mine_bank = None
+    # {key: value} for the checked templates.
+    _mapped_values = {}
+    # Flags are red and drawn on the blue background of unchecked squares.
+    # Red numbers (3) lie on checked squares and are not blue at all, which
+    # is why both shares of a tile's pixels are required.
+    _flag_red_share = 0.05
+    _flag_blue_share = 0.4
+
+    # Gather indices of all tiles relative to the cropped area as well as
+    # the area itself.
+    _crop = None
+    _unchecked_indices = None
+    _checked_indices = None
+    _mine_indices = None
+
+    def __init__(self, lattice, unchecked_templates, checked_edges, mine_templates, thresholds, mapped_values, search_radius = 1, canny_params = (275, 320)):
+        self._lattice = lattice
+        self._search_radius = search_radius
+        self._canny_params = canny_params
+        self._mapped_values = mapped_values
+
+        self._unchecked_bank = self.build_bank({key: self.trim(template) for key, template in unchecked_templates.items()}, thresholds)
+        self._checked_bank = self.build_bank(checked_edges, thresholds)
+        self._mine_bank = self.build_bank({key: self.trim(template) for key, template in mine_templates.items()}, thresholds)
+
+        self.init_indices()
+
+    def trim(self, template):
+        """
+        Function for trimming the border of a template that covers a whole 
+        square. Otherwise shifted tiles would reach into the neighbouring 
+        squares and compare their borders as well.
+        """
+
+        trim_y = max(0, int(np.ceil((template.shape[0] - self._lattice.pitch[1]) / 2))) + self._search_radius
+        trim_x = max(0, int(np.ceil((template.shape[1] - self._lattice.pitch[0]) / 2))) + self._search_radius
+
+        return template[trim_y:template.shape[0] - trim_y, trim_x:template.shape[1] - trim_x]
+
+    def build_bank(self, templates, thresholds):
+        """
+        Function for combining multiple templates into a single matrix. Smaller
+        templates are padded such that all of them share the same shape. Each
+        row is normalized (zero mean, unit length) which turns the comparison
+        into a plain matrix product.
+        """
+
+        keys = list(templates.keys())
+        height = max(template.shape[0] for template in templates.values())
+        width = max(template.shape[1] for template in templates.values())
+
+        bank = np.zeros((len(keys), height, width), np.float32)
+        for index, key in enumerate(keys):
+            template = templates[key]
+            top = (height - template.shape[0]) // 2
+            left = (width - template.shape[1]) // 2
+            bank[index, top:top + template.shape[0], left:left + template.shape[1]] = template
+
+        bank = self.normalize(bank.reshape(len(keys), -1))
+        threshold_values = np.array([thresholds[key] for key in keys], np.float32)
+
+        return keys, bank, threshold_values, (height, width)
+
+    def init_indices(self):
+        """
+        Function for precomputing the indices that cut the image into tiles.
+        Each square is represented by one tile per shift inside the search radius.
+        """
+
+        xs = self._lattice.center_xs()
+        ys = self._lattice.center_ys()
+        radius = self._search_radius
+        banks = (self._unchecked_bank, self._checked_bank, self._mine_bank)
+        max_height = max(bank[3][0] for bank in banks)
+        max_width = max(bank[3][1] for bank in banks)
+
+        # The cropped area must contain every tile at every shift.
+        left = max(0, int(xs[0]) - max_width // 2 - radius)
+        top = max(0, int(ys[0]) - max_height // 2 - radius)
+        right = int(xs[-1]) + max_width - max_width // 2 + radius
+        bottom = int(ys[-1]) + max_height - max_height // 2 + radius
+        self._crop = (left, top, right, bottom)
+
+        self._unchecked_indices = self.build_indices(xs - left, ys - top, self._unchecked_bank[3])
+        self._checked_indices = self.build_indices(xs - left, ys - top, self._checked_bank[3])
+        self._mine_indices = self.build_indices(xs - left, ys - top, self._mine_bank[3])
+
+    def build_indices(self, xs, ys, shape):
+        """
+        Function for building the row and column indices of all tiles with the
+        provided shape. Indexing an image with them results in an array of the
+        shape (squares, shifts, height, width).
+        """
+
+        height, width = shape
+        shifts = np.arange(-self._search_radius, self._search_radius + 1)
+
+        # (rows, columns) -> (squares,)
+        center_y, center_x = np.meshgrid(ys, xs, indexing = "ij")
+        tile_top = center_y.ravel() - height // 2
+        tile_left = center_x.ravel() - width // 2
+
+        # (squares, shifts)
+        shift_y, shift_x = np.meshgrid(shifts, shifts, indexing = "ij")
+        top = tile_top[:, None] + shift_y.ravel()[None, :]
+        left = tile_left[:, None] + shift_x.ravel()[None, :]
+
+        row_indices = top[:, :, None, None] + np.arange(height)[None, None, :, None]
+        column_indices = left[:, :, None, None] + np.arange(width)[None, None, None, :]
+
+        return row_indices, column_indices
+
+    def normalize(self, rows):
+        """
+        Function for normalizing each row of a matrix to zero mean and unit length.
+        Rows without any variance stay zero.
+        """
+
+        rows = rows - rows.mean(axis = 1, keepdims = True)
+        norms = np.sqrt((rows * rows).sum(axis = 1, keepdims = True))
+        np.divide(rows, norms, out = rows, where = norms > 0)
+
+        return rows
+
+    def match(self, image, indices, bank, offset = (0, 0)):
+        """
+        Function for comparing all tiles of an image against a template bank.
+        Returns the best score of each square for each template. The offset
+        (x, y) is the position of the image inside the cropped area.
+        """
+
+        row_indices, column_indices = indices
+        keys, templates = bank[:2]
+
+        # (squares, shifts, height, width)
+        row_indices = np.clip(row_indices - offset[1], 0, image.shape[0] - 1)
+        column_indices = np.clip(column_indices - offset[0], 0, image.shape[1] - 1)
+        tiles = image[row_indices, column_indices].astype(np.float32)
+
+        square_count, shift_count = tiles.shape[:2]
+        tiles = self.normalize(tiles.reshape(square_count * shift_count, -1))
+
+        # Normalized cross correlation (TM_CCOEFF_NORMED) of every tile with
+        # every template.
+        scores = tiles @ templates.T
+        scores = scores.reshape(square_count, shift_count, len(keys)).max(axis = 1)
+
+        return scores
+
+    def find_flags(self, rgb_image, indices):
+        """
+        Function for finding the flagged squares of a (cropped) RGB image by
+        the colors of their tiles (without any shift). Returns a boolean array
+        of the squares.
+        """
+
+        row_indices, column_indices = indices
+        center_shift = row_indices.shape[1] // 2
+        tiles = rgb_image[row_indices[:, center_shift], column_indices[:, center_shift]].astype(np.int16)
+        red, green, blue = tiles[..., 0], tiles[..., 1], tiles[..., 2]
+
+        red_share = ((red > 120) & (red > 2 * green) & (red > 2 * blue)).mean(axis = (1, 2))
+        blue_share = (blue > red + 40).mean(axis = (1, 2))
+        return (red_share >= self._flag_red_share) & (blue_share >= self._flag_blue_share)
+
+    def crop(self, gray_image):
+        """
+        Function for cutting the area containing all tiles out of an image.
+        The result is a view and does not copy the image.
+        """
+
+        left, top, right, bottom = self._crop
+        return gray_image[top:bottom, left:right]
+
+    def find_changed_squares(self, previous_cropped, cropped, tolerance = 8):
+        """
+        Function for finding the squares whose tiles differ between two cropped
+        images. Each changed pixel is mapped to every square whose tiles contain
+        it. Returns the flat indices (row * columns + column) of these squares.
+        """
+
+        difference = cv2.absdiff(previous_cropped, cropped)
+        ys, xs = np.nonzero(difference > tolerance)
+
+        if len(xs) == 0:
+            return np.empty(0, np.int64)
+
+        # Tiles reach beyond the border of their square. A changed pixel close 
+        # to the border therefore affects the neighbouring squares as well.
+        left, top = self._crop[:2]
+        margin = self._search_radius + 1
+        squares = []
+        for offset_x in (-margin, margin):
+            for offset_y in (-margin, margin):
+                squares.append(self._lattice.square_indices(xs + left + offset_x, ys + top + offset_y))
+        squares = np.unique(np.concatenate(squares))
+
+        return squares[squares >= 0]
+
+    def classify(self, gray_image, squares = None, rgb_image = None):
+        """
+        Function for classifying the squares of the provided grayscale image.
+        Returns a matrix (rows, columns) containing the values of all squares or,
+        if the flat indices of certain squares are provided, an array containing
+        only their values. Unchecked ones are marked with the unchecked_value,
+        checked ones without any matching number are considered empty (0).
+        Flags can only be recognized if the RGB image is provided as well.
+        """
+
+        cropped = self.crop(gray_image)
+        unchecked_indices = self._unchecked_indices
+        checked_indices = self._checked_indices
+        mine_indices = self._mine_indices
+
+        if squares is None:
+            edges = cv2.Canny(cropped, *self._canny_params)
+            offset = (0, 0)
+        else:
+            unchecked_indices = tuple(indices[squares] for indices in unchecked_indices)
+            checked_indices = tuple(indices[squares] for indices in checked_indices)
+            mine_indices = tuple(indices[squares] for indices in mine_indices)
+
+            # Only the area covered by the requested tiles needs edges. A small 
+            # border keeps the gradients at the edges of the area intact.
+            border = 2
+            top = max(0, min(int(unchecked_indices[0].min()), int(checked_indices[0].min())) - border)
+            left = max(0, min(int(unchecked_indices[1].min()), int(checked_indices[1].min())) - border)
+            bottom = max(int(unchecked_indices[0].max()), int(checked_indices[0].max())) + border + 1
+            right = max(int(unchecked_indices[1].max()), int(checked_indices[1].max())) + border + 1
+            edges = cv2.Canny(cropped[top:bottom, left:right], *self._canny_params)
+            offset = (left, top)
+
+        unchecked_scores = self.match(cropped, unchecked_indices, self._unchecked_bank)
+        checked_scores = self.match(edges, checked_indices, self._checked_bank, offset)
+        mine_scores = self.match(cropped, mine_indices, self._mine_bank)
+
+        # Unchecked squares take precedence since the numbers can only be
+        # found on checked ones.
+        is_unchecked = (unchecked_scores >= self._unchecked_bank[2][None, :]).any(axis = 1)
+
+        # Only numbers passing their own threshold are taken into account.
+        checked_keys, checked_thresholds = self._checked_bank[0], self._checked_bank[2]
+        passing_scores = np.where(checked_scores >= checked_thresholds[None, :], checked_scores, -np.inf)
+        best_number = passing_scores.argmax(axis = 1)
+        has_number = np.isfinite(passing_scores.max(axis = 1))
+
+        number_values = np.array([self._mapped_values[key] for key in checked_keys], np.int8)
+        values = np.where(has_number, number_values[best_number], 0).astype(np.int8)
+        values[is_unchecked] = self.unchecked_value
+
+        # Mines are drawn on the background of unchecked squares and must match
+        # better than any of those.
+        best_mine_scores = mine_scores.max(axis = 1)
+        is_mine = (mine_scores >= self._mine_bank[2][None, :]).any(axis = 1) & (best_mine_scores > unchecked_scores.max(axis = 1))
+        values[is_mine] = self.mine_value
+
+        if rgb_image is not None:
+            is_flag = self.find_flags(self.crop(rgb_image), unchecked_indices) & ~has_number & ~is_mine
+            values[is_flag] = self.flag_value
+
+        l.debug("Classified {} squares: {} unchecked, {} numbers".format(len(values), int(is_unchecked.sum()), int((values > 0).sum())))
+
+        if squares is None:
+            values = values.reshape(self._lattice.rows, self._lattice.columns)
+        return values
@@ -0,0 +1,52 @@
+import logging as l
+
+class ChangeStream:
+    """
+    Class for publishing the changes of the game field to any number of
+    subscribers (i.e. the decision making, the session recorder or metrics).
+    Each subscriber is a function receiving every FieldChange in the order
+    they occurred, such that it only has to process what actually changed.
+    """
+
+    _subscribers = []
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, subscriber):
+        """
+        Function for adding a subscriber that is called with each published
+        change.
+        """
+
+        if subscriber not in self._subscribers:
+            self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        """
+        Function for removing a previously added subscriber.
+        """
+
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def publish(self, change):
+        """
+        Function for passing a change to all subscribers. A failing subscriber
+        does not prevent the others from receiving the change, but its 
+        exception is raised afterwards: a subscriber that missed a change 
+        (i.e. the knowledge of the decision making) is outdated and must not
+        be used any further.
+        """
+
+        error = None
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber(change)
+            except Exception as e:
+                l.error("Exception in subscriber of the field changes: {}".format(e))
+                if error is None:
+                    error = e
+
+        if error is not None:
+            raise error
@@ -0,0 +1,152 @@
+from Action import *
+
+import numpy as np
+import logging as l
+
+class ClickPlanner:
+    """
+    Class for planning the actions of all safe squares of one decision as a
+    single batch. Actions on squares that changed already and duplicates are
+    removed and the remaining ones are ordered such that the mouse travels
+    a short path: a nearest neighbour tour starting at the current cursor
+    position, improved by 2-opt moves (reversing parts of the tour). Flags
+    stay in front of the chord they belong to.
+    """
+
+    # Larger batches are only ordered by the nearest neighbour tour since
+    # each 2-opt pass takes quadratic time.
+    _max_two_opt_size = 400
+    _max_two_opt_passes = 8
+
+    def plan(self, actions, field, start = None):
+        """
+        Function for creating the order of the provided actions. Returns the
+        actions that are still valid in the field, ordered by the tour
+        beginning at the start position (x, y).
+        """
+
+        groups = self.group_actions(self.filter_actions(actions, field))
+        if len(groups) <= 1:
+            return self.remove_duplicates([action for group in groups for action in group])
+
+        # Each group is visited at the position of its last action.
+        points = np.array([group[-1].center_coordinates for group in groups], np.float64)
+        if start is None:
+            start = points[0]
+        points = np.vstack((np.asarray(start, np.float64).reshape(1, 2), points))
+
+        tour = self.find_nearest_neighbour_tour(points)
+        if len(tour) <= self._max_two_opt_size:
+            # Distances between all points, the start is point 0.
+            distances = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis = 2))
+            tour = self.improve_tour(tour, distances)
+
+        l.debug("Planned {} actions, path length {:.0f}.".format(len(actions), self.get_tour_length(tour, points)))
+        return self.remove_duplicates([action for index in tour for action in groups[index - 1]])
+
+    def filter_actions(self, actions, field):
+        """
+        Function for removing actions that are not valid (anymore) in the
+        provided field: reveals and flags need unchecked squares and chords
+        numbers.
+        """
+
+        result = []
+        for action in actions:
+            state = field.states[action.square.row_index, action.square.column_index]
+            is_valid = state > 0 if action.type == ActionType.CHORD else state == field.unchecked_value
+            if is_valid:
+                result.append(Action(action.type, field.square(action.square.row_index, action.square.column_index)))
+        return result
+
+    def remove_duplicates(self, actions):
+        """
+        Function for removing repeated actions (i.e. a flag needed by multiple
+        chords, which would be removed again by a second right click). The
+        first occurrence is kept.
+        """
+
+        result = []
+        seen = set()
+        for action in actions:
+            key = (action.type, action.square.row_index, action.square.column_index)
+            if not(key in seen):
+                seen.add(key)
+                result.append(action)
+        return result
+
+    def group_actions(self, actions):
+        """
+        Function for grouping the flags with the following action (the chord
+        depending on them), which must be performed together.
+        """
+
+        groups = []
+        group = []
+        for action in actions:
+            group.append(action)
+            if action.type != ActionType.FLAG:
+                groups.append(group)
+                group = []
+        if len(group) > 0:
+            groups.append(group)
+        return groups
+
+    def find_nearest_neighbour_tour(self, points):
+        """
+        Function for creating a tour beginning at point 0 that always visits
+        the closest point that was not visited yet. Returns the order of the
+        visited points without the start.
+        """
+
+        is_visited = np.zeros(len(points), np.bool_)
+        is_visited[0] = True
+        current = 0
+        tour = []
+
+        for _ in range(len(points) - 1):
+            distances = np.hypot(points[:, 0] - points[current, 0], points[:, 1] - points[current, 1])
+            candidates = np.where(is_visited, np.inf, distances)
+            current = int(np.argmin(candidates))
+            is_visited[current] = True
+            tour.append(current)
+
+        return tour
+
+    def improve_tour(self, tour, distances):
+        """
+        Function for shortening an (open) tour beginning at point 0 by
+        reversing parts of it as long as this reduces its length.
+        """
+
+        path = np.array([0] + tour)
+        count = len(path)
+
+        for _ in range(self._max_two_opt_passes):
+            is_improved = False
+            for i in range(1, count - 1):
+                # Reversing path[i:j + 1] replaces the edges (i - 1, i) and
+                # (j, j + 1) by (i - 1, j) and (i, j + 1). The last point has
+                # no following edge.
+                js = np.arange(i + 1, count)
+                before = distances[path[i - 1], path[i]] + np.append(distances[path[js[:-1]], path[js[:-1] + 1]], 0.0)
+                after = distances[path[i - 1], path[js]] + np.append(distances[path[i], path[js[:-1] + 1]], 0.0)
+                gains = before - after
+
+                best = int(np.argmax(gains))
+                if gains[best] > 1e-9:
+                    j = js[best]
+                    path[i:j + 1] = path[i:j + 1][::-1].copy()
+                    is_improved = True
+            if not is_improved:
+                break
+
+        return path[1:].tolist()
+
+    def get_tour_length(self, tour, points):
+        """
+        Function for calculating the length of a tour beginning at point 0.
+        """
+
+        path = points[[0] + list(tour)]
+        return float(np.hypot(*np.diff(path, axis = 0).T).sum())
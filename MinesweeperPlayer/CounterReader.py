@@ -0,0 +1,91 @@
+from Frame import *
+
+import logging as l
+
+class CounterReader:
+    """
+    Class for reading the counters shown below the game field: the time on
+    the left and the number of mines that are not flagged yet on the right.
+    The regions of both counters are derived from the lattice of the field
+    and their digits are template matched by OpenCV. Without the digit
+    templates the counters are not read at all.
+    """
+
+    _open_cv = None
+
+    # Height of the counters' regions below the field and the distance they
+    # reach beyond the left and right side of it, in squares (pitch).
+    _region_height = 3.0
+    _region_margin = 2.0
+    # (left, top, right, bottom) of both counters inside the window image.
+    _timer_region = None
+    _mine_counter_region = None
+    # Maximum value of a counter (three digits).
+    _max_value = 999
+
+    _is_available = None
+
+    def __init__(self, open_cv):
+        self._open_cv = open_cv
+        self._timer_region = None
+        self._mine_counter_region = None
+        self._is_available = None
+
+    def is_available(self):
+        """
+        Function for checking whether the counters can be read.
+        """
+
+        if self._is_available is None:
+            self._is_available = self._open_cv.has_digit_templates()
+            if not self._is_available:
+                l.info("Digit templates are missing, the counters are not read.")
+        return self._is_available
+
+    def init_regions(self, lattice, frame):
+        """
+        Function for initializing the regions of both counters below the
+        field described by the lattice.
+        """
+
+        height, width = Frame.of(frame).gray().shape
+        (left, _), (right, bottom) = lattice.bounds()
+        center = (left + right) // 2
+        margin = int(round(lattice.pitch[0] * self._region_margin))
+        region_bottom = min(height, bottom + int(round(lattice.pitch[1] * self._region_height)))
+
+        self._timer_region = (max(0, left - margin), bottom, center, region_bottom)
+        self._mine_counter_region = (center, bottom, min(width, right + margin), region_bottom)
+
+        l.debug("Counter regions: {}, {}".format(self._timer_region, self._mine_counter_region))
+
+    def read(self, frame):
+        """
+        Function for reading both counters. Returns (mine counter, timer),
+        each one is None if it could not be read.
+        """
+
+        if self._timer_region is None or not self.is_available():
+            return None, None
+
+        frame = Frame.of(frame)
+        return self.read_number(frame, self._mine_counter_region), self.read_number(frame, self._timer_region)
+
+    def read_number(self, frame, region):
+        """
+        Function for reading the number shown in a region of the frame.
+        """
+
+        left, top, right, bottom = region
+        if right <= left or bottom <= top:
+            return None
+
+        digits = self._open_cv.match_digits(frame.gray(region))
+        if len(digits) == 0:
+            return None
+
+        value = int("".join(map(str, digits)))
+        if value > self._max_value:
+            l.debug("Ignoring counter value {}.".format(value))
+            return None
+        return value
@@ -0,0 +1,172 @@
+from Frame import *
+from queue import Queue, Empty, Full
+from pathlib import Path
+
+import cv2
+import threading
+import logging as l
+
+class DebugRenderer:
+    """
+    Class for displaying the recognition results without slowing down the
+    recognition itself. Results are handed over to a background thread, which
+    draws them and passes them on to a sink (window, disk or nothing). Only
+    the newest result is kept, older ones that were not rendered yet are
+    dropped. Images written to disk are stored in a folder next to the
+    modules unless an absolute path is given.
+    """
+
+    # Available sinks for the rendered images.
+    SINK_WINDOW = "window"
+    SINK_DISK = "disk"
+    SINK_NULL = "null"
+
+    _unchecked_window_name = "Unchecked Window Result"
+    _checked_window_name = "Checked Window Result"
+
+    is_enabled = True
+    _sink = SINK_WINDOW
+    _base_path = Path(__file__).resolve().parent
+    _output_dir = "debug_output"
+
+    # Holds at most one (frame, board) tuple.
+    _queue = None
+    _thread = None
+    _rendered_count = 0
+    _dropped_count = 0
+
+    def __init__(self, sink = SINK_WINDOW, output_dir = "debug_output", is_enabled = True):
+        self._sink = sink
+        self._output_dir = output_dir
+        self.is_enabled = is_enabled
+        self._queue = Queue(maxsize = 1)
+
+    def set_enabled(self, is_enabled):
+        """
+        Function for enabling or disabling the rendering at runtime.
+        """
+
+        self.is_enabled = is_enabled
+
+    def set_sink(self, sink, output_dir = None):
+        """
+        Function for changing the sink the rendered images are passed to.
+        """
+
+        self._sink = sink
+        if output_dir is not None:
+            self._output_dir = output_dir
+
+    def submit(self, frame, board):
+        """
+        Function for handing a recognition result over to the background thread.
+        Never blocks: a result that was not rendered yet is replaced.
+        """
+
+        if not self.is_enabled:
+            return
+
+        if self._thread is None:
+            self.start()
+
+        # Captures may be overwritten by the next one, the pixels are copied.
+        # The conversion for drawing happens in the background thread.
+        frame = Frame.of(frame).copy()
+
+        # Keep only the newest result.
+        try:
+            self._queue.get_nowait()
+            self._dropped_count += 1
+        except Empty:
+            pass
+        try:
+            self._queue.put_nowait((frame, board))
+        except Full:
+            self._dropped_count += 1
+
+    def start(self):
+        """
+        Function for starting the background thread.
+        """
+
+        self._thread = threading.Thread(target = self.run, name = "DebugRenderer", daemon = True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Function for stopping the background thread once the current result
+        is rendered.
+        """
+
+        if self._thread is None:
+            return
+
+        try:
+            self._queue.get_nowait()
+        except Empty:
+            pass
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+        l.debug("DebugRenderer stopped: {} rendered, {} dropped.".format(self._rendered_count, self._dropped_count))
+
+    def run(self):
+        """
+        Function containing the loop of the background thread.
+        """
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            try:
+                self.render(*item)
+                self._rendered_count += 1
+            except Exception as e:
+                l.error("Exception while rendering: {}".format(e))
+
+        if self._sink == self.SINK_WINDOW:
+            cv2.destroyAllWindows()
+
+    def render(self, frame, board):
+        """
+        Function for drawing the recognized squares onto copies of the frame
+        and passing them to the sink.
+        """
+
+        unchecked_image = frame.bgr().copy()
+        checked_image = frame.bgr().copy()
+
+        self.display_centers(unchecked_image, board.coordinates[board.states == board.unchecked_value].tolist())
+        self.display_centers(checked_image, board.coordinates[board.states > 0].tolist())
+
+        if self._sink == self.SINK_WINDOW:
+            cv2.imshow(self._unchecked_window_name, unchecked_image)
+            cv2.imshow(self._checked_window_name, checked_image)
+            cv2.moveWindow(self._unchecked_window_name, 10, 10)
+            cv2.moveWindow(self._checked_window_name, 650, 10)
+            cv2.waitKey(1)
+        elif self._sink == self.SINK_DISK:
+            output_dir = self._base_path / self._output_dir
+            output_dir.mkdir(parents = True, exist_ok = True)
+            cv2.imwrite(str(output_dir / "{:06d}_unchecked.png".format(self._rendered_count)), unchecked_image)
+            cv2.imwrite(str(output_dir / "{:06d}_checked.png".format(self._rendered_count)), checked_image)
+
+    def display_squares(self, open_cv_image, adjusted_squares, color = (0, 0, 255)):
+        """
+        Function for displaying squares in a single window.
+        """
+
+        for rect in adjusted_squares:
+            cv2.rectangle(open_cv_image, rect[0], rect[1], color, 1)
+
+    def display_centers(self, open_cv_image, centers, color = (255, 0, 0), radius = 2):
+        """
+        Function for displaying centers in a single window.
+        """
+
+        for center in centers:
+            circle_center = (center[0] - radius // 2, center[1] - radius // 2)
+            cv2.circle(open_cv_image, circle_center, radius, color, -1)
@@ -1,24 +1,54 @@
-from Square import *
-from SquareWrapper import *
+from Board import *
+from FieldChange import *
+from KnowledgeBase import *
+from ProbabilityEngine import *
+from EndgameSolver import *
+from Action import *
 from queue import Queue
 
 import random
+import numpy as np
 import logging as l
 
 class DecisionMaker:
     """
-    Class containing the logic for making click-decisions based on 
-    the current state of the game.
+    Class containing the logic for making click-decisions based on
+    the current state of the game. The knowledge about the field is
+    kept between updates and only updated with the squares that changed.
     """
 
     _is_beginning_of_game = True
     _is_field_updated = False
+    # Flat indices of the squares that are safe to click.
     _safe_squares = Queue()
-    _best_valued_square_wrapper = None
-    # HashSet of returned decisions such that squares are not chosen twice.
+    _best_valued_square_index = None
+    # Flat indices of returned decisions such that squares are not chosen twice.
     _returned_decisions = set()
 
-    def __init__(self):
+    _knowledge_base = None
+    # The last board the knowledge base was updated with.
+    _board = None
+
+    _probability_engine = None
+    # Total number of mines of the game, the default of the field size is
+    # used if it is not known.
+    _mine_count = None
+    # Searches the guesses of positions with only a few unknown squares, which
+    # relies on the total number of mines (set or the one of a default mode).
+    _endgame_solver = None
+    # Probabilities below this are rounding errors of certainly safe squares.
+    _safe_probability = 1e-9
+    # Whether safe squares may be checked by flagging mines and chording the
+    # numbers around them.
+    _use_chords = True
+    # Flat indices of the squares that were flagged.
+    _flagged_squares = set()
+
+    def __init__(self, worker_count = 1, deadline = 2.0):
+        # The engine (and its worker processes) is kept for all games.
+        self._probability_engine = ProbabilityEngine(worker_count, deadline)
+        self._endgame_solver = EndgameSolver()
+        KnowledgeBase.load_pattern_table()
         self.reset()
 
     def decide_next_square(self, field):
@@ -43,7 +73,8 @@ class DecisionMaker:
             next_square = self.decide_next_square(field)
 
         # Improve the results by keeping track of already chosen squares.
-        self._returned_decisions.add(next_square)
+        if next_square is not None:
+            self._returned_decisions.add(next_square.row_index * field.columns + next_square.column_index)
 
         return next_square
 
@@ -55,8 +86,35 @@ class DecisionMaker:
         self._is_beginning_of_game = True
         self._safe_squares = Queue()
         self._is_field_updated = False
-        self._best_valued_square = None
+        self._best_valued_square_index = None
         self._returned_decisions = set()
+        self._knowledge_base = KnowledgeBase()
+        self._board = None
+        self._flagged_squares = set()
+
+    def set_mine_count(self, mine_count):
+        """
+        Function for setting the total number of mines of the game.
+        """
+
+        self._mine_count = mine_count
+
+    def set_worker_count(self, worker_count, deadline = 2.0):
+        """
+        Function for setting the number of processes used for calculating
+        the probabilities of large components as well as the time (in
+        seconds) they are given.
+        """
+
+        self._probability_engine.set_worker_count(worker_count)
+        self._probability_engine.set_deadline(deadline)
+
+    def close(self):
+        """
+        Function for stopping the worker processes.
+        """
+
+        self._probability_engine.close()
 
     def do_safe_squares_exist(self):
         """
@@ -65,122 +123,178 @@ class DecisionMaker:
 
         return not self._safe_squares.empty()
 
+    def apply_change(self, change):
+        """
+        Function for updating the knowledge with a change of the field. Can
+        be subscribed to the game's change stream.
+        """
+
+        self._board = change.board
+
+        # Sorted such that the same field always results in the same order.
+        for index in sorted(self._knowledge_base.apply_change(change)):
+            if not(index in self._returned_decisions):
+                self._safe_squares.put(index)
+
     def update_field(self, field):
         """
-        Function for updating all information regarding the game's field like 
+        Function for updating all information regarding the game's field like
         safe spots or values.
         """
 
-        # Each square is being wrapped in order to allow callbacks when 
-        # changing the total influence amount.
-        wrapped_squares = {}
-        for row_index in range(0, len(field)):
-            for column_index in range(0, len(field[row_index])):
-                square = field[row_index][column_index]
-                affected_squares = []
-
-                # All affected indices must be calculated.
-                left_x = column_index - 1
-                center_x = column_index
-                right_x = column_index + 1
-                top_y = row_index - 1
-                center_y = row_index
-                bottom_y = row_index + 1
-
-                # Checks are needed since Python does not throw exceptions when 
-                # accessing indices like -1 etc. but instead reads elements from 
-                # the end of the list.
-                # Left side of the target.
-                if left_x >= 0:
-                    if top_y >= 0:
-                        affected_squares.append((top_y, left_x))
-                    if center_y >= 0:
-                        affected_squares.append((center_y, left_x))
-                    if bottom_y < len(field):
-                        affected_squares.append((bottom_y, left_x))
-                # Top and bottom of the target.
-                if center_x >= 0:
-                    if top_y >= 0:
-                        affected_squares.append((top_y, center_x))
-                    if bottom_y < len(field):
-                        affected_squares.append((bottom_y, center_x))
-                # Right side of the target.
-                if right_x < len(field[0]):
-                    if top_y >= 0:
-                        affected_squares.append((top_y, right_x))
-                    if center_y >= 0:
-                        affected_squares.append((center_y, right_x))
-                    if bottom_y < len(field):
-                        affected_squares.append((bottom_y, right_x))
-
-                # First only create the instances.
-                coordinates = row_index, column_index
-                wrapper = SquareWrapper(square, affected_squares, coordinates)
-                wrapped_squares[coordinates] = wrapper
-
-        # Map each created instance to its neighbours such that all
-        # neighbours can be directly accessed.
-        for wrapper in wrapped_squares.values():
-            wrapper.map_wrappers(wrapped_squares)
-
-        # Update the values based on known bomb locations.
-        for wrapper in wrapped_squares.values():
-            wrapper.update_effective_value()
-
-        # Collect all safe squares.
-        safe_squares = set()
-        for wrapper in wrapped_squares.values():
-            for safe_square in wrapper.adjacent_safe_squares:
-                safe_squares.add(safe_square)
-
-        # Update all scores.
-        max_row_index = max(map(lambda tuple: tuple[1], wrapped_squares.keys()))
-        max_column_index = max(map(lambda tuple: tuple[0], wrapped_squares.keys()))
-        for indices, wrapper in wrapped_squares.items():
-            wrapper.update_score(indices, (max_row_index, max_column_index))
-
-        # Move all wrappers to the collection of clickable ones.
-        for wrapper in safe_squares:
-            if not(wrapper.square in self._returned_decisions):
-                self._safe_squares.put(wrapper)
-
-        # Find the best valued square for clicking.
-        best_valued_wrapper = None
-        for wrapper in wrapped_squares.values():
-            # Only unchecked ones that are no bombs.
-            if wrapper.square.is_unchecked and not wrapper.has_reduced_neighbours:
-                if best_valued_wrapper is None or wrapper.score < best_valued_wrapper.score:
-                    best_valued_wrapper = wrapper
-        self._best_valued_square_wrapper = best_valued_wrapper
+        # Boards that were not received via the change stream are compared
+        # with the last known one.
+        if field is not self._board:
+            self.apply_change(FieldChange.between(0, self._board, field))
+
+        # Safe squares that were returned before are not queued again,
+        # therefore the remaining ones must be searched.
+        if not self.do_safe_squares_exist():
+            for index in sorted(self._knowledge_base.safe_squares - self._returned_decisions):
+                self._safe_squares.put(index)
+
+        # Guessing is only necessary without any safe square.
+        self._best_valued_square_index = None
+        if not self.do_safe_squares_exist():
+            self._best_valued_square_index = self.find_best_valued_square(field)
+
+    def find_best_valued_square(self, field):
+        """
+        Function for finding the unknown square with the lowest probability
+        of containing a mine. Squares that can not contain a mine at all are
+        queued as safe squares instead.
+        """
+
+        mine_count = self._mine_count
+        is_mine_count_known = mine_count is not None or (field.rows, field.columns) in ProbabilityEngine.default_mine_counts
+        if mine_count is None:
+            mine_count = ProbabilityEngine.get_default_mine_count(field.rows, field.columns)
+
+        probabilities = self._probability_engine.calculate(self._knowledge_base, mine_count)
+        candidates = [index for index in probabilities if not(index in self._returned_decisions)]
+        if len(candidates) == 0:
+            return None
+
+        for index in sorted(candidates):
+            if probabilities[index] <= self._safe_probability:
+                self._safe_squares.put(index)
+        if self.do_safe_squares_exist():
+            return None
+
+        # With only a few unknown squares left, the square with the best chance
+        # of winning is searched instead.
+        if is_mine_count_known:
+            result = self._endgame_solver.find_best_square(self._knowledge_base, mine_count, self._returned_decisions)
+            if result is not None:
+                l.debug("Best chance of winning: {:.3f} (mine probability {:.3f})".format(result[1], probabilities[result[0]]))
+                return result[0]
+
+        best_index = min(candidates, key = lambda index: (probabilities[index], index))
+        l.debug("Lowest mine probability: {:.3f}".format(probabilities[best_index]))
+        return best_index
+
+    def take_safe_squares(self):
+        """
+        Function for taking all queued safe squares at once (i.e. in order to
+        click them as a single batch).
+        """
+
+        squares = []
+        while self.do_safe_squares_exist():
+            squares.append(self.pick_safe_square())
+            self._returned_decisions.add(squares[-1].row_index * self._board.columns + squares[-1].column_index)
+        self._is_field_updated = False
+
+        return squares
+
+    def take_safe_actions(self, field):
+        """
+        Function for converting all queued safe squares into actions. A
+        number whose mines are all known checks its remaining neighbours at
+        once (chord) after its mines are flagged. Chords are chosen greedily
+        as long as they need fewer actions than revealing the squares they
+        check one by one. All other squares are revealed.
+        """
+
+        squares = self.take_safe_squares()
+        if not self._use_chords:
+            return [Action(ActionType.REVEAL, square) for square in squares]
+
+        knowledge_base = self._knowledge_base
+        geometry = field.geometry
+        states = field.states.ravel()
+        safe_squares = set(square.row_index * field.columns + square.column_index for square in squares)
+        pending = set(safe_squares)
+        numbers = set(neighbour for index in pending for neighbour in geometry.neighbours(index) if states[neighbour] > 0)
+        # Flags shown on the field are not placed again.
+        self._flagged_squares.update(np.flatnonzero(states == field.flag_value).tolist())
+
+        # Each chord contains the flags of all mines that were not flagged
+        # before, such that it stays valid in any order (repeated flags are
+        # removed by the ClickPlanner).
+        flagged_squares = set(self._flagged_squares)
+        actions = []
+        while len(pending) > 0:
+            best_number, best_gain, best_mines, best_checked = None, 0, None, None
+            for number in sorted(numbers):
+                mines = [neighbour for neighbour in geometry.neighbours(number) if neighbour in knowledge_base.mines]
+                unchecked = [neighbour for neighbour in geometry.neighbours(number) if states[neighbour] == field.unchecked_value and not(neighbour in knowledge_base.mines)]
+                # The chord only checks safe squares if all mines are known
+                # and all other neighbours are safe.
+                if len(mines) != states[number] or any(not(neighbour in knowledge_base.safe_squares or neighbour in safe_squares) for neighbour in unchecked):
+                    continue
+
+                checked = [neighbour for neighbour in unchecked if neighbour in pending]
+                # Flags placed for another chord of this batch are not counted.
+                gain = len(checked) - len([mine for mine in mines if not(mine in self._flagged_squares)]) - 1
+                if gain > best_gain:
+                    best_number, best_gain, best_mines, best_checked = number, gain, [mine for mine in mines if not(mine in flagged_squares)], checked
+
+            if best_number is None:
+                break
+
+            for mine in best_mines:
+                actions.append(Action(ActionType.FLAG, field.square(*divmod(mine, field.columns))))
+                self._flagged_squares.add(mine)
+            actions.append(Action(ActionType.CHORD, field.square(*divmod(best_number, field.columns))))
+            pending.difference_update(best_checked)
+            numbers.discard(best_number)
+
+        for index in sorted(pending):
+            actions.append(Action(ActionType.REVEAL, field.square(*divmod(index, field.columns))))
+
+        l.debug("Converted {} safe squares into {} actions.".format(len(squares), len(actions)))
+        return actions
 
     def pick_random_square(self, field):
         """
-        Function for picking a random square. Mostly used in at the beginning 
+        Function for picking a random square. Mostly used in at the beginning
         of the game.
         """
 
         l.debug("Choosing random square.")
 
-        row = random.randint(0, len(field) - 1)
-        column = random.randint(0, len(field[row]) - 1)
+        row = random.randint(0, field.rows - 1)
+        column = random.randint(0, field.columns - 1)
 
         l.debug("Chose: ({},{})".format(row, column))
 
-        return field[row][column]
+        return field.square(row, column)
 
     def pick_safe_square(self):
         """
-        Function for picking one of the safe squares. Only the ones that 
+        Function for picking one of the safe squares. Only the ones that
         are absolutely safe are returned here.
         """
 
         l.debug("Choosing safe square.")
 
-        wrapper = self._safe_squares.get()
-        
-        l.debug("Chose: {}".format(wrapper.coordinates))
+        index = self._safe_squares.get()
+        row, column = divmod(index, self._board.columns)
+
+        l.debug("Chose: ({},{})".format(row, column))
 
-        return wrapper.square
+        return self._board.square(row, column)
 
     def pick_best_valued_square(self, field):
         """
@@ -188,6 +302,14 @@ class DecisionMaker:
         """
 
         l.debug("Choosing best valued square.")
-        l.debug("Chose: {}".format(self._best_valued_square_wrapper.coordinates))
 
-        return self._best_valued_square_wrapper.square
+        if self._best_valued_square_index is None:
+            l.warning("No square left to choose.")
+            return None
+
+        row, column = divmod(self._best_valued_square_index, field.columns)
+        self._best_valued_square_index = None
+
+        l.debug("Chose: ({},{})".format(row, column))
+
+        return field.square(row, column)
@@ -0,0 +1,79 @@
+class DeductionEngine:
+    """
+    Class for deducing mines and safe squares from pairs of overlapping
+    constraints. The unknown neighbours of each number are represented as a
+    bitmask (bit i == square with the flat index i), such that intersections
+    and differences of constraints are single integer operations. This
+    covers the subset relations (i.e. the 1-1 and 1-2-1 patterns) that the
+    constraints of single numbers cannot decide.
+    """
+
+    @staticmethod
+    def to_mask(indices):
+        """
+        Function for converting square indices into a bitmask.
+        """
+
+        mask = 0
+        for index in indices:
+            mask |= 1 << index
+        return mask
+
+    @staticmethod
+    def to_indices(mask):
+        """
+        Function for converting a bitmask into the square indices it contains
+        (in ascending order).
+        """
+
+        indices = []
+        while mask:
+            lowest_bit = mask & -mask
+            indices.append(lowest_bit.bit_length() - 1)
+            mask ^= lowest_bit
+        return indices
+
+    @staticmethod
+    def count(mask):
+        """
+        Function for counting the squares contained in a bitmask.
+        """
+
+        return bin(mask).count("1")
+
+    def deduce(self, constraints, candidates, partners):
+        """
+        Function for comparing each candidate constraint with all constraints
+        overlapping it (provided by the partners function). Constraints are
+        [remaining mines, mask] lists. For two constraints A and B:
+        if A.remaining - B.remaining equals the number of squares only A
+        contains, all of them are mines and all squares only B contains are
+        safe. Returns the masks of the deduced mines and safe squares.
+        """
+
+        mines = 0
+        safe_squares = 0
+
+        for index in candidates:
+            constraint = constraints.get(index)
+            if constraint is None:
+                continue
+            remaining, mask = constraint
+
+            for partner_index in partners(index, mask):
+                partner_remaining, partner_mask = constraints[partner_index]
+                only_own = mask & ~partner_mask
+                only_partner = partner_mask & ~mask
+                difference = remaining - partner_remaining
+
+                if difference == self.count(only_own):
+                    mines |= only_own
+                    safe_squares |= only_partner
+                elif -difference == self.count(only_partner):
+                    mines |= only_partner
+                    safe_squares |= only_own
+
+        # Contradicting results (i.e. caused by a misrecognized number) are
+        # not used at all.
+        contradictions = mines & safe_squares
+        return mines & ~contradictions, safe_squares & ~contradictions
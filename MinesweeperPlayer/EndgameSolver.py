@@ -0,0 +1,192 @@
+from DeductionEngine import *
+
+import logging as l
+
+class EndgameSolver:
+    """
+    Class for choosing the guess of positions with only a few unknown squares
+    left. All assignments of mines to the unknown squares of the whole field
+    that satisfy the numbers and the total number of mines are enumerated.
+    Each assignment is a bitmask of the positions (in the list of unknown
+    squares) containing a mine.
+
+    A guess does not only have to be safe, the number it reveals should also
+    decide the following ones. Therefore the probability of winning is
+    calculated for each square by searching all outcomes: clicking a square
+    keeps the assignments in which it is safe, grouped by the number it
+    reveals. Squares that are safe in all remaining assignments are revealed
+    without any risk. The square with the highest probability is chosen.
+    """
+
+    # Positions with more unknown squares or assignments are left to the
+    # ProbabilityEngine, since the search grows exponentially with them.
+    _max_square_count = 24
+    _max_assignment_count = 200
+    # Maximum number of searched positions per decision.
+    _max_node_count = 50000
+
+    _node_count = 0
+    # {(assignments, revealed positions): probability of winning}
+    _win_probabilities = {}
+    # Bitmasks of the unknown neighbours of each position.
+    _neighbour_masks = []
+
+    def __init__(self):
+        self._node_count = 0
+        self._win_probabilities = {}
+        self._neighbour_masks = []
+
+    def find_best_square(self, knowledge_base, mine_count, excluded_squares = None):
+        """
+        Function for finding the unknown square with the highest probability
+        of winning the game. Squares in excluded_squares are not chosen.
+        Returns (index, probability) or None if the position is too large to
+        be searched.
+        """
+
+        if excluded_squares is None:
+            excluded_squares = set()
+
+        unknown_squares = knowledge_base.unknown_squares().tolist()
+        remaining_mines = mine_count - len(knowledge_base.mines)
+        if len(unknown_squares) == 0 or len(unknown_squares) > self._max_square_count or not (0 <= remaining_mines <= len(unknown_squares)):
+            return None
+
+        assignments = self.enumerate_assignments(knowledge_base, unknown_squares, remaining_mines)
+        if assignments is None or len(assignments) == 0:
+            return None
+
+        positions = {index: position for position, index in enumerate(unknown_squares)}
+        self._neighbour_masks = [DeductionEngine.to_mask(positions[neighbour] for neighbour in knowledge_base.geometry.neighbours(index) if neighbour in positions) for index in unknown_squares]
+        self._win_probabilities = {}
+        self._node_count = 0
+
+        best_index, best_probability = None, -1.0
+        for position, index in enumerate(unknown_squares):
+            if index in excluded_squares:
+                continue
+
+            probability = self.get_click_probability(assignments, 0, position)
+            if self._node_count > self._max_node_count:
+                l.debug("Endgame search stopped after {} positions.".format(self._node_count))
+                return None
+            if probability > best_probability:
+                best_index, best_probability = index, probability
+
+        if best_index is None:
+            return None
+
+        l.debug("Endgame: {} unknown squares, {} assignments, {} positions searched.".format(len(unknown_squares), len(assignments), self._node_count))
+        return best_index, best_probability
+
+    def enumerate_assignments(self, knowledge_base, unknown_squares, remaining_mines):
+        """
+        Function for enumerating all assignments of the remaining mines to the
+        unknown squares that satisfy all constraints. Returns a tuple of
+        bitmasks or None if there are too many of them.
+        """
+
+        positions = {index: position for position, index in enumerate(unknown_squares)}
+        square_count = len(unknown_squares)
+
+        # [remaining mines, mask of the positions] of each constraint as well
+        # as the constraints each position is part of.
+        constraints = []
+        position_constraints = [[] for _ in range(square_count)]
+        for remaining, mask in knowledge_base.constraints.values():
+            local_mask = DeductionEngine.to_mask(positions[index] for index in DeductionEngine.to_indices(mask))
+            for position in DeductionEngine.to_indices(local_mask):
+                position_constraints[position].append(len(constraints))
+            constraints.append([remaining, DeductionEngine.count(local_mask)])
+
+        assignments = []
+
+        def assign(position, mines, mask):
+            if len(assignments) > self._max_assignment_count:
+                return
+            if position == square_count:
+                if mines == 0:
+                    assignments.append(mask)
+                return
+
+            # constraints[i] is [mines left, unassigned positions left].
+            for is_mine in (False, True):
+                if is_mine and mines == 0 or not is_mine and mines == square_count - position:
+                    continue
+
+                is_valid = True
+                for constraint_index in position_constraints[position]:
+                    remaining, unassigned = constraints[constraint_index]
+                    remaining -= is_mine
+                    if remaining < 0 or remaining > unassigned - 1:
+                        is_valid = False
+                if not is_valid:
+                    continue
+
+                for constraint_index in position_constraints[position]:
+                    constraints[constraint_index][0] -= is_mine
+                    constraints[constraint_index][1] -= 1
+                assign(position + 1, mines - is_mine, mask | is_mine << position)
+                for constraint_index in position_constraints[position]:
+                    constraints[constraint_index][0] += is_mine
+                    constraints[constraint_index][1] += 1
+
+        assign(0, remaining_mines, 0)
+
+        if len(assignments) > self._max_assignment_count:
+            return None
+        return tuple(assignments)
+
+    def get_win_probability(self, assignments, revealed):
+        """
+        Function for calculating the probability of winning if the remaining
+        assignments are equally likely and the positions of the revealed mask
+        are known to be safe. Always clicking the best square is assumed.
+        """
+
+        if len(assignments) <= 1:
+            return 1.0
+
+        key = (assignments, revealed)
+        if key in self._win_probabilities:
+            return self._win_probabilities[key]
+
+        self._node_count += 1
+        if self._node_count > self._max_node_count:
+            return 0.0
+
+        all_positions = (1 << len(self._neighbour_masks)) - 1
+        possible_mines = 0
+        for assignment in assignments:
+            possible_mines |= assignment
+
+        # Squares that are safe in all assignments are revealed first, which
+        # does not risk anything.
+        safe_positions = all_positions & ~possible_mines & ~revealed
+        if safe_positions != 0:
+            groups = {}
+            for assignment in assignments:
+                numbers = tuple(DeductionEngine.count(assignment & self._neighbour_masks[position]) for position in DeductionEngine.to_indices(safe_positions))
+                groups.setdefault(numbers, []).append(assignment)
+
+            probability = sum(len(group) * self.get_win_probability(tuple(group), revealed | safe_positions) for group in groups.values()) / len(assignments)
+        else:
+            probability = 0.0
+            for position in DeductionEngine.to_indices(all_positions & ~revealed):
+                probability = max(probability, self.get_click_probability(assignments, revealed, position))
+
+        self._win_probabilities[key] = probability
+        return probability
+
+    def get_click_probability(self, assignments, revealed, position):
+        """
+        Function for calculating the probability of winning after clicking
+        the square at the provided position.
+        """
+
+        groups = {}
+        for assignment in assignments:
+            if not (assignment >> position) & 1:
+                groups.setdefault(DeductionEngine.count(assignment & self._neighbour_masks[position]), []).append(assignment)
+
+        return sum(len(group) * self.get_win_probability(tuple(group), revealed | 1 << position) for group in groups.values()) / len(assignments)
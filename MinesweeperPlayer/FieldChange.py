@@ -0,0 +1,60 @@
+import numpy as np
+
+class FieldChange:
+    """
+    Class containing the changes that occurred on the game field during a
+    single update. Instead of one object per square, the changed squares are
+    stored as flat indices (row * columns + column) together with their old
+    and new states.
+    """
+
+    # Number of the update the change was detected in.
+    update_index = 0
+    # The board after the change.
+    board = None
+    indices = None
+    old_states = None
+    new_states = None
+
+    def __init__(self, update_index, board, indices, old_states, new_states):
+        self.update_index = update_index
+        self.board = board
+        self.indices = indices
+        self.old_states = old_states
+        self.new_states = new_states
+
+    @staticmethod
+    def between(update_index, old_board, new_board):
+        """
+        Function for calculating the change between two boards with a single
+        comparison of their states. Without an old board, all squares that are
+        not unchecked are considered changed.
+        """
+
+        new_states = new_board.states.ravel()
+        if old_board is None:
+            old_states = np.full_like(new_states, new_board.unchecked_value)
+        else:
+            old_states = old_board.states.ravel()
+
+        indices = np.flatnonzero(old_states != new_states)
+        return FieldChange(update_index, new_board, indices, old_states[indices], new_states[indices])
+
+    def __len__(self):
+        return len(self.indices)
+
+    def positions(self):
+        """
+        Function for retrieving the (row, column) indices of the changed squares.
+        """
+
+        return np.divmod(self.indices, self.board.columns)
+
+    def revealed(self):
+        """
+        Function for retrieving the indices of the squares that were unchecked
+        before and are checked now.
+        """
+
+        is_revealed = (self.old_states == self.board.unchecked_value) & (self.new_states >= 0)
+        return self.indices[is_revealed]
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+
+class Frame:
+    """
+    A single capture of the game's window. All representations derived from
+    it (color, grayscale, cropped, edges) are created on first access and
+    shared by everything working with the same capture. Cropped
+    representations are views and do not copy the image.
+    """
+
+    # The captured image. Either a PIL image or an RGB(A) array.
+    _image = None
+    _rgb = None
+    _bgr = None
+    _gray = None
+    # {(canny_params, bbox): edges}
+    _edges = {}
+
+    def __init__(self, image):
+        self._image = image
+        self._edges = {}
+
+    @staticmethod
+    def of(image):
+        """
+        Function for wrapping an image into a Frame. Frames are returned as they
+        are such that their cached representations can be reused.
+        """
+
+        if isinstance(image, Frame):
+            return image
+        return Frame(image)
+
+    def rgb(self):
+        """
+        Function for retrieving the image as RGB(A) array.
+        """
+
+        if self._rgb is None:
+            self._rgb = np.asarray(self._image)
+        return self._rgb
+
+    def copy(self):
+        """
+        Function for retrieving a Frame that stays valid when the captured
+        image is overwritten (i.e. by the next capture into the same buffer).
+        Frames that already converted the image to BGR return themselves.
+        """
+
+        if self._bgr is not None:
+            return self
+        return Frame(np.array(self.rgb()))
+
+    def bgr(self, bbox = None):
+        """
+        Function for retrieving the image in the BGR format used by OpenCV. The
+        result is read-only and must be copied before drawing on it.
+        """
+
+        if self._bgr is None:
+            rgb = self.rgb()
+            code = cv2.COLOR_RGBA2BGR if rgb.shape[2] == 4 else cv2.COLOR_RGB2BGR
+            self._bgr = cv2.cvtColor(rgb, code)
+            self._bgr.flags.writeable = False
+        return self.crop(self._bgr, bbox)
+
+    def gray(self, bbox = None):
+        """
+        Function for retrieving the grayscale image, optionally cropped to a
+        bounding box (left, top, right, bottom).
+        """
+
+        if self._gray is None:
+            rgb = self.rgb()
+            code = cv2.COLOR_RGBA2GRAY if rgb.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+            self._gray = cv2.cvtColor(rgb, code)
+            self._gray.flags.writeable = False
+        return self.crop(self._gray, bbox)
+
+    def edges(self, canny_params, bbox = None):
+        """
+        Function for retrieving the edges (Canny) of the grayscale image,
+        optionally cropped to a bounding box (left, top, right, bottom).
+        """
+
+        key = tuple(canny_params), None if bbox is None else tuple(int(value) for value in bbox)
+
+        if key not in self._edges:
+            edges = cv2.Canny(self.gray(bbox), *canny_params)
+            edges.flags.writeable = False
+            self._edges[key] = edges
+        return self._edges[key]
+
+    def crop(self, image, bbox):
+        """
+        Function for cropping an image to a bounding box (left, top, right,
+        bottom) without copying it.
+        """
+
+        if bbox is None:
+            return image
+
+        left, top, right, bottom = (max(0, int(value)) for value in bbox)
+        return image[top:bottom, left:right]
@@ -1,7 +1,15 @@
-from Square import *
-from Window import *
+from Board import *
 from OpenCV import *
-from SquareChange import *
+from FieldChange import *
+from ChangeStream import *
+from Lattice import *
+from SettleDetector import *
+from Frame import *
+from GameState import *
+from GameStateDetector import *
+from CounterReader import *
+
+import time as t
 
 class Game:
     """
@@ -12,23 +20,57 @@ class Game:
     """
 
     _open_cv = OpenCV()
+    _settle_detector = SettleDetector()
+    _state_detector = None
+    _counter_reader = None
 
-    # The initial square locations at the beginning of the game.
-    _initial_squares = []
-    # The width of a single square on the game field.
-    _initial_square_width = 0
+    # The regular grid the squares are arranged in.
+    _lattice = None
 
     # The current field.
     current_field_info = None
-    # The fields whose state differed during the comparion.
-    changed_fields = []
-
+    # The squares whose state differed during the last comparison.
+    last_change = None
+    # Stream the changes of the field are published to.
+    changes = None
+    _update_count = 0
+
+    # The state of the game (running, won or lost).
+    state = GameState.RUNNING
     is_finished = False
 
+    # Values shown by the mine counter (mines minus flags) and the timer at
+    # the start and the end of the game, None if they could not be read.
+    mine_counter = None
+    timer = None
+
+    # The frame used in the last update and the time each step took.
+    last_frame = None
+    timings = {}
+
     def __init__(self):
         self._open_cv = OpenCV()
+        self._settle_detector = SettleDetector()
+        self._state_detector = GameStateDetector(self._open_cv)
+        self._counter_reader = CounterReader(self._open_cv)
+        self.changes = ChangeStream()
+        self.timings = {}
 
-    def update_field_dimensions(self, window):
+    def set_debug_sink(self, sink):
+        """
+        Function for choosing where the recognition results are displayed.
+        """
+
+        self._open_cv.set_debug_sink(sink)
+
+    def close(self):
+        """
+        Function for releasing the resources of the recognition.
+        """
+
+        self._open_cv.close()
+
+    def update_field_dimensions(self, capture):
         """
         Function for udpating the game's field dimesions like number of squares, 
         rows, columns and the individual size of each square.
@@ -36,20 +78,41 @@ class Game:
 
         l.debug("Updating field dimensions...")
 
-        image = window.get_window_image()
-        self._initial_squares = self._open_cv.get_field_information(image)
+        frame = Frame(capture.grab())
+        self.last_frame = frame
+
+        # The lattice is derived from the template matching results. All 
+        # following updates classify the squares along it.
+        self._open_cv.reset_lattice()
+        self._open_cv.get_field_information(frame)
+        self._lattice = self._open_cv.get_lattice()
+        self._state_detector.init_region(frame)
+
+        # The counters are located below the field.
+        self._counter_reader.init_regions(self._lattice, frame)
+        self.read_counters(frame)
+
+    def wait_until_settled(self, capture):
+        """
+        Function for waiting until the view of the game field stops changing 
+        (i.e. after the animation of a click finished).
+        """
 
-        distances = []
-        for row in self._initial_squares:
-            prev_next_tuples = zip(row[:-1], row[1:])
-            distances += list(map(lambda tuple: tuple[1].center_coordinates[0] - tuple[0].center_coordinates[0], prev_next_tuples))
+        top_left, bottom_right = self._lattice.bounds()
+        bbox = (*top_left, *bottom_right)
+        field_size = self._lattice.rows, self._lattice.columns
 
-        # Minimum since the distance is compared in such a way that the program 
-        # tests if a square can be inserted based on the distance between two 
-        # coordinates.
-        self._initial_square_width = min(distances)
+        return self._settle_detector.wait(lambda: capture.grab(bbox), field_size)
 
-    def update(self, window):
+    def get_square_index(self, center_coordinates):
+        """
+        Function for retrieving the flat index (row * columns + column) of the 
+        square at the provided coordinates.
+        """
+
+        return int(self._lattice.square_indices(center_coordinates[0], center_coordinates[1]))
+
+    def update(self, capture):
         """
         Function for updating the current state of the game. The field as well as any 
         other relevenat information (changes, etc.) are gathered here.
@@ -57,89 +120,62 @@ class Game:
 
         # Update the field information using OpenCV.
         l.debug("Getting window image...")
-        image = window.get_window_image()
+        # All recognition steps share the conversions of a single frame.
+        start = t.perf_counter()
+        frame = Frame(capture.grab())
+        self.last_frame = frame
+        captured = t.perf_counter()
+
         l.debug("Getting field information...")
-        self.is_finished = self._open_cv.is_finished(image)
-
-        if not self.is_finished:
-            new_field_info = self._open_cv.get_field_information(image)
-            self.fill_empty_spaces(new_field_info)
-            self.compare_and_update_field_info(new_field_info)
-
-    def fill_empty_spaces(self, field_info):
-        l.debug("Filling empty spaces with zeroes...")
-
-        # Fill any empty spots with the previously extracted coordinates such that 
-        # the result is the complete game field.
-        for row_index in range(0, len(self._initial_squares)):
-            for column_index in range(0, len(self._initial_squares[row_index])):
-                stored = self._initial_squares[row_index][column_index]
-                checked_stored = Square(stored.center_coordinates, 0, False)
-                
-                # Empty fields at the ends must be added manually.
-                if column_index >= len(field_info[row_index]):
-                    field_info[row_index].append(checked_stored)
-                else:
-                    new = field_info[row_index][column_index]
-                    difference_x = abs(new.center_coordinates[0] - stored.center_coordinates[0])
-
-                    # Distance greater than the previously calculated distance means 
-                    # that an entry is missing here.
-                    if difference_x >= self._initial_square_width:
-                        field_info[row_index].insert(column_index, checked_stored)
-
-        # Crude display of the result.
-        l.debug("Filling results: {} rows with {} columns".format(len(field_info), list(map(lambda x: len(x), field_info))))
-        for row in field_info:
-            line = ""
-            for column in row:
-                if column.is_unchecked:
-                    line += "?"
-                else:
-                    line += str(column.value)
-            l.debug(line)
+        self.state = self._state_detector.detect(frame)
+
+        if self.state == GameState.RUNNING:
+            new_field_info = self._open_cv.get_field_information(frame)
+
+            # Mines are revealed before the end screen is shown.
+            self.state = self._state_detector.detect_field(new_field_info)
+            if self.state == GameState.RUNNING:
+                self.compare_and_update_field_info(new_field_info)
+
+        self.timings = {"capture": captured - start, "recognize": t.perf_counter() - captured}
+
+        self.is_finished = self.state != GameState.RUNNING
+        if self.is_finished:
+            l.info("Game {}.".format(self.state))
+            # The counters are only needed at the start (total number of 
+            # mines) and the end of the game.
+            self.read_counters(frame)
+
+    def read_counters(self, frame):
+        """
+        Function for reading the mine counter and the timer of the frame.
+        """
+
+        self.mine_counter, self.timer = self._counter_reader.read(frame)
+        l.debug("Counters: {} mines, {} seconds".format(self.mine_counter, self.timer))
 
     def compare_and_update_field_info(self, field_info):
         """
-        Function for updating the collection of fields that changed compared 
-        to the stored ones.
+        Function for determining the squares that changed compared to the 
+        stored field. The change is published to all subscribers of the 
+        change stream.
         """
 
         l.debug("Checking for differences...")
 
-        # Previous changes must be reset.
-        self.changed_fields.clear()
-        change_occurred = False
-
-        # First update cycle.
+        # The first update compares against a completely unchecked field.
+        change = FieldChange.between(self._update_count, self.current_field_info, field_info)
         if self.current_field_info is None:
-            self.current_field_info = field_info
-            change_occurred = True
-
             l.info("Field state initialized.")
-        # Each square must be compared in order to determine whether 
-        # a change occurred. Checking the field representing the checked 
-        # property is enough since the values of the squares do not change.
-        else:
-            # Row and column count match the entire game.
-            for row_index in range(0, len(self.current_field_info)):
-                for column_index in range(0, len(self.current_field_info[row_index])):
-                    old_square = self.current_field_info[row_index][column_index]
-                    new_square = field_info[row_index][column_index]
-
-                    if old_square.is_unchecked and not new_square.is_unchecked:
-                        l.debug("Field state differs at [{}][{}]. value={}".format(row_index, column_index, new_square.value))
-
-                        # Keep track of the changes on the field.
-                        square_change = SquareChange(old_square, new_square, row_index, column_index)
-                        self.changed_fields.append(square_change)
-                        change_occurred = True
-
-            # Update the field state such that the new one can be 
-            # retrieved.
-            self.current_field_info = field_info
 
+        # Update the field state such that the new one can be retrieved.
+        self.current_field_info = field_info
+        self.last_change = change
+        self._update_count += 1
+
+        change_occurred = len(change) > 0
         if change_occurred:
-            l.info("Field state differs.")
+            l.info("Field state differs ({} squares).".format(len(change)))
+            self.changes.publish(change)
 
-        return change_occurred
\ No newline at end of file
+        return change_occurred
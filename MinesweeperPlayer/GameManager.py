@@ -1,7 +1,11 @@
 from Window import *
 from Game import *
 from DecisionMaker import *
+from ClickPlanner import *
+from Win32Capture import *
+from SessionRecorder import *
 
+import random
 import logging as l
 import time as t
 
@@ -13,8 +17,32 @@ class GameManager:
     """
 
     _window = Window()
+    _capture = None
     _game = Game()
     _decision_maker = DecisionMaker()
+    _click_planner = ClickPlanner()
+    # Last (x, y) position of the mouse on the game field.
+    _cursor_position = None
+    # Optional recorder of the whole session.
+    _recorder = None
+    # Number of squares that changed during the game.
+    _changed_square_count = 0
+
+    def __init__(self, record_path = None, worker_count = 1, deadline = 2.0, debug_sink = None):
+        self._capture = Win32Capture(self._window)
+        if debug_sink is not None:
+            self._game.set_debug_sink(debug_sink)
+        self._decision_maker.set_worker_count(worker_count, deadline)
+
+        if record_path is not None:
+            # Random decisions must be reproducible when replaying the session.
+            seed = random.randrange(2 ** 32)
+            random.seed(seed)
+            self._recorder = SessionRecorder(record_path, {"seed": seed})
+            self._game.changes.subscribe(self._recorder.record_change)
+
+        self._game.changes.subscribe(self._decision_maker.apply_change)
+        self._game.changes.subscribe(self.count_changes)
 
     def run(self):
         """
@@ -30,7 +58,10 @@ class GameManager:
         t.sleep(0.25)
 
         # Initialize the dimensions of the field (i.e. the width of the squares).
-        self._game.update_field_dimensions(self._window)
+        self._game.update_field_dimensions(self._capture)
+        self.apply_mine_counter()
+        if self._recorder is not None:
+            self._recorder.record_update(self._game.last_frame, None, self._game.state)
 
         l.info("Starting the GameManager...")
         input("Press any key to start.")
@@ -39,42 +70,107 @@ class GameManager:
             if self._window.is_open():
                 try:
                     if self._decision_maker.do_safe_squares_exist():
-                        # Perform all actions that are safe.
-                        while self._decision_maker.do_safe_squares_exist():
-                            next_square = self._decision_maker.decide_next_square(field)
-                            self._window.click_mouse(next_square.center_coordinates)
-
-                            t.sleep(0.025)
+                        # Perform all actions that are safe as a single batch.
+                        self.perform_safe_actions(field)
                     else:
                         self.move_mouse_away()
 
-                        # Wait time for the game to update its view. Differs for different sizes.
-                        # I.e.:
-                        # Small     0.05
-                        # Medium    0.075
-                        # Large     0.11
-                        t.sleep(0.11)
+                        # Wait for the game to update its view. The time needed differs 
+                        # for different sizes and is learned while playing.
+                        self._game.wait_until_settled(self._capture)
 
                         # Update the current state of the game.
-                        self._game.update(self._window)
+                        self._game.update(self._capture)
                         field = self._game.current_field_info
 
+                        if self._recorder is not None:
+                            self._recorder.record_update(self._game.last_frame, field, self._game.state, self._game.timings)
+
                         # Flag is updated after calling the update function. Therefore a check is necessary.
-                        if not self._game.is_finished:
-                            next_square = self._decision_maker.decide_next_square(field)
-                            self._window.click_mouse(next_square.center_coordinates)
-
-                            t.sleep(0.025)
-                except:
-                    # Exceptions are thrown if the game is lost since all bombs explode before 
-                    # showing the end screen.
+                        # Safe squares known after the update are clicked as a batch 
+                        # in the next iteration.
+                        if not self._game.is_finished and not self._decision_maker.do_safe_squares_exist():
+                            self.decide_and_click(field)
+                except Exception as e:
+                    # Won and lost games are detected by the game itself. Any 
+                    # exception is therefore an actual error.
+                    l.error("Exception while playing: {}".format(e))
                     no_exception_caught = False
             else:
                 l.critical("The Minesweeper window must be opened in order for this program to work.")
 
-        l.info("Game finished.")
+        l.info("Game finished ({}, {} squares changed, timer {}).".format(self._game.state, self._changed_square_count, self._game.timer))
+
+        if self._recorder is not None:
+            self._recorder.close()
+        self._capture.close()
+        self._game.close()
+        self._decision_maker.close()
+
         input("Press any key to close.")
 
+    def apply_mine_counter(self):
+        """
+        Function for passing the total number of mines to the decision maker. 
+        Before anything is flagged, the mine counter shows exactly this number.
+        Otherwise the default of the field size is used.
+        """
+
+        if self._game.mine_counter is not None:
+            l.info("Mine counter: {} mines.".format(self._game.mine_counter))
+            self._decision_maker.set_mine_count(self._game.mine_counter)
+
+    def count_changes(self, change):
+        """
+        Function for counting the changed squares (subscriber of the game's 
+        change stream).
+        """
+
+        self._changed_square_count += len(change)
+
+    def decide_and_click(self, field):
+        """
+        Function for deciding which square to click next and clicking it.
+        """
+
+        start = t.perf_counter()
+        next_square = self._decision_maker.decide_next_square(field)
+        decided = t.perf_counter()
+        if next_square is None:
+            return
+
+        self._window.click_mouse(next_square.center_coordinates)
+        clicked = t.perf_counter()
+        self._cursor_position = next_square.center_coordinates
+
+        if self._recorder is not None:
+            square_index = self._game.get_square_index(next_square.center_coordinates)
+            self._recorder.record_decision(square_index, next_square.center_coordinates, {"decide": decided - start, "click": clicked - decided})
+
+    def perform_safe_actions(self, field):
+        """
+        Function for performing the actions of all safe squares along the 
+        shortest path found by the click planner.
+        """
+
+        start = t.perf_counter()
+        actions = self._click_planner.plan(self._decision_maker.take_safe_actions(field), field, self._cursor_position)
+        decided = t.perf_counter()
+        if len(actions) == 0:
+            return
+
+        self._window.perform_actions(actions)
+        clicked = t.perf_counter()
+        self._cursor_position = actions[-1].center_coordinates
+
+        if self._recorder is not None:
+            # The timings of the batch are added to the record only once.
+            timings = {"decide": decided - start, "click": clicked - decided}
+            for action in actions:
+                square_index = self._game.get_square_index(action.center_coordinates)
+                self._recorder.record_decision(square_index, action.center_coordinates, timings, action.type)
+                timings = {}
+
     def move_mouse_away(self):
         """
         Function for moving the mouse away from the game field in order 
@@ -82,3 +178,4 @@ class GameManager:
         """
 
         self._window.move_mouse((0, 0), True, 0, 0)
+        self._cursor_position = (0, 0)
@@ -0,0 +1,8 @@
+class GameState:
+    """
+    The states a game of Minesweeper can be in.
+    """
+
+    RUNNING = "running"
+    WON = "won"
+    LOST = "lost"
@@ -0,0 +1,104 @@
+from GameState import *
+from Frame import *
+
+import numpy as np
+import logging as l
+
+class GameStateDetector:
+    """
+    Class for detecting whether the game is still running, won or lost. The end
+    screen always covers the center of the window. Instead of searching the
+    whole image for the end screen on each update, only a small region at the
+    center (the signature) is compared with the previous one. The expensive
+    template matching is only performed once this region changed.
+    """
+
+    _open_cv = None
+
+    # Size (width, height) of the region at the center of the window.
+    _region_size = (32, 32)
+    # (left, top, right, bottom) of the region inside the window image.
+    _region = None
+    # Grayscale image of the region at the last full check.
+    _signature = None
+    # Mean difference of the region's pixels above which it is considered changed.
+    _tolerance = 6.0
+
+    # Flag for mines that were visible on the field.
+    _mines_seen = False
+
+    def __init__(self, open_cv):
+        self._open_cv = open_cv
+        self.reset()
+
+    def reset(self):
+        """
+        Function for resetting the detector for a new game.
+        """
+
+        self._region = None
+        self._signature = None
+        self._mines_seen = False
+
+    def init_region(self, frame):
+        """
+        Function for initializing the signature region at the center of the 
+        window image.
+        """
+
+        height, width = Frame.of(frame).gray().shape
+        left = max(0, (width - self._region_size[0]) // 2)
+        top = max(0, (height - self._region_size[1]) // 2)
+        self._region = (left, top, left + self._region_size[0], top + self._region_size[1])
+        self._signature = None
+
+        l.debug("Game state signature region: {}".format(self._region))
+
+    def has_region_changed(self, frame):
+        """
+        Function for checking whether the signature region differs from the one 
+        of the last full check.
+        """
+
+        region = Frame.of(frame).gray(self._region).astype(np.float32)
+
+        if self._signature is None or self._signature.shape != region.shape:
+            return True
+        return np.abs(region - self._signature).mean() > self._tolerance
+
+    def detect(self, frame):
+        """
+        Function for detecting the state of the game shown in the provided frame.
+        """
+
+        frame = Frame.of(frame)
+
+        if self._region is None:
+            self.init_region(frame)
+
+        if not self.has_region_changed(frame):
+            return GameState.RUNNING
+
+        # Only a change at the center of the window requires searching for 
+        # the end screen.
+        l.debug("Signature region changed, checking for the end screen...")
+        self._signature = frame.gray(self._region).astype(np.float32)
+
+        if not self._open_cv.is_finished(frame):
+            return GameState.RUNNING
+
+        # Mines are only shown once a game is lost.
+        if self._mines_seen:
+            return GameState.LOST
+        return GameState.WON
+
+    def detect_field(self, board):
+        """
+        Function for detecting the state of the game based on the recognized 
+        board. A game is lost once a mine is visible.
+        """
+
+        if board.count(board.mine_value) > 0:
+            self._mines_seen = True
+            return GameState.LOST
+        return GameState.RUNNING
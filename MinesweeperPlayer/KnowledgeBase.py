@@ -0,0 +1,252 @@
+from BoardGeometry import *
+from DeductionEngine import *
+from PatternTable import *
+
+import numpy as np
+import logging as l
+
+class KnowledgeBase:
+    """
+    Persistent knowledge about the game field that is kept between updates.
+    Squares are keyed by their flat index (row * columns + column). The known
+    mines, the known safe squares and the constraints of the numbers next to
+    unchecked squares (the frontier) are only updated based on the squares
+    that changed, such that the work done for each update is proportional to
+    the change and not to the size of the field.
+    """
+
+    unchecked_value = -1
+
+    rows = 0
+    columns = 0
+    # Shared neighbourhood tables of the field size.
+    geometry = None
+    # Flat array of the last known states.
+    _states = None
+
+    # Indices of squares that definitely contain a mine.
+    mines = set()
+    # Indices of unchecked squares that definitely contain no mine.
+    safe_squares = set()
+    # {index of a number: [remaining mines, bitmask of unknown neighbours]}
+    # Unknown neighbours are unchecked and not known to be a mine or safe.
+    constraints = {}
+    # Indices of constraints that must be checked again.
+    _dirty_constraints = set()
+    # Indices of constraints that changed since they were last compared with
+    # the overlapping ones.
+    _changed_constraints = set()
+    _deduction_engine = None
+    # Shared by all knowledge bases, such that it is only loaded once.
+    _pattern_table = PatternTable()
+
+    def __init__(self, rows = 0, columns = 0):
+        self.reset(rows, columns)
+
+    @staticmethod
+    def load_pattern_table():
+        """
+        Function for loading (or generating) the shared pattern table, such
+        that this does not delay the first decision of a game.
+        """
+
+        KnowledgeBase._pattern_table.ensure_loaded()
+
+    def reset(self, rows, columns):
+        """
+        Function for forgetting everything about the field.
+        """
+
+        self.rows = rows
+        self.columns = columns
+        self.geometry = BoardGeometry.get(rows, columns)
+        self._states = np.full(rows * columns, self.unchecked_value, np.int8)
+        self.mines = set()
+        self.safe_squares = set()
+        self.constraints = {}
+        self._dirty_constraints = set()
+        self._changed_constraints = set()
+        self._deduction_engine = DeductionEngine()
+
+    def is_unknown(self, index):
+        """
+        Function for checking whether nothing is known about a square yet.
+        """
+
+        return self._states[index] == self.unchecked_value and index not in self.mines and index not in self.safe_squares
+
+    def apply_change(self, change):
+        """
+        Function for updating the knowledge with the squares that changed
+        (i.e. a FieldChange published by the game). Returns the indices of
+        the squares that became known to be safe.
+        """
+
+        if change.board.rows * change.board.columns != len(self._states):
+            self.reset(change.board.rows, change.board.columns)
+
+        for index, state in zip(change.indices.tolist(), change.new_states.tolist()):
+            # Values read on known mines (i.e. a misread flag) must not change
+            # the knowledge.
+            if index in self.mines:
+                continue
+
+            # Only checked squares add information (mines shown at the end of
+            # the game or flags are not considered). Flagged squares stay
+            # unchecked, since only the flag itself is known about them.
+            if state < 0:
+                self._states[index] = self.unchecked_value
+                continue
+
+            self._states[index] = state
+
+            self.safe_squares.discard(index)
+            for neighbour in self.geometry.neighbours(index):
+                self.remove_unknown(neighbour, index)
+
+            if state > 0:
+                self.add_constraint(index, state)
+
+        return self.propagate()
+
+    def add_constraint(self, index, value):
+        """
+        Function for adding the constraint of a number. Known mines around it
+        are already subtracted from its value.
+        """
+
+        unknown = 0
+        for neighbour in self.geometry.neighbours(index):
+            if neighbour in self.mines:
+                value -= 1
+            elif self.is_unknown(neighbour):
+                unknown |= 1 << neighbour
+
+        self.constraints[index] = [value, unknown]
+        self.mark_dirty(index)
+
+    def remove_unknown(self, constraint_index, index, is_mine = False):
+        """
+        Function for removing a square from the unknown neighbours of a
+        constraint, i.e. once it is known to be a mine or safe.
+        """
+
+        constraint = self.constraints.get(constraint_index)
+        if constraint is None or not (constraint[1] >> index) & 1:
+            return
+
+        constraint[1] &= ~(1 << index)
+        if is_mine:
+            constraint[0] -= 1
+        self.mark_dirty(constraint_index)
+
+    def mark_dirty(self, constraint_index):
+        """
+        Function for marking a constraint that must be checked again.
+        """
+
+        self._dirty_constraints.add(constraint_index)
+        self._changed_constraints.add(constraint_index)
+
+    def mark_mine(self, index):
+        """
+        Function for storing that a square definitely contains a mine.
+        """
+
+        if index in self.mines:
+            return
+
+        self.mines.add(index)
+        for neighbour in self.geometry.neighbours(index):
+            self.remove_unknown(neighbour, index, is_mine = True)
+
+    def mark_safe(self, index):
+        """
+        Function for storing that a square definitely contains no mine.
+        """
+
+        if index in self.safe_squares or self._states[index] != self.unchecked_value:
+            return False
+
+        self.safe_squares.add(index)
+        for neighbour in self.geometry.neighbours(index):
+            self.remove_unknown(neighbour, index)
+        return True
+
+    def propagate(self):
+        """
+        Function for applying the constraints that changed until no more
+        squares can be decided. Single constraints are checked first: if the
+        remaining mines of a number equal its unknown neighbours, all of them
+        are mines. If none remain, all of them are safe. Afterwards the
+        changed constraints are compared with the overlapping ones (see
+        DeductionEngine). Returns the squares that became known to be safe.
+        """
+
+        new_safe_squares = []
+
+        while len(self._dirty_constraints) > 0 or len(self._changed_constraints) > 0:
+            while len(self._dirty_constraints) > 0:
+                constraint_index = self._dirty_constraints.pop()
+                constraint = self.constraints.get(constraint_index)
+                if constraint is None:
+                    continue
+
+                remaining, unknown = constraint
+                unknown_count = DeductionEngine.count(unknown)
+                if unknown_count == 0:
+                    # Nothing left to decide, the number is done.
+                    del self.constraints[constraint_index]
+                elif remaining == unknown_count:
+                    for index in DeductionEngine.to_indices(unknown):
+                        self.mark_mine(index)
+                elif remaining == 0:
+                    for index in DeductionEngine.to_indices(unknown):
+                        if self.mark_safe(index):
+                            new_safe_squares.append(index)
+                elif remaining < 0 or remaining > unknown_count:
+                    l.warning("Contradicting constraint at square {}.".format(constraint_index))
+                    del self.constraints[constraint_index]
+
+            # Constraints changed by the following deductions are compared 
+            # again in the next iteration. Neighbouring numbers are looked up
+            # in the pattern table first, only if it decides nothing all
+            # overlapping constraints are compared.
+            candidates = sorted(self._changed_constraints)
+            self._changed_constraints = set()
+            mines, safe_squares = self._pattern_table.deduce(self.constraints, candidates, self.geometry)
+            if mines != 0 or safe_squares != 0:
+                self._changed_constraints.update(candidates)
+            else:
+                mines, safe_squares = self._deduction_engine.deduce(self.constraints, candidates, self.get_overlapping_constraints)
+
+            for index in DeductionEngine.to_indices(mines):
+                self.mark_mine(index)
+            for index in DeductionEngine.to_indices(safe_squares):
+                if self.mark_safe(index):
+                    new_safe_squares.append(index)
+
+        return new_safe_squares
+
+    def get_overlapping_constraints(self, constraint_index, mask):
+        """
+        Function for retrieving the indices of all other constraints sharing
+        at least one unknown square with the provided mask.
+        """
+
+        overlapping = set()
+        for index in DeductionEngine.to_indices(mask):
+            for neighbour in self.geometry.neighbours(index):
+                if neighbour != constraint_index and neighbour in self.constraints:
+                    overlapping.add(neighbour)
+        return sorted(overlapping)
+
+    def unknown_squares(self):
+        """
+        Function for retrieving the indices of all squares nothing is known about.
+        """
+
+        is_unknown = self._states == self.unchecked_value
+        is_unknown[list(self.mines)] = False
+        is_unknown[list(self.safe_squares)] = False
+        return np.flatnonzero(is_unknown)
@@ -0,0 +1,119 @@
+import numpy as np
+
+class Lattice:
+    """
+    The regular grid the squares of the game field are arranged in. It is
+    described by the center of the top left square (origin), the distance
+    between the centers of two neighbouring squares (pitch) and the number
+    of rows and columns.
+    """
+
+    # (x, y) center of the square at [0][0].
+    origin = (0, 0)
+    # (x, y) distance between two neighbouring squares.
+    pitch = (0.0, 0.0)
+    rows = 0
+    columns = 0
+
+    # Scale of the fixed point pitch used when mapping coordinates to squares.
+    _fixed_point_scale = 256
+
+    def __init__(self, origin, pitch, rows, columns):
+        self.origin = origin
+        self.pitch = pitch
+        self.rows = rows
+        self.columns = columns
+
+    @staticmethod
+    def from_points(xs, ys, minimum_distance, default_pitch = (18, 18)):
+        """
+        Function for deriving the lattice from the centers of matched squares
+        (i.e. the result of the template matching at the beginning of the game,
+        where all squares are unchecked). Coordinates that differ by less than
+        the minimum distance belong to the same row or column.
+        """
+
+        origin_x, pitch_x, columns = Lattice.fit_axis(xs, minimum_distance, default_pitch[0])
+        origin_y, pitch_y, rows = Lattice.fit_axis(ys, minimum_distance, default_pitch[1])
+
+        return Lattice((origin_x, origin_y), (pitch_x, pitch_y), rows, columns)
+
+    @staticmethod
+    def fit_axis(values, minimum_distance, default_pitch):
+        """
+        Function for fitting the origin, pitch and number of squares along a
+        single axis to the provided coordinates.
+        """
+
+        values = np.sort(np.asarray(values, np.float64))
+
+        # The most common distance between neighbouring rows (or columns) is a
+        # first estimate, missing ones only result in multiples of it.
+        gaps = np.diff(values)
+        gaps = gaps[gaps >= minimum_distance]
+        if len(gaps) == 0:
+            return int(round(float(np.median(values)))), float(default_pitch), 1
+        pitch = float(np.median(gaps))
+
+        # Refine the estimate using all coordinates.
+        indices = np.rint((values - values[0]) / pitch)
+        origin = float(np.median(values[indices == 0]))
+        if (indices > 0).any():
+            pitch = float(np.median((values[indices > 0] - origin) / indices[indices > 0]))
+
+        return int(round(origin)), pitch, int(indices[-1]) + 1
+
+    def center_xs(self):
+        """
+        Function for retrieving the x coordinates of the centers of all
+        columns.
+        """
+
+        return np.rint(self.origin[0] + np.arange(self.columns) * self.pitch[0]).astype(np.int32)
+
+    def center_ys(self):
+        """
+        Function for retrieving the y coordinates of the centers of all
+        rows.
+        """
+
+        return np.rint(self.origin[1] + np.arange(self.rows) * self.pitch[1]).astype(np.int32)
+
+    def bounds(self):
+        """
+        Function for retrieving the top left and bottom right coordinates
+        of the area covered by the squares.
+        """
+
+        half_x = int(round(self.pitch[0] / 2))
+        half_y = int(round(self.pitch[1] / 2))
+        xs = self.center_xs()
+        ys = self.center_ys()
+
+        return (int(xs[0]) - half_x, int(ys[0]) - half_y), (int(xs[-1]) + half_x, int(ys[-1]) + half_y)
+
+    def square_indices(self, xs, ys):
+        """
+        Function for mapping image coordinates to the flat indices
+        (row * columns + column) of the squares containing them. Coordinates
+        outside of the field are mapped to -1.
+        """
+
+        columns = self.axis_indices(xs, self.origin[0], self.pitch[0])
+        rows = self.axis_indices(ys, self.origin[1], self.pitch[1])
+        inside = (columns >= 0) & (columns < self.columns) & (rows >= 0) & (rows < self.rows)
+
+        return np.where(inside, rows * self.columns + columns, -1)
+
+    def axis_indices(self, values, origin, pitch):
+        """
+        Function for mapping coordinates along a single axis to the indices of
+        the rows (or columns) containing them. Integer arithmetic with the
+        pitch in fixed point (1/256 pixel) is used:
+        floor((value - origin) / pitch + 0.5) == ((value - origin) * 2 + pitch) // (pitch * 2)
+        """
+
+        fixed_pitch = max(1, int(round(pitch * self._fixed_point_scale)))
+        offsets = (np.rint(values).astype(np.int64) - int(round(origin))) * (2 * self._fixed_point_scale)
+
+        return (offsets + fixed_pitch) // (2 * fixed_pitch)
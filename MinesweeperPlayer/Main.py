@@ -1,10 +1,50 @@
-from GameManager import *
 from logging.config import fileConfig
 
+import argparse
+import os
+
 def main():
+    parser = argparse.ArgumentParser(description = "Automatically plays the Windows (7) Minesweeper game.")
+    parser.add_argument("--record", metavar = "PATH", help = "record the session to an archive")
+    parser.add_argument("--replay", metavar = "PATH", help = "replay a recorded session without the game")
+    parser.add_argument("--benchmark", metavar = "PATH", help = "benchmark the recognition and write the results (JSON) to PATH")
+    parser.add_argument("--corpus", metavar = "PATH", action = "append", default = [], help = "recorded session used by the benchmark instead of the synthetic boards")
+    parser.add_argument("--simulate", metavar = "MODE", choices = ["beginner", "intermediate", "expert"], help = "play simulated games of a mode without the game (beginner, intermediate or expert)")
+    parser.add_argument("--games", metavar = "N", type = int, default = 100, help = "number of simulated games (default: 100)")
+    parser.add_argument("--debug-output", metavar = "SINK", choices = ["window", "disk", "null"], default = "window", help = "where the recognition results are drawn to: a window, images in the debug_output folder or nowhere (default: window)")
+    parser.add_argument("--workers", metavar = "N", type = int, default = os.cpu_count() or 1, help = "number of processes calculating the probabilities of large frontiers (default: number of cores)")
+    parser.add_argument("--deadline", metavar = "SECONDS", type = float, default = 2.0, help = "time given for calculating the probabilities of a single guess")
+    arguments = parser.parse_args()
+
     fileConfig("logging_config.ini")
-    manager = GameManager()
-    manager.run()
+
+    # Replaying, benchmarking and simulating do not need the game window (nor Windows).
+    if arguments.simulate is not None:
+        from Simulator import Simulator
+
+        simulator = Simulator.from_mode(arguments.simulate, worker_count = arguments.workers, deadline = arguments.deadline)
+        simulator.run(arguments.games)
+        simulator.close()
+    elif arguments.benchmark is not None:
+        from Benchmark import Benchmark
+
+        benchmark = Benchmark()
+        if len(arguments.corpus) == 0:
+            benchmark.add_synthetic_corpora()
+        for path in arguments.corpus:
+            benchmark.add_session_corpus(path)
+        Benchmark.save(benchmark.run(), arguments.benchmark)
+    elif arguments.replay is not None:
+        from SessionReplay import SessionReplay
+
+        replay = SessionReplay(arguments.replay)
+        replay.run()
+        replay.close()
+    else:
+        from GameManager import GameManager
+
+        manager = GameManager(arguments.record, arguments.workers, arguments.deadline, arguments.debug_output)
+        manager.run()
 
 # Needed for preventing recursive calls.
 if __name__ == "__main__":
@@ -1,11 +1,13 @@
-from Window import *
-from Square import *
-from pathlib import Path
+from Board import *
+from Lattice import *
+from CellClassifier import *
+from TemplateBank import *
+from Frame import *
+from ScaleDiscovery import *
+from DebugRenderer import *
 
 import cv2
 import numpy as np
-import imutils
-import os
 import logging as l
 
 _unchecked_keys = [
@@ -17,6 +19,12 @@ _checked_keys = [
 _utility_keys = [
     "finished"
 ]
+_mine_keys = [
+    "mine"
+]
+_digit_keys = [
+    "d0", "d1", "d2", "d3", "d4", "d5", "d6", "d7", "d8", "d9"
+]
 
 class OpenCV:
     """
@@ -25,12 +33,10 @@ class OpenCV:
     template matching.
     """
 
-    # Properties used for displaying the OpenCV results in a separate window.
+    # Properties used for displaying the OpenCV results in a separate window. 
+    # The results are drawn by a background thread.
     _show_template_matching_results = True
-    _unchecked_window_name = "Unchecked Window Result"
-    _checked_window_name = "Checked Window Result"
-    _unchecked_image = None
-    _checked_image = None
+    _debug_renderer = None
 
     # Paths to the templates that are being used for template matching.
     _template_paths = {
@@ -45,12 +51,31 @@ class OpenCV:
         _checked_keys[5]: "resources/squares_checked/square_6.png",
         _checked_keys[6]: "resources/squares_checked/square_7.png",
         _checked_keys[7]: "resources/squares_checked/square_8.png",
-        _utility_keys[0]: "resources/utilities/finished.png"
+        _mine_keys[0]: "resources/squares_checked/square_mine.png",
+        _utility_keys[0]: "resources/utilities/finished.png",
+        _digit_keys[0]: "resources/digits/digit_0.png",
+        _digit_keys[1]: "resources/digits/digit_1.png",
+        _digit_keys[2]: "resources/digits/digit_2.png",
+        _digit_keys[3]: "resources/digits/digit_3.png",
+        _digit_keys[4]: "resources/digits/digit_4.png",
+        _digit_keys[5]: "resources/digits/digit_5.png",
+        _digit_keys[6]: "resources/digits/digit_6.png",
+        _digit_keys[7]: "resources/digits/digit_7.png",
+        _digit_keys[8]: "resources/digits/digit_8.png",
+        _digit_keys[9]: "resources/digits/digit_9.png"
     }
     _used_unchecked_template_key = _unchecked_keys[0]
 
-    # {key: template, ...}
-    _templates = {}
+    # Canny parameters used for matching the numbers and the end screen.
+    _checked_canny_params = (275, 320)
+    _finished_canny_params = (100, 150)
+
+    # Compiled templates including their edge variants.
+    _templates = None
+
+    # Scale of the templates matching the window. Discovered once and 
+    # used for all following matches.
+    _scale = None
 
     # Thresholds for the different kinds of template matchings that 
     # are performed by this class.
@@ -66,7 +91,18 @@ class OpenCV:
         _checked_keys[5]: 0.69,
         _checked_keys[6]: 0.69,
         _checked_keys[7]: 0.75,
-        _utility_keys[0]: 0.69
+        _mine_keys[0]: 0.65,
+        _utility_keys[0]: 0.69,
+        _digit_keys[0]: 0.7,
+        _digit_keys[1]: 0.7,
+        _digit_keys[2]: 0.7,
+        _digit_keys[3]: 0.7,
+        _digit_keys[4]: 0.7,
+        _digit_keys[5]: 0.7,
+        _digit_keys[6]: 0.7,
+        _digit_keys[7]: 0.7,
+        _digit_keys[8]: 0.7,
+        _digit_keys[9]: 0.7
     }
 
     # Mapped values for the different squares.
@@ -86,29 +122,128 @@ class OpenCV:
     _coord_top_left = None
     _coord_bottom_right = None
 
+    # Lattice of the game field. Once it is known, the squares are recognized 
+    # by the classifier instead of sweeping the templates over the whole image.
+    _lattice = None
+    _cell_classifier = None
+    # The previously classified field (cropped image and values). Only squares 
+    # whose tiles differ from the previous image are classified again.
+    _previous_cropped_image = None
+    _previous_values = None
+    # Coordinates of the squares along the lattice, shared by all boards.
+    _board_coordinates = None
+    # Ratio of changed squares above which the whole field is classified.
+    _max_changed_ratio = 0.5
+
     def __init__(self):
-        self.load_templates()
+        edge_variants = [(key, self._checked_canny_params) for key in _checked_keys]
+        edge_variants.append((_utility_keys[0], self._finished_canny_params))
 
-    def load_templates(self):
+        # The templates are loaded on first access. The digits of the counters
+        # are optional, the counters are not read without them.
+        self._templates = TemplateBank(self._template_paths, edge_variants, optional_keys = _digit_keys)
+        self._debug_renderer = DebugRenderer(is_enabled = self._show_template_matching_results)
+
+    def set_show_template_matching_results(self, show):
+        """
+        Function for enabling or disabling the display of the results at runtime.
+        """
+
+        self._show_template_matching_results = show
+        self._debug_renderer.set_enabled(show)
+
+    def set_debug_sink(self, sink, output_dir = None):
+        """
+        Function for choosing where the results are displayed (see the sinks 
+        of the DebugRenderer).
+        """
+
+        self._debug_renderer.set_sink(sink, output_dir)
+
+    def close(self):
         """
-        Function for loading the templates from the resource folder.
+        Function for stopping the display of the results.
         """
 
-        self._templates.clear()
-        current_dir = os.getcwd()
+        self._debug_renderer.stop()
+
+    def load_templates(self):
+        """
+        Function for loading the templates from the resource folder, ignoring 
+        any previously compiled templates.
+        """
 
         l.info("Loading templates...")
+        self._templates.load(use_cache = False)
+
+    def set_lattice(self, lattice):
+        """
+        Function for setting the lattice of the game field. All following 
+        extractions classify the squares along this lattice.
+        """
+
+        l.info("Using lattice: origin={}, pitch={}, {} rows, {} columns".format(lattice.origin, lattice.pitch, lattice.rows, lattice.columns))
+
+        unchecked_templates = {key: self._templates.scaled(key, self.get_scale()) for key in _unchecked_keys}
+        checked_edges = {key: self._templates.scaled(key, self.get_scale(), self._checked_canny_params) for key in _checked_keys}
+        mine_templates = {key: self._templates.scaled(key, self.get_scale()) for key in _mine_keys}
+
+        self._lattice = lattice
+        self._cell_classifier = CellClassifier(lattice, unchecked_templates, checked_edges, mine_templates, self._thresholds, self._mapped_values, canny_params = self._checked_canny_params)
+        self._board_coordinates = Board.create_coordinates(lattice)
+        self._previous_cropped_image = None
+        self._previous_values = None
+
+    def reset_lattice(self):
+        """
+        Function for forgetting the lattice (and the coordinates) of the game 
+        field such that they are derived from the next image again.
+        """
 
-        # Check all paths and their corresponding templates.
-        for key, path in self._template_paths.items():
-            try:
-                complete_path = str(Path(current_dir) / path)
-                template = cv2.imread(complete_path, 0)
-                
-                l.debug(f"- {path}")
-                self._templates[key] = template
-            except Exception as e:
-                l.error(f"Exception while loading {path}: {e}")
+        self._lattice = None
+        self._cell_classifier = None
+        self._board_coordinates = None
+        self._previous_cropped_image = None
+        self._previous_values = None
+        self._coord_top_left = None
+        self._coord_bottom_right = None
+
+    def get_lattice(self):
+        """
+        Function for retrieving the lattice of the game field (None if it is 
+        not known yet).
+        """
+
+        return self._lattice
+
+    def get_scale(self):
+        """
+        Function for retrieving the scale of the templates. Templates are used 
+        unscaled until the scale is discovered.
+        """
+
+        return 1.0 if self._scale is None else self._scale
+
+    def lock_scale(self, image):
+        """
+        Function for discovering the scale of the templates using the unchecked 
+        squares of the provided image. All templates are rescaled once and 
+        the scale is used for all following matches.
+        """
+
+        gray_image = Frame.of(image).gray()
+        template = self._templates.gray(self._used_unchecked_template_key)
+        scale, score = ScaleDiscovery().discover(gray_image, template)
+        self._scale = scale
+
+        # Rescale all templates once such that no resizing is necessary later on.
+        for key in self._template_paths.keys():
+            if self._templates.has(key):
+                self._templates.scaled(key, scale)
+        for key in _checked_keys:
+            self._templates.scaled(key, scale, self._checked_canny_params)
+        self._templates.scaled(_utility_keys[0], scale, self._finished_canny_params)
+        self._templates.save_if_changed()
 
     def init_image_coordinates(self, image):
         """
@@ -132,26 +267,9 @@ class OpenCV:
         """
 
         # Find top left and bottom right coordinates.
-        top_left = None
-        bottom_right = None
-
-        for point in points:
-            point_bottom_x = point[0] + additional_width
-            point_bottom_y = point[1] + additional_height
-
-            if top_left is None:
-                top_left = point
-            if bottom_right is None:
-                bottom_right = point_bottom_x, point_bottom_y
-
-            if point[0] < top_left[0]:
-                top_left = point[0], top_left[1]
-            if point[1] < top_left[1]:
-                top_left = top_left[0], point[1]
-            if point_bottom_x >= bottom_right[0]:
-                bottom_right = point_bottom_x, bottom_right[1]
-            if point_bottom_y >= bottom_right[1]:
-                bottom_right = bottom_right[0], point_bottom_y
+        points = np.asarray(points).reshape(-1, 2)
+        top_left = tuple(int(value) for value in points.min(axis = 0))
+        bottom_right = tuple(int(value) for value in points.max(axis = 0) + (additional_width, additional_height))
 
         l.info("Updating field dimensions to {}, {}".format(top_left, bottom_right))
 
@@ -161,27 +279,26 @@ class OpenCV:
     def prepare_image(self, image, use_canny = False, canny_params = (50, 200), use_cropped_image = False):
         """
         Function for converting a taken screenshot of the game's
-        window into a usable form.
+        window into a usable form. The conversions are cached by the 
+        frame such that repeated calls do not convert the image again.
         """
 
+        frame = Frame.of(image)
+
         # Crop the image if necessary. Can be used for correctly match 
         # numbers on the screen.
+        bbox = None
         if use_cropped_image:
-            image = image.crop((*self._coord_top_left, *self._coord_bottom_right))
-
-        # Convert PIL image to opencv one.
-        open_cv_image = np.array(image) 
-        # Convert RGB to BGR 
-        open_cv_image = open_cv_image[:, :, ::-1].copy() 
-        # Grayscale the image in order to work with the loaded template.
-        gray_image = cv2.cvtColor(open_cv_image, cv2.COLOR_BGR2GRAY)
+            bbox = (*self._coord_top_left, *self._coord_bottom_right)
 
         # Usage of the canny edge detection algorithm is advised when 
         # matching numbers.
         if use_canny:
-            gray_image = cv2.Canny(gray_image, *canny_params)
-        
-        return (open_cv_image, gray_image)
+            gray_image = frame.edges(canny_params, bbox)
+        else:
+            gray_image = frame.gray(bbox)
+
+        return (frame.bgr(bbox), gray_image)
 
     def is_finished(self, image):
         """
@@ -192,8 +309,7 @@ class OpenCV:
         l.debug("Checking if game is finished...")
 
         open_cv_image, gray_image = self.prepare_image(image, use_canny = True)
-        template = self._templates[_utility_keys[0]]
-        template = cv2.Canny(template, 100, 150)
+        template = self._templates.scaled(_utility_keys[0], self.get_scale(), self._finished_canny_params)
 
         # Template matching
         result = cv2.matchTemplate(gray_image, template, cv2.TM_CCOEFF_NORMED)
@@ -203,158 +319,153 @@ class OpenCV:
         # Any locations indicate that the end screen is being shown.
         return len(points) > 0
 
+    def has_digit_templates(self):
+        """
+        Function for checking whether the templates of all digits of the
+        counters are available.
+        """
+
+        return all(self._templates.has(key) for key in _digit_keys)
+
+    def match_digits(self, gray_image):
+        """
+        Function for matching the digits of a counter in a (small) grayscale 
+        image. Overlapping matches of different digits are resolved by their 
+        score. Returns the digits ordered from left to right.
+        """
+
+        matches = []
+        for digit, key in enumerate(_digit_keys):
+            template = self._templates.scaled(key, self.get_scale())
+            template_height, template_width = template.shape[:2]
+            if gray_image.shape[0] < template_height or gray_image.shape[1] < template_width:
+                return []
+
+            result = cv2.matchTemplate(gray_image, template, cv2.TM_CCOEFF_NORMED)
+            for x, y in self.find_peaks(result, self._thresholds[key], max(template_height, template_width)):
+                matches.append((float(result[y, x]), int(x), digit, template_width))
+
+        # The best match of each position is kept.
+        digits = []
+        for score, x, digit, width in sorted(matches, reverse = True):
+            if all(abs(x - other_x) >= width // 2 for other_x, _ in digits):
+                digits.append((x, digit))
+
+        return [digit for _, digit in sorted(digits)]
+
     def get_field_information(self, image):
         """
         Function for extracting the game information (values, bombs, checked / unchecked)
-        from a provided image.
+        from a provided image. The result is a Board.
         """
         
         l.debug("Extracting field information...")
 
-        # The coordinates need to be set once in order for the checked 
-        # template matching to properly work.
-        if self._coord_top_left is None or self._coord_bottom_right is None:
-            self.init_image_coordinates(image)
-
-        # Results of the different template matchings must be combined in order to 
-        # properly display them all.
-        results_unchecked = self.extract_unchecked(image)
-        results_checked = self.extract_checked(image)
-        results = {**results_unchecked, **results_checked}
-
-        # Filter all points based on their coordinates such that no points 
-        # of the same type overlap.
-        filtered_results = {}
-        for key in results.keys():
-            l.debug("Filtering for key '{}'".format(key))
+        # All extractions share the conversions of the same frame.
+        image = Frame.of(image)
 
-            ratio, points, template = results[key]
-            tolerance = int(ratio * max(*template.shape[::-1]))
-            width, height = template.shape[::-1]
-            filtered_points = self.filter_points(points, width, height, distance_tolerance = tolerance)
-            filtered_results[key] = ratio, filtered_points, template
-
-        # Create a matrix of squares that represents the game field.
-        square_tuples = self.transform_into_square_tuples(filtered_results)
-        square_matrix = self.transform_into_square_matrix(square_tuples)
+        # Once the lattice is known, all squares are classified at once.
+        if self._cell_classifier is not None:
+            board = self.classify_squares(image)
+        else:
+            board = self.match_squares(image)
 
         # Crude display of the result.
-        l.debug("Extraction results: {} rows with {} columns".format(len(square_matrix), list(map(lambda x: len(x), square_matrix))))
-        for row in square_matrix:
-            line = ""
-            for column in row:
-                if column.is_unchecked:
-                    line += "?"
-                else:
-                    line += str(column.value)
-            l.debug(line)
-
-        # OpenCV window for template matching results.
-        if self._show_template_matching_results:
-            self._unchecked_image = self.prepare_image(image)[0]
-            self._checked_image = self.prepare_image(image)[0]
-
-            for key, (ratio, points, template) in filtered_results.items():
-                if key in _unchecked_keys:
-                    self.display_centers(self._unchecked_image, points)
-                elif key in _checked_keys:
-                    self.display_centers(self._checked_image, points)
+        if l.getLogger().isEnabledFor(l.DEBUG):
+            l.debug("Extraction results: {} rows with {} columns".format(board.rows, board.columns))
+            for line in board.to_lines():
+                l.debug(line)
 
-            cv2.imshow(self._unchecked_window_name, self._unchecked_image)
-            cv2.imshow(self._checked_window_name, self._checked_image)
-            cv2.moveWindow(self._unchecked_window_name, 10, 10)
-            cv2.moveWindow(self._checked_window_name, 650, 10)
-            cv2.waitKey(1)
+        # OpenCV window for template matching results. Drawing happens in the 
+        # background such that the recognition is not slowed down.
+        if self._show_template_matching_results:
+            self._debug_renderer.submit(image, board)
 
-        return square_matrix
+        return board
 
-    def transform_into_square_tuples(self, template_matching_results):
+    def classify_squares(self, image):
         """
-        Function for transforming all points into Squares. Does NOT remove 
-        the ratio and template information since they are needed later on.
+        Function for classifying all squares along the lattice of the game 
+        field. The result is always the complete field.
         """
 
-        square_tuples = []
+        frame = Frame.of(image)
+        gray_image = frame.gray()
+        rgb_image = frame.rgb()
+        cropped_image = self._cell_classifier.crop(gray_image)
+
+        # Only the squares that changed since the previous image must be 
+        # classified. All others keep their previous values.
+        if self._previous_values is None:
+            values = self._cell_classifier.classify(gray_image, rgb_image = rgb_image)
+        else:
+            changed_squares = self._cell_classifier.find_changed_squares(self._previous_cropped_image, cropped_image)
+            l.debug("{} squares changed.".format(len(changed_squares)))
 
-        for key in template_matching_results.keys():
-            ratio, points, template = template_matching_results[key]
-            for point in points:
-                square = Square(point)
+            if len(changed_squares) > self._max_changed_ratio * self._previous_values.size:
+                values = self._cell_classifier.classify(gray_image, rgb_image = rgb_image)
+            else:
+                values = self._previous_values.copy()
+                if len(changed_squares) > 0:
+                    values.flat[changed_squares] = self._cell_classifier.classify(gray_image, changed_squares, rgb_image)
 
-                if key in _unchecked_keys:
-                    square.is_unchecked = True
-                    square.value = None
-                elif key in _checked_keys:
-                    square.is_unchecked = False
-                    square.value = self._mapped_values[key]
-                square_tuples.append((ratio, template, square))
+        self._previous_cropped_image = cropped_image
+        self._previous_values = values
 
-        return square_tuples
+        return Board(values, self._board_coordinates)
 
-    def transform_into_square_matrix(self, square_tuples):
+    def match_squares(self, image):
         """
-        Function for creating a matrix (list of lists) that represents the 
-        game's field (accessible by: [row][column]).
+        Function for extracting the squares by template matching the whole 
+        image. The matches are placed on the lattice, which is derived from the 
+        first image if it is not known yet.
         """
 
-        # Sorted by rows (Y).
-        sorted_square_tuples = sorted(square_tuples, key = lambda square_tuple: square_tuple[2].center_coordinates[1])
-
-        # Y values can differ. Therefore they must be normalized for each row 
-        # such that only a single value exists for each one.
-        template_heights = map(lambda tuple: tuple[1].shape[0] * tuple[0], square_tuples)
-        # The distance at which rows are combined.
-        combine_distance = int(max(*template_heights) / 2)
-        adjusted_squares = []
-        current_row_y = None
-        current_row_index = 0
+        # The scale of the templates must be known before matching them.
+        if self._scale is None:
+            self.lock_scale(image)
 
-        for square_tuple in sorted_square_tuples:
-            ratio, template, square = square_tuple
-
-            # First entry to be adjusted.
-            if current_row_y is None:
-                current_row_y = square.center_coordinates[1]
-                adjusted_squares.append([square])
-            else:
-                square_y = square.center_coordinates[1]
-                y_difference = square_y - current_row_y
+        # The coordinates need to be set once in order for the checked 
+        # template matching to properly work.
+        if self._coord_top_left is None or self._coord_bottom_right is None:
+            self.init_image_coordinates(image)
 
-                # Same row (works the same if the square_y is smaller than the 
-                # current_row_y).
-                if y_difference < combine_distance:
-                    square.center_coordinates = square.center_coordinates[0], current_row_y
-                    adjusted_squares[current_row_index].append(square)
-                # Next row below the current one.
-                else:
-                    current_row_index += 1
-                    current_row_y = square.center_coordinates[1]
-                    adjusted_squares.append([square])
+        # Results of the different template matchings must be combined in order to 
+        # properly display them all.
+        results_unchecked = self.extract_unchecked(image)
+        results_checked = self.extract_checked(image)
+        results = {**results_unchecked, **results_checked}
 
-        # Sort by columns (X)
-        # Note:
-        # The X values still differ from row to row as only the Y ones are normalized!
-        for row in adjusted_squares:
-            row.sort(key = lambda square: square.center_coordinates[0])
+        # The lattice is derived from the unchecked squares of the first image.
+        if self._lattice is None:
+            ratio, points, template = results_unchecked[self._used_unchecked_template_key]
+            minimum_distance = min(self._templates.scaled(self._used_unchecked_template_key, self.get_scale()).shape) / 2
+            self.set_lattice(Lattice.from_points(points[:, 0], points[:, 1], minimum_distance))
 
-        return adjusted_squares
+        return self.place_squares(results)
 
-    def display_squares(self, open_cv_image, adjusted_squares, color = (0, 0, 255)):
+    def place_squares(self, template_matching_results):
         """
-        Function for displaying squares in a single window.
+        Function for placing all matched points on the lattice. The row and 
+        column of each point are calculated directly from its coordinates. 
+        Squares without any match are checked ones without value (0).
         """
 
-        for rect in adjusted_squares:
-            cv2.rectangle(open_cv_image, rect[0], rect[1], color, 1)
+        states = np.zeros((self._lattice.rows, self._lattice.columns), np.int8)
 
-    def display_centers(self, open_cv_image, centers, color = (255, 0, 0), radius = 2):
-        """
-        Function for displaying centers in a single window.
-        """
+        for key, (ratio, points, template) in template_matching_results.items():
+            if len(points) == 0:
+                continue
 
-        for center in centers:
-            circle_center = (center[0] - radius // 2, center[1] - radius // 2)
-            cv2.circle(open_cv_image, circle_center, radius, color, -1)
+            if key in _unchecked_keys:
+                state = Board.unchecked_value
+            else:
+                state = self._mapped_values[key]
+
+            indices = self._lattice.square_indices(points[:, 0], points[:, 1])
+            states.flat[indices[indices >= 0]] = state
+
+        return Board(states, self._board_coordinates)
 
     def extract_unchecked(self, image):
         """
@@ -371,7 +482,7 @@ class OpenCV:
         as well as the scling ratio for them.
         """
 
-        result_numbers = self.extract(image, _checked_keys, use_canny = True, canny_params = (275, 320), use_cropped_image = True)
+        result_numbers = self.extract(image, _checked_keys, use_canny = True, canny_params = self._checked_canny_params, use_cropped_image = True)
 
         # Adjust the points since a cropped image is used. The coordinates 
         # received previously do not match the uncropped image.
@@ -383,7 +494,7 @@ class OpenCV:
         result = dict(adjusted_result_numbers)
         return result
 
-    def extract(self, image, keys, adjust_points_to_match_image = True, use_canny = False, canny_params = (50, 200), use_cropped_image = False):
+    def extract(self, image, keys, use_canny = False, canny_params = (50, 200), use_cropped_image = False):
         """
         Function for extracting points by applying a template match on 
         a provided image with a templated accessible via the provided 
@@ -393,19 +504,15 @@ class OpenCV:
         results = {}
 
         for key in keys:
-            template = self._templates[key]
+            template = self._templates.gray(key)
 
             l.debug("Extracting: {}".format(key))
 
-            # Use the opencv template matching for finding the desired points.
+            # Use the opencv template matching for finding the desired points. 
+            # The ratio is returned as well (template shape * ratio = used shape).
             open_cv_image, gray_image = self.prepare_image(image, use_canny = use_canny, canny_params = canny_params, use_cropped_image = use_cropped_image)
             points, ratio = self.match_scaling_with_template(key, gray_image, use_canny = use_canny, canny_params = canny_params)
 
-            # When adjusting the points, only the points themselves are of interest 
-            # since the ratio is also returned (template shape * ratio = used shape).
-            if adjust_points_to_match_image:
-                points, width, height = self.adjust_template_values_based_on_ratio(points, ratio, key)
-
             results[key] = ratio, points, template
 
         return results
@@ -413,50 +520,22 @@ class OpenCV:
     def match_scaling_with_template(self, template_key, gray_image, convert_to_center = True, use_canny = False, canny_params = (50, 200)):
         """
         Function for matching the image with the template accessible by 
-        the provided template_key. This function scales the image in 
-        order to match different window sizes with the same template.
+        the provided template_key. The template is scaled by the discovered 
+        scale in order to match different window sizes with the same template.
         """
 
         threshold = self._thresholds[template_key]
-        best_matching = None
-        template = self._templates[template_key]
-        template_height, template_width = template.shape[:2]
-
-        ## Gradually scale the image down.
-        #for scale in np.linspace(0.1, 1.0, 20)[::-1]:
-        #    # Resize the image in order to match the template's size.
-        #    # shape[1] is the width of the image
-        #    resized_gray_image = imutils.resize(gray_image, int(gray_image.shape[1] * scale))
-        #    ratio = gray_image.shape[1] / float(resized_gray_image.shape[1])
-
-        #    # Image must not be smaller than the template.
-        #    if resized_gray_image.shape[0] < template_height or resized_gray_image.shape[1] < template_width:
-        #        break
-
-        #    # Usage of the canny edge detection algorithm is advised when 
-        #    # matching numbers.
-        #    if use_canny:
-        #        template = cv2.Canny(template, *canny_params)
-
-        #    # Template matching.
-        #    result = cv2.matchTemplate(resized_gray_image, template, cv2.TM_CCOEFF_NORMED)
-        #    locations = np.where(result >= threshold)
-        #    points = list(zip(*locations[::-1]))
-
-        #    # All of the squares must be matched (Error prone!).
-        #    if best_matching is None or len(best_matching[0]) < len(points):
-        #        best_matching = points, ratio
 
         # Usage of the canny edge detection algorithm is advised when 
         # matching numbers.
-        if use_canny:
-            template = cv2.Canny(template, *canny_params)
+        template = self._templates.scaled(template_key, self.get_scale(), canny_params if use_canny else None)
+        template_height, template_width = template.shape[:2]
 
-        # Template matching.
+        # Template matching. Each match produces a cluster of high values in 
+        # the result. Only the maximum of each cluster is of interest.
         result = cv2.matchTemplate(gray_image, template, cv2.TM_CCOEFF_NORMED)
-        locations = np.where(result >= threshold)
-        points = list(zip(*locations[::-1]))
-        best_matching = points, 1.0
+        points = self.find_peaks(result, threshold, max(template_height, template_width))
+        best_matching = points, self.get_scale()
 
         l.debug("Best matching: {} points, {} ratio".format(len(best_matching[0]), best_matching[1]))
 
@@ -474,9 +553,9 @@ class OpenCV:
         centers using a template.
         """
 
-        template = self._templates[template_key]
+        template = self._templates.scaled(template_key, self.get_scale())
         template_width, template_height = template.shape[::-1]
-        centers = list(map(lambda point: (point[0] + template_width // 2, point[1] + template_height // 2), points))
+        centers = np.asarray(points).reshape(-1, 2) + (template_width // 2, template_height // 2)
 
         return centers
 
@@ -486,30 +565,12 @@ class OpenCV:
         top left corner points using a template.
         """
 
-        template = self._templates[template_key]
+        template = self._templates.scaled(template_key, self.get_scale())
         template_width, template_height = template.shape[::-1]
-        corners = list(map(lambda point: (point[0] - template_width // 2, point[1] - template_height // 2), points))
+        corners = np.asarray(points).reshape(-1, 2) - (template_width // 2, template_height // 2)
 
         return corners
 
-    def adjust_template_values_based_on_ratio(self, points, ratio, template_key):
-        """
-        Function for adjusting the existing template's values based on a 
-        returned ratio. The points and sizes received from the template 
-        matching must be changed to match the base image dimensions. A 
-        template matching a region of the image while the latter is scaled 
-        down must be scaled up in order to properly match it again.
-        """
-
-        template = self._templates[template_key]
-        template_width, template_height = template.shape[::-1]
-        
-        adjusted_points = list(map(lambda point: (int(point[0] * ratio), int(point[1] * ratio)), points))
-        adjusted_width = int(template_width * ratio)
-        adjusted_height = int(template_height * ratio)
-
-        return adjusted_points, adjusted_width, adjusted_height
-
     def adjust_cropped_points(self, points):
         """
         Function for applying the offset created by template matching 
@@ -518,91 +579,27 @@ class OpenCV:
         adjusted.
         """
 
-        adjusted_points = list(map(lambda point: (point[0] + self._coord_top_left[0], point[1] + self._coord_top_left[1]), points))
+        adjusted_points = np.asarray(points).reshape(-1, 2) + self._coord_top_left
         return adjusted_points
 
-    def filter_points(self, points, width, height, distance_tolerance = 6):
-        """
-        Function for filtering the points based on the distance to one another 
-        such that only a single point for each square remains.
-        """
-
-        l.debug("Filtering {} points...".format(len(points)))
-
-        # Calculate the dimensions of the available space.
-        total_width = self._coord_bottom_right[0] - self._coord_top_left[0]
-        total_height = self._coord_bottom_right[1] - self._coord_top_left[1]
-
-        # Generate cubes based on the desired distance between the points.
-        cube_side_length = int(distance_tolerance / 2)
-        cube_count_x = total_width // cube_side_length
-        cube_count_y = total_height // cube_side_length
-
-        # Cube matrix.
-        cubes = []
-        # +1 in both cases to make sure no out of bound exceptions are thrown.
-        for row in range(0, cube_count_y + 1):
-            cubes.append([None for column in range(0, cube_count_x + 1)])
-
-        for point in points:
-            # max is used to prevent accessing indices from the last position (i.e. -1)
-            new_x = max(0, point[0] - self._coord_top_left[0])
-            new_y = max(0, point[1] - self._coord_top_left[1])
-            index_x = new_x // cube_side_length
-            index_y = new_y // cube_side_length
-            cube = cubes[index_y][index_x]
-            
-            # Check the neighbouring cubes.
-            neighbours = [cube]
-            left_x = index_x - 1
-            center_x = index_x
-            right_x = index_x + 1
-            top_y = index_y - 1
-            center_y = index_y
-            bottom_y = index_y + 1
-
-            # Checks are needed since Python does not throw exceptions when 
-            # accessing indices like -1 etc. but instead reads elements from 
-            # the end of the list.
-            # Left side of the target.
-            if left_x >= 0:
-                if top_y >= 0:
-                    neighbours.append(cubes[top_y][left_x])
-                if center_y >= 0:
-                    neighbours.append(cubes[center_y][left_x])
-                if bottom_y < len(cubes):
-                    neighbours.append(cubes[bottom_y][left_x])
-            # Top and bottom of the target.
-            if center_x >= 0:
-                if top_y >= 0:
-                    neighbours.append(cubes[top_y][center_x])
-                if bottom_y < len(cubes):
-                    neighbours.append(cubes[bottom_y][center_x])
-            # Right side of the target.
-            if right_x < len(cubes[0]):
-                if top_y >= 0:
-                    neighbours.append(cubes[top_y][right_x])
-                if center_y >= 0:
-                    neighbours.append(cubes[center_y][right_x])
-                if bottom_y < len(cubes):
-                    neighbours.append(cubes[bottom_y][right_x])
-
-            # Neighbours and the target must be checked in order to determine 
-            # whether the point can be used.
-            point_is_acceptable = True
-            for other_point in neighbours:
-                if other_point is not None:
-                    point_is_acceptable = False
-                    break
-            if point_is_acceptable:
-                cubes[index_y][index_x] = point
-
-        # Extract all points from the cubes.
-        filtered_points = []
-        for row in cubes:
-            for stored_point in row:
-                if stored_point is not None:
-                    filtered_points.append(stored_point)
-
-        l.debug("{} points remain after filtering.".format(len(filtered_points)))
-        return filtered_points
\ No newline at end of file
+    def find_peaks(self, result, threshold, size):
+        """
+        Function for finding the local maxima of a template matching result 
+        that reach the threshold. A point is a local maximum if no other point 
+        within a window of the provided size has a higher value. Returns an 
+        array of (x, y) points.
+        """
+
+        # Plateaus (equal neighbouring values) would produce multiple maxima. A 
+        # tiny ramp, far below any meaningful difference, makes all values 
+        # distinct such that only a single maximum remains per window.
+        ramp = np.arange(result.size, dtype = np.float64).reshape(result.shape)
+        ranked = result.astype(np.float64) - ramp * (1e-9 / result.size)
+
+        # An odd window size keeps the window symmetric around each point.
+        size = size // 2 * 2 + 1
+        dilated = cv2.dilate(ranked, np.ones((size, size), np.uint8))
+        ys, xs = np.nonzero((result >= threshold) & (ranked >= dilated))
+
+        l.debug("Found {} peaks.".format(len(xs)))
+        return np.stack((xs, ys), axis = 1)
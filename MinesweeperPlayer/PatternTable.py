@@ -0,0 +1,214 @@
+from DeductionEngine import *
+from pathlib import Path
+
+import numpy as np
+import os
+import logging as l
+
+class PatternTable:
+    """
+    Lookup table of the deductions of two neighbouring numbers (in the same
+    row or column). Their neighbours lie in a 3x4 window (4x3 for numbers in
+    the same column, which is the transposed one):
+
+    a a b b
+    a A B b
+    a a b b
+
+    Each pattern is described by the remaining mines of both numbers and
+    the unknown squares of the window (10 bits, squares outside the field
+    are never unknown, which covers the edge and corner variants). All
+    patterns are enumerated once: for each, the squares that contain a
+    mine (or no mine) in every valid assignment are stored. The table is
+    written to a file next to the modules (relative paths are resolved
+    against their directory, not the working directory) and generated if
+    the file is missing or outdated.
+    """
+
+    # Must be increased whenever the window or the format changes.
+    _version = 1
+    _path = "pattern_table.npz"
+    _base_path = Path(__file__).resolve().parent
+
+    # Relative (row, column) positions of the window squares for numbers in
+    # the same row, the number A is at (0, 0) and B at (0, 1).
+    horizontal_offsets = [(-1, -1), (-1, 0), (-1, 1), (-1, 2), (0, -1), (0, 2), (1, -1), (1, 0), (1, 1), (1, 2)]
+    # The same squares for numbers in the same column (B at (1, 0)).
+    vertical_offsets = [(column, row) for row, column in horizontal_offsets]
+    # Relative positions of the numbers forming a pair with a number (left,
+    # right, top, bottom).
+    _partner_offsets = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+    # Number of possible remaining mines of a number in the window (0 - 7,
+    # the eighth neighbour is the other number).
+    _max_remaining = 8
+
+    # Indexed by the pattern code (see get_code): bitmasks of the window
+    # squares that are mines and safe as well as whether the pattern has a
+    # valid assignment at all.
+    _mines = None
+    _safe_squares = None
+    _is_valid = None
+
+    _is_loaded = False
+
+    def __init__(self, path = "pattern_table.npz"):
+        self._path = str(self._base_path / path)
+        self._is_loaded = False
+
+    @staticmethod
+    def get_code(remaining_a, remaining_b, bits):
+        """
+        Function for packing a pattern into the index of the table.
+        """
+
+        return (remaining_a * PatternTable._max_remaining + remaining_b) << len(PatternTable.horizontal_offsets) | bits
+
+    def ensure_loaded(self):
+        """
+        Function for loading the table if it was not loaded at the start.
+        """
+
+        if not self._is_loaded:
+            self.load()
+
+    def load(self, use_file = True):
+        """
+        Function for loading the table from its file. It is generated (and
+        the file rewritten) if the file can not be used.
+        """
+
+        if not (use_file and self.load_file()):
+            self.generate()
+            self.save()
+
+        self._is_loaded = True
+
+    def load_file(self):
+        """
+        Function for loading the table from its file. Returns whether the file
+        could be used.
+        """
+
+        if not os.path.isfile(self._path):
+            return False
+
+        try:
+            with np.load(self._path, allow_pickle = False) as table:
+                if int(table["version"]) != self._version:
+                    l.info("Pattern table is outdated.")
+                    return False
+
+                self._mines = table["mines"]
+                self._safe_squares = table["safe_squares"]
+                self._is_valid = table["is_valid"]
+        except Exception as e:
+            l.error("Exception while loading the pattern table: {}".format(e))
+            return False
+
+        l.info("Loaded the pattern table.")
+        return True
+
+    def save(self):
+        """
+        Function for writing the table to its file.
+        """
+
+        try:
+            np.savez_compressed(self._path, version = np.array(self._version), mines = self._mines, safe_squares = self._safe_squares, is_valid = self._is_valid)
+        except Exception as e:
+            l.error("Exception while saving the pattern table: {}".format(e))
+
+    def generate(self):
+        """
+        Function for enumerating all patterns. For each set of unknown
+        squares, all of its subsets (mine assignments) are grouped by the
+        number of mines they place around A and B. Squares contained in all
+        assignments of a group are mines, squares contained in none are safe.
+        """
+
+        l.info("Generating the pattern table...")
+
+        square_count = len(self.horizontal_offsets)
+        # Window squares around A (columns -1 - 1) and B (columns 0 - 2).
+        mask_a = DeductionEngine.to_mask(index for index, (_, column) in enumerate(self.horizontal_offsets) if column <= 1)
+        mask_b = DeductionEngine.to_mask(index for index, (_, column) in enumerate(self.horizontal_offsets) if column >= 0)
+
+        subsets = np.arange(1 << square_count)
+        counts = np.array([DeductionEngine.count(subset) for subset in range(1 << square_count)])
+        counts_a = counts[subsets & mask_a]
+        counts_b = counts[subsets & mask_b]
+
+        size = self._max_remaining * self._max_remaining << square_count
+        self._mines = np.zeros(size, np.uint16)
+        self._safe_squares = np.zeros(size, np.uint16)
+        self._is_valid = np.zeros(size, np.bool_)
+
+        for bits in range(1 << square_count):
+            assignments = subsets[(subsets & ~bits) == 0]
+            groups = counts_a[assignments] * self._max_remaining + counts_b[assignments]
+
+            for group in np.unique(groups):
+                members = assignments[groups == group]
+                remaining_a, remaining_b = divmod(int(group), self._max_remaining)
+                code = self.get_code(remaining_a, remaining_b, bits)
+
+                self._mines[code] = np.bitwise_and.reduce(members)
+                self._safe_squares[code] = bits & ~np.bitwise_or.reduce(members)
+                self._is_valid[code] = True
+
+        l.info("Generated {} patterns.".format(int(self._is_valid.sum())))
+
+    def deduce(self, constraints, candidates, geometry):
+        """
+        Function for looking up the patterns of each candidate constraint
+        and its neighbouring numbers in the same row and column. Constraints
+        are [remaining mines, mask] lists. Returns the masks of the deduced
+        mines and safe squares.
+        """
+
+        self.ensure_loaded()
+
+        horizontal_windows = geometry.get_windows(self.horizontal_offsets)
+        vertical_windows = geometry.get_windows(self.vertical_offsets)
+        partner_windows = geometry.get_windows(self._partner_offsets)
+        mines = 0
+        safe_squares = 0
+
+        for index in candidates:
+            if not(index in constraints):
+                continue
+
+            # (A, B, windows) of the pairs the constraint is part of.
+            left, right, top, bottom = partner_windows[index]
+            pairs = [(left, index, horizontal_windows), (index, right, horizontal_windows), (top, index, vertical_windows), (index, bottom, vertical_windows)]
+
+            for index_a, index_b, windows in pairs:
+                constraint_a = constraints.get(index_a)
+                constraint_b = constraints.get(index_b)
+                if constraint_a is None or constraint_b is None:
+                    continue
+
+                remaining_a, remaining_b = constraint_a[0], constraint_b[0]
+                if not (0 <= remaining_a < self._max_remaining and 0 <= remaining_b < self._max_remaining):
+                    continue
+
+                window = windows[index_a]
+                unknown = constraint_a[1] | constraint_b[1]
+                bits = 0
+                for position, square in enumerate(window):
+                    if square >= 0 and (unknown >> square) & 1:
+                        bits |= 1 << position
+
+                code = self.get_code(remaining_a, remaining_b, bits)
+                if not self._is_valid[code]:
+                    continue
+
+                for position in DeductionEngine.to_indices(int(self._mines[code])):
+                    mines |= 1 << window[position]
+                for position in DeductionEngine.to_indices(int(self._safe_squares[code])):
+                    safe_squares |= 1 << window[position]
+
+        # Contradicting results (i.e. caused by a misrecognized number) are
+        # not used at all.
+        contradictions = mines & safe_squares
+        return mines & ~contradictions, safe_squares & ~contradictions
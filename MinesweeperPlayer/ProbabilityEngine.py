@@ -0,0 +1,619 @@
+from DeductionEngine import *
+
+import math
+import itertools
+import concurrent.futures
+import numpy as np
+import time as t
+import logging as l
+
+class ProbabilityEngine:
+    """
+    Class for calculating the mine probability of every unknown square. The
+    squares next to numbers (the frontier) are split into independent
+    components: constraints that share squares belong to the same one. The
+    valid mine assignments of each component are counted by mine count,
+    using memoization of the remaining constraint values. The components are
+    then combined with the squares not touching any number, which share the
+    mines that are left, such that the result is the exact probability.
+
+    Large components are split at a small set of squares (separator): for
+    each assignment of these, the rest of the component falls apart into
+    independent parts. The parts are enumerated by a pool of worker
+    processes and merged afterwards.
+    """
+
+    # Number of mines of the default game modes {(rows, columns): mines}.
+    default_mine_counts = {
+        (9, 9): 10,
+        (16, 16): 40,
+        (16, 30): 99
+    }
+    # Mine density used for other field sizes (the one of the expert mode).
+    _default_mine_density = 99 / 480
+
+    # Maximum number of memoized states per enumeration. Larger parts are
+    # split at a separator and approximated if this is not possible, which
+    # keeps the cost bounded.
+    _max_states = 20000
+    # Maximum number of squares of a separator (2^size assignments) and the
+    # number of times parts are split again.
+    _max_separator_size = 4
+    _max_split_depth = 3
+    # Components (and parts) of at most this many squares are always counted
+    # exactly, even after the deadline passed. The state limit bounds their
+    # cost.
+    _max_exact_square_count = 16
+
+    # Number of processes enumerating the parts of split components. A
+    # single one enumerates them in the calling process.
+    _worker_count = 1
+    # Seconds given for enumerating all components of one calculation.
+    _deadline = 2.0
+    _executor = None
+
+    def __init__(self, worker_count = 1, deadline = 2.0):
+        self._executor = None
+        self.set_worker_count(worker_count)
+        self.set_deadline(deadline)
+
+    @staticmethod
+    def get_default_mine_count(rows, columns):
+        """
+        Function for retrieving the number of mines of a field of the provided
+        size (the default game modes or the density of the expert mode).
+        """
+
+        if (rows, columns) in ProbabilityEngine.default_mine_counts:
+            return ProbabilityEngine.default_mine_counts[rows, columns]
+        return int(round(rows * columns * ProbabilityEngine._default_mine_density))
+
+    def set_worker_count(self, worker_count):
+        """
+        Function for setting the number of worker processes. A single one
+        enumerates everything in the calling process.
+        """
+
+        self.close()
+        self._worker_count = max(1, worker_count)
+
+    def set_deadline(self, deadline):
+        """
+        Function for setting the time (in seconds) the enumeration of all
+        components may take. Components that are not finished in time are
+        approximated.
+        """
+
+        self._deadline = deadline
+
+    def close(self):
+        """
+        Function for stopping the worker processes.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait = False)
+            self._executor = None
+
+    def get_executor(self):
+        """
+        Function for retrieving the pool of worker processes, which is only
+        started once it is needed.
+        """
+
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers = self._worker_count)
+        return self._executor
+
+    def calculate(self, knowledge_base, mine_count):
+        """
+        Function for calculating the mine probabilities of all unknown squares
+        of the knowledge base. Returns {index: probability}.
+        """
+
+        unknown_squares = knowledge_base.unknown_squares().tolist()
+        if len(unknown_squares) == 0:
+            return {}
+
+        constraints = knowledge_base.constraints
+        components = self.find_components(constraints)
+        frontier = set()
+        for squares, _ in components:
+            frontier.update(squares)
+        interior_squares = [index for index in unknown_squares if index not in frontier]
+
+        # Distribution of each component: (ways by mine count, ways with a
+        # mine for each square by mine count).
+        local_components = [self.to_local_constraints(squares, component_constraints, constraints) for squares, component_constraints in components]
+        distributions = self.enumerate_components(local_components)
+
+        remaining_mines = mine_count - len(knowledge_base.mines)
+        probabilities = self.combine(distributions, components, len(interior_squares), remaining_mines)
+
+        interior_probability = probabilities.pop(None, 0.0)
+        for index in interior_squares:
+            probabilities[index] = interior_probability
+
+        return probabilities
+
+    def find_components(self, constraints):
+        """
+        Function for splitting the constraints into independent components.
+        Returns a list of (ordered squares, constraint indices) tuples.
+        """
+
+        # Constraints of each frontier square.
+        square_constraints = {}
+        for constraint_index, (remaining, mask) in constraints.items():
+            for index in DeductionEngine.to_indices(mask):
+                square_constraints.setdefault(index, []).append(constraint_index)
+
+        components = []
+        visited = set()
+        for start in sorted(square_constraints.keys()):
+            if start in visited:
+                continue
+
+            # Breadth first search, the resulting order keeps squares sharing
+            # constraints close to each other.
+            squares = [start]
+            component_constraints = set()
+            visited.add(start)
+            position = 0
+            while position < len(squares):
+                for constraint_index in square_constraints[squares[position]]:
+                    if constraint_index in component_constraints:
+                        continue
+                    component_constraints.add(constraint_index)
+                    for index in DeductionEngine.to_indices(constraints[constraint_index][1]):
+                        if index not in visited:
+                            visited.add(index)
+                            squares.append(index)
+                position += 1
+
+            components.append((squares, sorted(component_constraints)))
+
+        return components
+
+    def to_local_constraints(self, squares, component_constraints, constraints):
+        """
+        Function for converting the constraints of a component into
+        (remaining mines, positions of its squares in the component) tuples.
+        This compact form is the one sent to the worker processes. Returns
+        the number of squares and the converted constraints.
+        """
+
+        positions = {index: position for position, index in enumerate(squares)}
+        local_constraints = []
+        for constraint_index in component_constraints:
+            remaining, mask = constraints[constraint_index]
+            local_constraints.append((remaining, tuple(positions[index] for index in DeductionEngine.to_indices(mask))))
+        return len(squares), local_constraints
+
+    def enumerate_components(self, local_components):
+        """
+        Function for enumerating all components. The ones exceeding the state
+        limit are split and their parts enumerated by the worker processes if
+        there are any.
+        Components that fail (no valid assignment, not finished before the
+        deadline) are approximated. Small ones are never stopped by the
+        deadline.
+        """
+
+        # Absolute time (shared by all processes) at which the enumeration stops.
+        deadline = t.time() + self._deadline
+        distributions = [None] * len(local_components)
+        # {component position: (separator, [(assignment, [(positions, future)])])}
+        pending = {}
+
+        for position, (square_count, local_constraints) in enumerate(local_components):
+            distributions[position] = self.count_assignments(square_count, local_constraints, self._max_states, deadline)
+            if distributions[position] is not None:
+                continue
+
+            # Components exceeding the state limit are split. Their parts are
+            # enumerated by the workers while the others are enumerated here.
+            if self._worker_count <= 1:
+                distributions[position] = self.enumerate_parts(square_count, local_constraints, self._max_states, self._max_split_depth, deadline)
+                continue
+
+            split = self.split(square_count, local_constraints)
+            if split is None:
+                continue
+
+            separator, assignments = split
+            submitted = []
+            for assignment, parts in assignments:
+                futures = [(part_positions, self.get_executor().submit(ProbabilityEngine.enumerate_local, part_count, part_constraints, self._max_states, self._max_split_depth - 1, deadline)) for part_positions, part_count, part_constraints in parts]
+                submitted.append((assignment, futures))
+            pending[position] = (separator, submitted)
+
+        if len(pending) > 0:
+            futures = [future for _, submitted in pending.values() for _, parts in submitted for _, future in parts]
+            _, not_done = concurrent.futures.wait(futures, timeout = max(0.0, deadline - t.time()))
+            for future in not_done:
+                future.cancel()
+
+            for position, (separator, submitted) in pending.items():
+                if any(future in not_done for _, parts in submitted for _, future in parts):
+                    l.warning("Component of {} squares was not enumerated before the deadline.".format(local_components[position][0]))
+                    continue
+
+                results = [(assignment, [(part_positions, future.result()) for part_positions, future in parts]) for assignment, parts in submitted]
+                distributions[position] = self.merge(local_components[position][0], separator, results)
+
+        for position, distribution in enumerate(distributions):
+            if distribution is None or distribution[0].max() <= 0.0:
+                l.warning("Component of {} squares is approximated.".format(local_components[position][0]))
+                distributions[position] = self.approximate(*local_components[position])
+
+        return distributions
+
+    @staticmethod
+    def enumerate_local(square_count, local_constraints, max_states, split_depth, deadline):
+        """
+        Function for enumerating a component (or a part of it) in the compact
+        form. Parts exceeding the state limit are split at a separator as long
+        as the split depth allows it. Returns the ways by mine count and the
+        ways with a mine for each square by mine count, or None if this is
+        not possible before the deadline.
+        """
+
+        result = ProbabilityEngine.count_assignments(square_count, local_constraints, max_states, deadline)
+        if result is not None:
+            return result
+        return ProbabilityEngine.enumerate_parts(square_count, local_constraints, max_states, split_depth, deadline)
+
+    @staticmethod
+    def enumerate_parts(square_count, local_constraints, max_states, split_depth, deadline):
+        """
+        Function for splitting a component at a separator and enumerating
+        the parts of all its assignments one after another. Returns the
+        merged arrays or None.
+        """
+
+        if split_depth <= 0 or t.time() > deadline:
+            return None
+
+        split = ProbabilityEngine.split(square_count, local_constraints)
+        if split is None:
+            return None
+
+        separator, assignments = split
+        results = []
+        for assignment, parts in assignments:
+            results.append((assignment, [(part_positions, ProbabilityEngine.enumerate_local(part_count, part_constraints, max_states, split_depth - 1, deadline)) for part_positions, part_count, part_constraints in parts]))
+        return ProbabilityEngine.merge(square_count, separator, results)
+
+    @staticmethod
+    def count_assignments(square_count, local_constraints, max_states, deadline = None):
+        """
+        Function for counting the valid mine assignments of the squares by
+        the number of mines they contain. The squares are assigned in order
+        while the result of the remaining ones is memoized by the remaining
+        mines of all constraints. Returns (ways, square ways) arrays (all
+        ways are 0 without any valid assignment) or None if the state limit
+        is exceeded or the deadline passed. The deadline is ignored for small
+        numbers of squares.
+        """
+
+        if square_count <= ProbabilityEngine._max_exact_square_count:
+            deadline = None
+
+        # Constraints of each square.
+        square_constraints = [[] for _ in range(square_count)]
+        initial_remaining = []
+        for local_index, (remaining, positions) in enumerate(local_constraints):
+            for position in positions:
+                square_constraints[position].append(local_index)
+            initial_remaining.append(remaining)
+
+        # Number of squares of each constraint that are not assigned yet after
+        # each position.
+        unassigned_counts = []
+        counts = [0] * len(local_constraints)
+        for position in range(square_count - 1, -1, -1):
+            unassigned_counts.append(list(counts))
+            for local_index in square_constraints[position]:
+                counts[local_index] += 1
+        unassigned_counts.reverse()
+
+        memo = {}
+
+        def count(position, remaining):
+            """
+            Counts the assignments of the squares starting at the position.
+            Returns {mines: (ways, ways with a mine for each square)}.
+            """
+
+            if position == square_count:
+                return {0: (1.0, np.zeros(square_count))}
+
+            key = (position, remaining)
+            if key in memo:
+                return memo[key]
+
+            if len(memo) >= max_states:
+                raise OverflowError()
+            # The time is only checked occasionally since it is comparably slow.
+            if deadline is not None and len(memo) % 256 == 0 and t.time() > deadline:
+                raise OverflowError()
+
+            result = {}
+            for value in (0, 1):
+                next_remaining = list(remaining)
+                is_valid = True
+                for local_index in square_constraints[position]:
+                    next_remaining[local_index] -= value
+                    left = next_remaining[local_index]
+                    # Pruning: the remaining mines must fit into the squares
+                    # that are not assigned yet.
+                    if left < 0 or left > unassigned_counts[position][local_index]:
+                        is_valid = False
+                        break
+                if not is_valid:
+                    continue
+
+                for mines, (ways, square_ways) in count(position + 1, tuple(next_remaining)).items():
+                    total_ways, total_square_ways = result.get(mines + value, (0.0, np.zeros(square_count)))
+                    total_square_ways = total_square_ways + square_ways
+                    if value == 1:
+                        total_square_ways[position] += ways
+                    result[mines + value] = (total_ways + ways, total_square_ways)
+
+            memo[key] = result
+            return result
+
+        try:
+            result = count(0, tuple(initial_remaining))
+        except (OverflowError, RecursionError):
+            return None
+
+        ways = np.zeros(max(result.keys(), default = 0) + 1)
+        square_ways = np.zeros((len(ways), square_count))
+        for mines, (mine_ways, mine_square_ways) in result.items():
+            ways[mines] = mine_ways
+            square_ways[mines] = mine_square_ways
+        return ways, square_ways
+
+    @staticmethod
+    def find_separator(square_count, local_constraints):
+        """
+        Function for finding a small set of squares separating the others
+        into (at least) two parts. Squares sharing a constraint are adjacent,
+        therefore each layer of a breadth first search is such a set. The
+        search starts at a square on the end of the component and the
+        smallest layer with squares on both sides is chosen (the more
+        balanced one if equal).
+        """
+
+        adjacent = [set() for _ in range(square_count)]
+        for _, positions in local_constraints:
+            for position in positions:
+                adjacent[position].update(positions)
+
+        def get_layers(start):
+            is_visited = [False] * square_count
+            is_visited[start] = True
+            layers = [[start]]
+            while True:
+                layer = []
+                for position in layers[-1]:
+                    for neighbour in adjacent[position]:
+                        if not is_visited[neighbour]:
+                            is_visited[neighbour] = True
+                            layer.append(neighbour)
+                if len(layer) == 0:
+                    return layers
+                layers.append(sorted(layer))
+
+        # The last square reached from any square is on the end.
+        layers = get_layers(get_layers(0)[-1][0])
+
+        best = None
+        before = len(layers[0])
+        for layer_index in range(1, len(layers) - 1):
+            layer = layers[layer_index]
+            after = square_count - before - len(layer)
+            score = (len(layer), abs(before - after))
+            if len(layer) <= ProbabilityEngine._max_separator_size and (best is None or score < best[0]):
+                best = (score, layer)
+            before += len(layer)
+
+        return best[1] if best is not None else None
+
+    @staticmethod
+    def split(square_count, local_constraints):
+        """
+        Function for splitting a component at a separator. For each valid
+        assignment of the separator, the constraints are reduced by it and
+        the other squares are grouped into independent parts. Returns the
+        separator and [(assignment, [(positions, part square count, part
+        constraints)])] or None if there is no separator.
+        """
+
+        separator = ProbabilityEngine.find_separator(square_count, local_constraints)
+        if separator is None:
+            return None
+
+        separator_set = set(separator)
+        others = [position for position in range(square_count) if not(position in separator_set)]
+        assignments = []
+
+        for assignment in itertools.product((0, 1), repeat = len(separator)):
+            values = dict(zip(separator, assignment))
+            reduced = []
+            is_valid = True
+            for remaining, positions in local_constraints:
+                left = remaining - sum(values.get(position, 0) for position in positions)
+                rest = tuple(position for position in positions if not(position in separator_set))
+                if left < 0 or left > len(rest):
+                    is_valid = False
+                    break
+                if len(rest) > 0:
+                    reduced.append((left, rest))
+            if not is_valid:
+                continue
+
+            # Group the other squares by the reduced constraints (union find).
+            parents = {position: position for position in others}
+            def find(position):
+                while parents[position] != position:
+                    parents[position] = parents[parents[position]]
+                    position = parents[position]
+                return position
+            for _, rest in reduced:
+                for position in rest[1:]:
+                    parents[find(position)] = find(rest[0])
+
+            groups = {}
+            for position in others:
+                groups.setdefault(find(position), []).append(position)
+
+            parts = []
+            for part_positions in groups.values():
+                local_positions = {position: local_index for local_index, position in enumerate(part_positions)}
+                part_constraints = [(left, tuple(local_positions[position] for position in rest)) for left, rest in reduced if rest[0] in local_positions]
+                parts.append((part_positions, len(part_positions), part_constraints))
+            assignments.append((assignment, parts))
+
+        return separator, assignments
+
+    @staticmethod
+    def merge(square_count, separator, results):
+        """
+        Function for merging the enumerated parts of a split component: the
+        parts of each separator assignment are combined (convolution of their
+        mine counts) and the assignments are added up. Returns the arrays of
+        the whole component or None if a part failed.
+        """
+
+        ways = np.zeros(square_count + 1)
+        square_ways = np.zeros((square_count + 1, square_count))
+
+        for assignment, parts in results:
+            # Parts exceeding the state limit can not be merged.
+            if any(result is None for _, result in parts):
+                return None
+
+            assignment_ways = np.ones(1)
+            for _, (part_ways, _) in parts:
+                assignment_ways = np.convolve(assignment_ways, part_ways)
+
+            assignment_square_ways = np.zeros((len(assignment_ways), square_count))
+            for part_index, (positions, (part_ways, part_square_ways)) in enumerate(parts):
+                # Ways of all other parts by mine count.
+                others = np.ones(1)
+                for other_index, (_, (other_ways, _)) in enumerate(parts):
+                    if other_index != part_index:
+                        others = np.convolve(others, other_ways)
+                for mines in range(len(part_ways)):
+                    assignment_square_ways[mines:mines + len(others), positions] += np.outer(others, part_square_ways[mines])
+
+            # Separator squares with a mine contain it in every assignment.
+            for position, value in zip(separator, assignment):
+                if value == 1:
+                    assignment_square_ways[:, position] = assignment_ways
+
+            mines = sum(assignment)
+            ways[mines:mines + len(assignment_ways)] += assignment_ways
+            square_ways[mines:mines + len(assignment_ways)] += assignment_square_ways
+
+        # Mine counts above the largest possible one are removed.
+        length = max(np.flatnonzero(ways > 0).tolist(), default = 0) + 1
+        return ways[:length], square_ways[:length]
+
+    @staticmethod
+    def approximate(square_count, local_constraints):
+        """
+        Function for approximating the distribution of a component that can
+        not be enumerated: each square contains a mine with the average share
+        of the remaining mines of its constraints.
+        """
+
+        shares = [[] for _ in range(square_count)]
+        for remaining, positions in local_constraints:
+            for position in positions:
+                shares[position].append(min(1.0, max(0.0, remaining / len(positions))))
+
+        probabilities = np.array([np.mean(share) for share in shares])
+        mines = int(round(probabilities.sum()))
+        ways = np.zeros(mines + 1)
+        ways[mines] = 1.0
+        square_ways = np.zeros((mines + 1, square_count))
+        square_ways[mines] = probabilities
+        return ways, square_ways
+
+    def combine(self, distributions, components, interior_count, remaining_mines):
+        """
+        Function for combining the distributions of all components with the
+        squares outside the frontier. Each combination of mine counts is
+        weighted by the number of ways the remaining mines can be placed in
+        the interior. Returns {index: probability} with the interior
+        probability stored at None.
+        """
+
+        # Ways by mine count of all components except the one at each position
+        # (product of the prefix and the suffix convolutions).
+        normalized = [self.normalize(*distribution) for distribution in distributions]
+        prefixes = [np.ones(1)]
+        for ways, _ in normalized:
+            prefixes.append(np.convolve(prefixes[-1], ways))
+        suffixes = [np.ones(1)]
+        for ways, _ in reversed(normalized):
+            suffixes.append(np.convolve(suffixes[-1], ways))
+        suffixes.reverse()
+
+        total_ways = prefixes[-1]
+        # Relative weight of each total number of frontier mines.
+        interior_weights = self.get_interior_weights(len(total_ways), interior_count, remaining_mines)
+        total_weight = float(np.dot(total_ways, interior_weights))
+
+        if total_weight <= 0.0:
+            l.warning("No valid assignment of the remaining {} mines, the mine count is ignored.".format(remaining_mines))
+            interior_weights = np.ones(len(total_ways))
+            total_weight = float(total_ways.sum())
+
+        probabilities = {}
+        for position, (squares, _) in enumerate(components):
+            ways, square_ways = normalized[position]
+            others = np.convolve(prefixes[position], suffixes[position + 1])
+
+            # Weight of each mine count of this component combined with all others.
+            weights = np.array([np.dot(others, interior_weights[mines:mines + len(others)]) for mines in range(len(ways))])
+            square_probabilities = np.dot(weights, square_ways) / total_weight
+            for index, probability in zip(squares, square_probabilities.tolist()):
+                probabilities[index] = min(1.0, max(0.0, probability))
+
+        if interior_count > 0:
+            expected_interior_mines = np.dot(total_ways * interior_weights, np.maximum(remaining_mines - np.arange(len(total_ways)), 0)) / total_weight
+            probabilities[None] = min(1.0, max(0.0, float(expected_interior_mines) / interior_count))
+
+        return probabilities
+
+    def normalize(self, ways, square_ways):
+        """
+        Function for scaling a distribution such that the largest number of
+        ways is 1, which does not change the probabilities but prevents
+        overflows.
+        """
+
+        scale = ways.max()
+        return ways / scale, square_ways / scale
+
+    def get_interior_weights(self, length, interior_count, remaining_mines):
+        """
+        Function for calculating the number of ways the mines left by each
+        number of frontier mines can be placed in the interior (binomial
+        coefficients, relative to the largest one).
+        """
+
+        log_weights = np.full(length, -np.inf)
+        for frontier_mines in range(length):
+            interior_mines = remaining_mines - frontier_mines
+            if 0 <= interior_mines <= interior_count:
+                log_weights[frontier_mines] = math.lgamma(interior_count + 1) - math.lgamma(interior_mines + 1) - math.lgamma(interior_count - interior_mines + 1)
+
+        if not np.isfinite(log_weights).any():
+            return np.zeros(length)
+        return np.exp(log_weights - log_weights[np.isfinite(log_weights)].max())
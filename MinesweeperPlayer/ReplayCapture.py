@@ -0,0 +1,70 @@
+from CaptureBackend import *
+from pathlib import Path
+
+import cv2
+import logging as l
+
+class ReplayCapture(CaptureBackend):
+    """
+    Capture backend replaying previously taken images. The source is either a
+    directory of images (replayed in the order of their names) or a video file.
+    """
+
+    _image_extensions = [".png", ".bmp", ".jpg", ".jpeg"]
+
+    _paths = None
+    _video = None
+    _index = 0
+    _loop = False
+
+    def __init__(self, source, loop = False, bbox = None):
+        super().__init__(bbox)
+        self._loop = loop
+        self._index = 0
+
+        source = Path(source)
+        if source.is_dir():
+            self._paths = sorted(path for path in source.iterdir() if path.suffix.lower() in self._image_extensions)
+            l.info("Replaying {} images from {}".format(len(self._paths), source))
+        else:
+            self._video = cv2.VideoCapture(str(source))
+            if not self._video.isOpened():
+                raise IOError("Video {} could not be opened.".format(source))
+            l.info("Replaying video {}".format(source))
+
+    def grab_into_buffer(self, bbox):
+        image = self.read_next()
+
+        if image is None:
+            raise EOFError("No more images to replay.")
+
+        # Images are read as BGR.
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst = image)
+        return self.store(image, bbox)
+
+    def read_next(self):
+        """
+        Function for reading the next image of the source. Returns None once 
+        the source is exhausted.
+        """
+
+        if self._paths is not None:
+            if self._index >= len(self._paths):
+                if not self._loop or len(self._paths) == 0:
+                    return None
+                self._index = 0
+
+            image = cv2.imread(str(self._paths[self._index]), cv2.IMREAD_COLOR)
+            self._index += 1
+            return image
+
+        has_image, image = self._video.read()
+        if not has_image and self._loop:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            has_image, image = self._video.read()
+        return image if has_image else None
+
+    def close(self):
+        super().close()
+        if self._video is not None:
+            self._video.release()
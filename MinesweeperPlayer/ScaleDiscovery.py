@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+import logging as l
+
+class ScaleDiscovery:
+    """
+    Class for finding the scale at which a template matches the game's window.
+    Larger windows (or high DPI screens) show larger squares than the ones the
+    templates were taken from. The scale is searched coarse to fine: first a
+    wide range of scales on a reduced image, then a narrow range around the
+    best one on the full image.
+    """
+
+    # Scales that are compared in the coarse search.
+    _coarse_scales = np.linspace(0.5, 3.0, 11)
+    # Templates must have at least this size (in pixels) in the reduced image.
+    _minimum_template_size = 8
+
+    def discover(self, gray_image, template):
+        """
+        Function for finding the scale of the template that matches the provided
+        image best. Returns the scale as well as its matching score.
+        """
+
+        # Coarse search on an image of half the size. Scales whose templates
+        # get too small in there are compared on the full image instead.
+        reduced_image = cv2.pyrDown(gray_image)
+        coarse_results = []
+        for scale in self._coarse_scales:
+            if min(template.shape) * scale / 2 >= self._minimum_template_size:
+                score = self.score(reduced_image, template, scale / 2)
+            else:
+                score = self.score(gray_image, template, scale)
+            coarse_results.append((score, scale))
+
+        coarse_score, coarse_scale = max(coarse_results)
+        coarse_step = self._coarse_scales[1] - self._coarse_scales[0]
+
+        # Fine search on the full image around the best coarse scale. Scales 
+        # only differ if they result in different template sizes, which is why 
+        # each possible width is compared once.
+        template_width = template.shape[1]
+        smallest_width = max(1, int(np.floor(template_width * (coarse_scale - coarse_step))))
+        largest_width = int(np.ceil(template_width * (coarse_scale + coarse_step)))
+        fine_scales = [width / template_width for width in range(smallest_width, largest_width + 1)]
+        fine_results = [(self.score(gray_image, template, scale), scale) for scale in fine_scales]
+        best_score, best_scale = max(fine_results)
+
+        best_scale = round(float(best_scale), 4)
+        l.info("Discovered template scale {} (score {:.3f}).".format(best_scale, best_score))
+
+        return best_scale, best_score
+
+    def score(self, gray_image, template, scale):
+        """
+        Function for calculating how well the template resized by the provided
+        scale matches the image. Returns the best matching value.
+        """
+
+        size = max(1, int(round(template.shape[1] * scale))), max(1, int(round(template.shape[0] * scale)))
+        if size[0] > gray_image.shape[1] or size[1] > gray_image.shape[0]:
+            return -1.0
+
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        resized_template = cv2.resize(template, size, interpolation = interpolation)
+        result = cv2.matchTemplate(gray_image, resized_template, cv2.TM_CCOEFF_NORMED)
+
+        return float(result.max())
@@ -0,0 +1,142 @@
+from ActionType import *
+from Frame import *
+
+import cv2
+import json
+import zipfile
+import logging as l
+
+class SessionRecorder:
+    """
+    Class for recording a session (capture -> recognize -> decide -> click) to
+    an archive. Each update of the game is stored as a record containing the
+    captured frame (PNG), the recognized field, the decisions made based on it
+    and the time each step took. The archive is a zip file whose index
+    (index.json) allows random access to any record.
+
+    The index is only written when the session is closed. Each record is
+    therefore written as well (records/*.json) as soon as the next update
+    starts, such that the index of an archive that was never closed (i.e.
+    after a crash) can be rebuilt from them.
+    """
+
+    # Must be increased whenever the format of the archive changes.
+    format_version = 1
+
+    _path = None
+    _archive = None
+    # Metadata of the session (i.e. the seed of the random decisions).
+    _metadata = {}
+    _records = []
+    # Indices of the squares that changed since the last recorded update.
+    _pending_changes = []
+    _png_compression = 1
+
+    def __init__(self, path, metadata = None):
+        self._path = path
+        self._metadata = dict(metadata or {})
+        self._records = []
+        self._pending_changes = []
+        self._archive = zipfile.ZipFile(path, "w")
+
+        self.write_json("session.json", {"version": self.format_version, "metadata": self._metadata})
+        l.info("Recording session to {}".format(path))
+
+    def write_json(self, name, value):
+        """
+        Function for writing a JSON entry to the archive. The archive's file
+        is flushed such that the entry is kept if the application crashes.
+        """
+
+        self._archive.writestr(name, json.dumps(value), zipfile.ZIP_DEFLATED)
+        self._archive.fp.flush()
+
+    def write_last_record(self):
+        """
+        Function for writing the last record, which is complete once the next
+        update starts or the session is closed.
+        """
+
+        if len(self._records) > 0:
+            self.write_json("records/{:06d}.json".format(len(self._records) - 1), self._records[-1])
+
+    def record_update(self, frame, field, state, timings = None):
+        """
+        Function for recording an update of the game. Decisions recorded
+        afterwards belong to this update.
+        """
+
+        self.write_last_record()
+
+        name = "frames/{:06d}.png".format(len(self._records))
+        is_encoded, encoded = cv2.imencode(".png", Frame.of(frame).bgr(), [cv2.IMWRITE_PNG_COMPRESSION, self._png_compression])
+
+        # PNG is already compressed.
+        if is_encoded:
+            self._archive.writestr(name, encoded.tobytes(), zipfile.ZIP_STORED)
+            self._archive.fp.flush()
+        else:
+            l.error("Frame {} could not be encoded.".format(name))
+
+        self._records.append({
+            "frame": name,
+            "state": state,
+            "field": self.encode_field(field),
+            "changes": self._pending_changes,
+            "decisions": [],
+            "timings": dict(timings or {})
+        })
+        self._pending_changes = []
+
+    def record_change(self, change):
+        """
+        Function for recording a change of the field (subscriber of the 
+        game's change stream). The changed squares are stored with the next 
+        recorded update.
+        """
+
+        self._pending_changes.extend(int(index) for index in change.indices)
+
+    def record_decision(self, square_index, center_coordinates, timings = None, action_type = ActionType.REVEAL):
+        """
+        Function for recording a decision (the index of the square, the
+        clicked coordinates and the type of the action) made based on the 
+        last recorded update.
+        """
+
+        if len(self._records) == 0:
+            return
+
+        record = self._records[-1]
+        record["decisions"].append([int(square_index), [int(value) for value in center_coordinates], action_type])
+        for key, value in (timings or {}).items():
+            record["timings"][key] = record["timings"].get(key, 0.0) + value
+
+    def close(self):
+        """
+        Function for writing the index and closing the archive.
+        """
+
+        if self._archive is None:
+            return
+
+        self.write_last_record()
+        index = {"version": self.format_version, "metadata": self._metadata, "records": self._records}
+        self._archive.writestr("index.json", json.dumps(index), zipfile.ZIP_DEFLATED)
+        self._archive.close()
+        self._archive = None
+
+        l.info("Recorded {} updates to {}".format(len(self._records), self._path))
+
+    @staticmethod
+    def encode_field(field):
+        """
+        Function for converting a field (Board) into a list of strings. 
+        Unchecked squares are represented by "?", mines by "*" and flags
+        by "F".
+        """
+
+        if field is None:
+            return None
+
+        return field.to_lines()
@@ -0,0 +1,196 @@
+from Game import *
+from DecisionMaker import *
+from ClickPlanner import *
+from SessionRecorder import *
+from SyntheticCapture import *
+
+import io
+import cv2
+import json
+import zlib
+import struct
+import random
+import zipfile
+import numpy as np
+import time as t
+import logging as l
+
+class SessionReplay:
+    """
+    Class for replaying a recorded session. The recorded frames are fed through
+    the recognition (Game.update) and the decision making (DecisionMaker) as
+    fast as possible, without any window or clicks. The results are compared
+    with the recorded ones, which allows profiling and comparing changes of the
+    recognition or the decision making on real sessions.
+    """
+
+    _archive = None
+    _index = None
+
+    # Signature and format (see the zip specification) of the header in front
+    # of each file of an archive.
+    _local_header_signature = b"PK\x03\x04"
+    _local_header_format = "<4sHHHHHIIIHH"
+
+    def __init__(self, path):
+        self._archive = self.open_archive(path)
+
+        # The index is missing if the recording application crashed.
+        if "index.json" in self._archive.namelist():
+            self._index = json.loads(self._archive.read("index.json"))
+        else:
+            l.warning("Session {} was not closed, rebuilding its index.".format(path))
+            self._index = self.rebuild_index()
+
+        if self._index["version"] != SessionRecorder.format_version:
+            raise ValueError("Unsupported session format {}.".format(self._index["version"]))
+
+    def open_archive(self, path):
+        """
+        Function for opening the archive of a session. An archive that was 
+        never closed lacks the directory at its end, its files are recovered 
+        from the headers in front of each one instead.
+        """
+
+        try:
+            return zipfile.ZipFile(path, "r")
+        except zipfile.BadZipFile:
+            l.warning("Session {} is incomplete, recovering its files.".format(path))
+
+        with open(path, "rb") as file:
+            data = file.read()
+
+        recovered = io.BytesIO()
+        with zipfile.ZipFile(recovered, "w") as archive:
+            header_size = struct.calcsize(self._local_header_format)
+            position = 0
+            while data[position:position + 4] == self._local_header_signature and position + header_size <= len(data):
+                _, _, _, method, _, _, _, compressed_size, _, name_length, extra_length = struct.unpack_from(self._local_header_format, data, position)
+                start = position + header_size + name_length + extra_length
+                name = data[position + header_size:start - extra_length].decode("utf-8")
+                content = data[start:start + compressed_size]
+
+                # The last file may have been cut off.
+                if len(content) < compressed_size:
+                    break
+                if method == zipfile.ZIP_DEFLATED:
+                    content = zlib.decompress(content, -15)
+                archive.writestr(name, content)
+                position = start + compressed_size
+
+        return zipfile.ZipFile(recovered, "r")
+
+    def rebuild_index(self):
+        """
+        Function for rebuilding the index from the records written during the 
+        session. Frames without a record (the last update) only contain the 
+        frame itself.
+        """
+
+        names = self._archive.namelist()
+        index = json.loads(self._archive.read("session.json"))
+        index["records"] = [json.loads(self._archive.read(name)) for name in sorted(name for name in names if name.startswith("records/"))]
+
+        for name in sorted(name for name in names if name.startswith("frames/"))[len(index["records"]):]:
+            index["records"].append({"frame": name, "state": GameState.RUNNING, "field": None, "changes": [], "decisions": [], "timings": {}})
+
+        return index
+
+    def __len__(self):
+        return len(self._index["records"])
+
+    def get_record(self, record_index):
+        """
+        Function for retrieving a record of the session.
+        """
+
+        return self._index["records"][record_index]
+
+    def read_frame(self, record_index):
+        """
+        Function for reading the frame of a record as an RGB array.
+        """
+
+        data = np.frombuffer(self._archive.read(self.get_record(record_index)["frame"]), np.uint8)
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def run(self):
+        """
+        Function for replaying the whole session. Returns a summary containing
+        the number of differing fields and decisions as well as the time each
+        step took in total.
+        """
+
+        random.seed(self._index["metadata"].get("seed"))
+
+        frames = iter(range(len(self)))
+        capture = SyntheticCapture(lambda: self.read_frame(next(frames)))
+        game = Game()
+        game._open_cv.set_show_template_matching_results(False)
+        decision_maker = DecisionMaker()
+        click_planner = ClickPlanner()
+        game.changes.subscribe(decision_maker.apply_change)
+
+        summary = {"updates": 0, "field_mismatches": 0, "decision_mismatches": 0, "timings": {}}
+
+        # The first record is the frame used for the field dimensions.
+        game.update_field_dimensions(capture)
+        if game.mine_counter is not None:
+            decision_maker.set_mine_count(game.mine_counter)
+
+        for record_index in range(1, len(self)):
+            record = self.get_record(record_index)
+            game.update(capture)
+            field = game.current_field_info
+            self.add_timings(summary, game.timings)
+            summary["updates"] += 1
+
+            # Records rebuilt after a crash may lack the field.
+            if record["field"] is not None and SessionRecorder.encode_field(field) != record["field"] and game.state == GameState.RUNNING:
+                l.info("Field differs at record {}.".format(record_index))
+                summary["field_mismatches"] += 1
+
+            # The session may have ended without any decision on the last update.
+            is_last_record = record_index == len(self) - 1
+            if game.is_finished or (is_last_record and len(record["decisions"]) == 0):
+                break
+
+            # Same order of decisions as in GameManager.run: one decision after
+            # the update if no square is known to be safe, followed by the
+            # planned batch of all safe squares.
+            actions = []
+            start = t.perf_counter()
+            if not decision_maker.do_safe_squares_exist():
+                next_square = decision_maker.decide_next_square(field)
+                if next_square is not None:
+                    actions.append(Action(ActionType.REVEAL, next_square))
+            if decision_maker.do_safe_squares_exist():
+                cursor_position = actions[-1].center_coordinates if len(actions) > 0 else (0, 0)
+                actions.extend(click_planner.plan(decision_maker.take_safe_actions(field), field, cursor_position))
+            decisions = [[list(action.center_coordinates), action.type] for action in actions]
+            self.add_timings(summary, {"decide": t.perf_counter() - start})
+
+            # Sessions recorded before flags and chords only contain reveals.
+            recorded_decisions = [[decision[1], decision[2] if len(decision) > 2 else ActionType.REVEAL] for decision in record["decisions"]]
+            if decisions != recorded_decisions:
+                l.info("Decisions differ at record {}.".format(record_index))
+                summary["decision_mismatches"] += 1
+
+        l.info("Replay finished: {}".format(summary))
+        return summary
+
+    def add_timings(self, summary, timings):
+        """
+        Function for adding the timings of a step to the summary.
+        """
+
+        for key, value in timings.items():
+            summary["timings"][key] = summary["timings"].get(key, 0.0) + value
+
+    def close(self):
+        """
+        Function for closing the archive.
+        """
+
+        self._archive.close()
@@ -0,0 +1,90 @@
+import numpy as np
+import logging as l
+import time as t
+
+class SettleDetector:
+    """
+    Class for detecting when the game's view stopped changing (i.e. after the
+    animation of a click finished). Instead of waiting a fixed amount of time,
+    small images of the field are taken until consecutive ones do not differ
+    anymore. The time it usually takes the view to settle is learned for each
+    field size.
+    """
+
+    # Time between two captures.
+    _poll_interval = 0.005
+    # Number of consecutive captures that must match the previous one.
+    _required_stable_captures = 2
+    # Maximum difference of a single pixel that is still considered equal.
+    _tolerance = 4
+    # Only every n-th pixel in each direction is compared.
+    _step = 2
+    # Maximum time to wait for the view to settle.
+    _timeout = 0.5
+
+    # Expected latency if nothing is learned for a field size yet (the
+    # previously used fixed wait time for the largest field).
+    _default_latency = 0.11
+    # The view can only be considered settled after this fraction of the
+    # expected latency. The game does not react immediately to a click.
+    _minimum_wait_ratio = 0.5
+    # Weight of a new measurement in the learned latencies.
+    _learning_rate = 0.25
+
+    # {field_size: latency}
+    _latencies = {}
+
+    def __init__(self):
+        self._latencies = {}
+
+    def expected_latency(self, field_size):
+        """
+        Function for retrieving the time the view of a field with the given
+        size (rows, columns) usually needs to settle.
+        """
+
+        return self._latencies.get(field_size, self._default_latency)
+
+    def wait(self, capture, field_size):
+        """
+        Function for waiting until the view of the field stops changing. The
+        capture function must return an image (array) of the field. Returns the
+        time it took the view to settle.
+        """
+
+        start = t.perf_counter()
+        earliest_end = start + self.expected_latency(field_size) * self._minimum_wait_ratio
+        last_change = None
+        previous = None
+        stable_captures = 0
+
+        while True:
+            now = t.perf_counter()
+            current = np.asarray(capture())[::self._step, ::self._step].astype(np.int16)
+
+            if previous is not None and previous.shape == current.shape and np.abs(current - previous).max() <= self._tolerance:
+                stable_captures += 1
+            else:
+                stable_captures = 0
+                if previous is not None:
+                    last_change = now
+
+            if stable_captures >= self._required_stable_captures and now >= earliest_end:
+                break
+            if now - start >= self._timeout:
+                l.warning("View did not settle within {}s.".format(self._timeout))
+                break
+
+            previous = current
+            t.sleep(self._poll_interval)
+
+        # Only observed changes tell how long the game needs to update its view.
+        if last_change is not None:
+            latency = last_change - start
+            expected = self.expected_latency(field_size)
+            self._latencies[field_size] = expected + self._learning_rate * (latency - expected)
+
+        elapsed = t.perf_counter() - start
+        l.debug("View settled after {:.3f}s (expected {:.3f}s).".format(elapsed, self.expected_latency(field_size)))
+
+        return elapsed
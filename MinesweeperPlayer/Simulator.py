@@ -0,0 +1,281 @@
+from Board import *
+from Lattice import *
+from FieldChange import *
+from ChangeStream import *
+from DecisionMaker import *
+from ClickPlanner import *
+
+import random
+import numpy as np
+import time as t
+import logging as l
+
+class Simulator:
+    """
+    Class for playing games against a model of the Minesweeper game instead
+    of the real one. The decision making is driven like by the GameManager
+    (changes published after each update, safe squares performed as batches
+    planned by the ClickPlanner) but without any image recognition, such
+    that changes of the solver can be compared on many games. As in the
+    real game, the mines are placed after the first click, which is never
+    a mine. The same seed always results in the same games.
+    """
+
+    # (rows, columns, mines) of the default game modes.
+    modes = {
+        "beginner": (9, 9, 10),
+        "intermediate": (16, 16, 40),
+        "expert": (16, 30, 99)
+    }
+    # Distance between the centers of two squares (as in the real game).
+    _pitch = (18, 18)
+    # Games are stopped after this many inputs (i.e. if no decision is made).
+    _max_input_count = 10000
+
+    rows = 0
+    columns = 0
+    mine_count = 0
+    _seed = 0
+
+    # Matrix of the squares containing a mine, None before the first click.
+    _mines = None
+    # Number of neighbouring mines of each square.
+    _numbers = None
+    # States of the squares as shown by the game (see Board).
+    _states = None
+    _coordinates = None
+    _is_lost = False
+    # Random state of the current game (placement of the mines).
+    _random = None
+
+    _decision_maker = None
+    _click_planner = None
+    _changes = None
+
+    def __init__(self, rows, columns, mine_count, seed = 0, worker_count = 1, deadline = 2.0):
+        self.rows = rows
+        self.columns = columns
+        self.mine_count = mine_count
+        self._seed = seed
+        self._coordinates = Board.create_coordinates(Lattice(self._pitch, self._pitch, rows, columns))
+
+        self._decision_maker = DecisionMaker(worker_count, deadline)
+        self._click_planner = ClickPlanner()
+        self._changes = ChangeStream()
+        self._changes.subscribe(self._decision_maker.apply_change)
+
+    @staticmethod
+    def from_mode(mode, seed = 0, worker_count = 1, deadline = 2.0):
+        """
+        Function for creating a simulator of one of the default game modes.
+        """
+
+        rows, columns, mine_count = Simulator.modes[mode]
+        return Simulator(rows, columns, mine_count, seed, worker_count, deadline)
+
+    def close(self):
+        """
+        Function for stopping the worker processes of the decision making.
+        """
+
+        self._decision_maker.close()
+
+    def run(self, game_count):
+        """
+        Function for playing the provided number of games. Returns the
+        summed up results as dictionary.
+        """
+
+        results = {"games": game_count, "won": 0, "inputs": 0, "guesses": 0, "mistakes": 0, "seconds": 0.0}
+
+        for game_index in range(game_count):
+            result = self.play_game(game_index)
+            results["won"] += result["is_won"]
+            for key in ["inputs", "guesses", "mistakes", "seconds"]:
+                results[key] += result[key]
+
+        l.info("Simulated {} games of {}x{} with {} mines: {} won, {} inputs, {} guesses, {} mistakes, {:.2f}s.".format(game_count, self.rows, self.columns, self.mine_count, results["won"], results["inputs"], results["guesses"], results["mistakes"], results["seconds"]))
+        return results
+
+    def play_game(self, game_index = 0):
+        """
+        Function for playing a single game. Returns whether it was won, the
+        number of inputs, of guesses (decisions on squares that were not
+        deduced to be safe), of mistakes (games lost by a safe action) and
+        the time the decision making took.
+        """
+
+        self.new_game(game_index)
+        decision_maker = self._decision_maker
+        decision_maker.reset()
+        decision_maker.set_mine_count(self.mine_count)
+
+        result = {"is_won": False, "inputs": 0, "guesses": 0, "mistakes": 0, "seconds": 0.0}
+        field = None
+        update_index = 0
+        cursor_position = None
+
+        while not self.is_finished() and result["inputs"] < self._max_input_count:
+            start = t.perf_counter()
+
+            if decision_maker.do_safe_squares_exist():
+                actions = self._click_planner.plan(decision_maker.take_safe_actions(field), field, cursor_position)
+                result["seconds"] += t.perf_counter() - start
+
+                for action in actions:
+                    self.perform(action)
+                    result["inputs"] += 1
+                    if self._is_lost:
+                        result["mistakes"] += 1
+                        break
+                if len(actions) > 0:
+                    cursor_position = actions[-1].center_coordinates
+            else:
+                # Same as an update of the Game.
+                board = self.get_board()
+                change = FieldChange.between(update_index, field, board)
+                field = board
+                update_index += 1
+                if len(change) > 0:
+                    self._changes.publish(change)
+
+                if not decision_maker.do_safe_squares_exist():
+                    is_first_click = self._mines is None
+                    square = decision_maker.decide_next_square(field)
+                    result["seconds"] += t.perf_counter() - start
+                    if square is None:
+                        l.warning("No decision was made, the game is stopped.")
+                        break
+
+                    index = square.row_index * self.columns + square.column_index
+                    if not is_first_click and not(index in decision_maker._knowledge_base.safe_squares):
+                        result["guesses"] += 1
+                    self.reveal(square.row_index, square.column_index)
+                    result["inputs"] += 1
+                    cursor_position = square.center_coordinates
+                else:
+                    result["seconds"] += t.perf_counter() - start
+
+        result["is_won"] = self.is_won()
+        return result
+
+    def new_game(self, game_index = 0):
+        """
+        Function for starting a new game with all squares unchecked. The
+        random decisions of the decision making are seeded as well.
+        """
+
+        random.seed(self._seed + game_index)
+        self._random = np.random.RandomState(self._seed + game_index)
+        self._mines = None
+        self._numbers = None
+        self._states = np.full((self.rows, self.columns), Board.unchecked_value, np.int8)
+        self._is_lost = False
+
+    def place_mines(self, row_index, column_index):
+        """
+        Function for placing the mines randomly on all squares but the first
+        clicked one.
+        """
+
+        square_count = self.rows * self.columns
+        candidates = np.delete(np.arange(square_count), row_index * self.columns + column_index)
+        mines = np.zeros(square_count, np.bool_)
+        mines[self._random.choice(candidates, min(self.mine_count, square_count - 1), replace = False)] = True
+        self._mines = mines.reshape(self.rows, self.columns)
+
+        padded = np.pad(self._mines, 1, "constant").astype(np.int8)
+        self._numbers = sum(padded[1 + y:1 + y + self.rows, 1 + x:1 + x + self.columns] for y in (-1, 0, 1) for x in (-1, 0, 1) if (y, x) != (0, 0))
+
+    def get_board(self):
+        """
+        Function for retrieving the field as shown by the game. After a lost
+        game all mines are shown.
+        """
+
+        states = self._states.copy()
+        if self._is_lost:
+            states[self._mines & (states == Board.unchecked_value)] = Board.mine_value
+        return Board(states, self._coordinates)
+
+    def perform(self, action):
+        """
+        Function for performing an action of the decision making.
+        """
+
+        if action.type == ActionType.FLAG:
+            self.flag(action.square.row_index, action.square.column_index)
+        elif action.type == ActionType.CHORD:
+            self.chord(action.square.row_index, action.square.column_index)
+        else:
+            self.reveal(action.square.row_index, action.square.column_index)
+
+    def reveal(self, row_index, column_index):
+        """
+        Function for checking a square (left click). Squares without any
+        neighbouring mine reveal their neighbours as well.
+        """
+
+        if self._states[row_index, column_index] != Board.unchecked_value or self.is_finished():
+            return
+
+        if self._mines is None:
+            self.place_mines(row_index, column_index)
+        if self._mines[row_index, column_index]:
+            self._is_lost = True
+            return
+
+        stack = [(row_index, column_index)]
+        while len(stack) > 0:
+            row, column = stack.pop()
+            if self._states[row, column] != Board.unchecked_value:
+                continue
+
+            self._states[row, column] = self._numbers[row, column]
+            if self._numbers[row, column] == 0:
+                stack.extend(self.get_neighbours(row, column))
+
+    def flag(self, row_index, column_index):
+        """
+        Function for flagging an unchecked square or removing its flag (right
+        click).
+        """
+
+        state = self._states[row_index, column_index]
+        if state == Board.unchecked_value:
+            self._states[row_index, column_index] = Board.flag_value
+        elif state == Board.flag_value:
+            self._states[row_index, column_index] = Board.unchecked_value
+
+    def chord(self, row_index, column_index):
+        """
+        Function for checking all neighbours of a number that are not flagged
+        (both buttons). Nothing happens unless the number of flags around it
+        matches its value.
+        """
+
+        value = self._states[row_index, column_index]
+        neighbours = self.get_neighbours(row_index, column_index)
+        if value <= 0 or sum(self._states[neighbour] == Board.flag_value for neighbour in neighbours) != value:
+            return
+
+        for row, column in neighbours:
+            self.reveal(row, column)
+
+    def get_neighbours(self, row_index, column_index):
+        """
+        Function for retrieving the (row, column) positions of all neighbours
+        of a square.
+        """
+
+        return [(row, column) for row in range(max(0, row_index - 1), min(self.rows, row_index + 2)) for column in range(max(0, column_index - 1), min(self.columns, column_index + 2)) if (row, column) != (row_index, column_index)]
+
+    def is_won(self):
+        """
+        Function for checking whether all squares without a mine are checked.
+        """
+
+        return self._mines is not None and not self._is_lost and int((self._states >= 0).sum()) == self.rows * self.columns - int(self._mines.sum())
+
+    def is_finished(self):
+        return self._is_lost or self.is_won()
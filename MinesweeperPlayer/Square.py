@@ -2,13 +2,49 @@ class Square:
     """
     A square inside the Minesweeper game. Can either be checked (=clicked)
     or unchecked (=no clicked). Different fields contain different values.
+    Squares are views of a single entry of a Board and do not hold any
+    information themselves.
     """
 
-    center_coordinates = None
-    value = None
-    is_unchecked = None
+    _board = None
+    row_index = -1
+    column_index = -1
 
-    def __init__(self, center_coordinates = (0, 0), value = -1, is_unchecked = True):
-        self.center_coordinates = center_coordinates
-        self.value = value
-        self.is_unchecked = is_unchecked
\ No newline at end of file
+    def __init__(self, board, row_index, column_index):
+        self._board = board
+        self.row_index = row_index
+        self.column_index = column_index
+
+    @property
+    def state(self):
+        return int(self._board.states[self.row_index, self.column_index])
+
+    @property
+    def center_coordinates(self):
+        x, y = self._board.coordinates[self.row_index, self.column_index]
+        return int(x), int(y)
+
+    @property
+    def value(self):
+        # Only checked squares have a value.
+        state = self.state
+        return state if state >= 0 else None
+
+    @property
+    def is_unchecked(self):
+        return self.state == self._board.unchecked_value
+
+    @property
+    def is_mine(self):
+        # Mines are only visible once the game is lost.
+        return self.state == self._board.mine_value
+
+    @property
+    def is_flagged(self):
+        return self.state == self._board.flag_value
+
+    def __eq__(self, other):
+        return isinstance(other, Square) and self._board is other._board and self.row_index == other.row_index and self.column_index == other.column_index
+
+    def __hash__(self):
+        return hash((id(self._board), self.row_index, self.column_index))
@@ -0,0 +1,43 @@
+from CaptureBackend import *
+
+class SyntheticCapture(CaptureBackend):
+    """
+    Capture backend returning images held in memory. The source is either a
+    list of RGB arrays (replayed in order) or a function returning the next
+    RGB array.
+    """
+
+    _images = None
+    _generator = None
+    _index = 0
+    _loop = False
+
+    def __init__(self, source, loop = True, bbox = None):
+        super().__init__(bbox)
+        self._loop = loop
+        self._index = 0
+
+        if callable(source):
+            self._generator = source
+        else:
+            self._images = list(source)
+
+    def add_image(self, image):
+        """
+        Function for appending an image to the ones that are returned.
+        """
+
+        self._images.append(image)
+
+    def grab_into_buffer(self, bbox):
+        if self._generator is not None:
+            return self.store(self._generator(), bbox)
+
+        if self._index >= len(self._images):
+            if not self._loop or len(self._images) == 0:
+                raise EOFError("No more images available.")
+            self._index = 0
+
+        image = self._images[self._index]
+        self._index += 1
+        return self.store(image, bbox)
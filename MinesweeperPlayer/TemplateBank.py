@@ -0,0 +1,258 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import os
+import logging as l
+
+class TemplateBank:
+    """
+    Compiled collection of all templates used for template matching. Each
+    template is stored in its grayscale form as well as all of its edge
+    (Canny) and scaled variants, such that no template must be processed
+    more than once. The compiled templates are saved to a versioned cache
+    file and loaded lazily on first access.
+    """
+
+    # Must be increased whenever the format or the preprocessing changes.
+    _cache_version = 1
+    _cache_path = "template_cache.npz"
+    # Relative template and cache paths are relative to this directory (the
+    # one of the application), not the working directory.
+    _base_path = Path(__file__).resolve().parent
+
+    # {key: path}
+    _template_paths = {}
+    # [(key, canny_params), ...] that are compiled together with the templates.
+    _edge_variants = []
+    # Keys of the templates that may be missing (features using them are
+    # disabled instead).
+    _optional_keys = set()
+
+    # {key: template}
+    _gray = {}
+    # {(key, canny_params): template}
+    _edges = {}
+    # {(key, scale, canny_params): template}, canny_params is None for grayscale.
+    _scaled = {}
+
+    _is_loaded = False
+    # Flag for changes that are not yet written to the cache file.
+    _is_dirty = False
+
+    def __init__(self, template_paths, edge_variants = None, cache_path = "template_cache.npz", optional_keys = None):
+        self._template_paths = template_paths
+        self._edge_variants = list(edge_variants or [])
+        self._optional_keys = set(optional_keys or [])
+        self._cache_path = self.get_path(cache_path)
+        self._gray = {}
+        self._edges = {}
+        self._scaled = {}
+
+    @staticmethod
+    def get_path(path):
+        """
+        Function for resolving a path relative to the application directory.
+        """
+
+        return str(TemplateBank._base_path / path)
+
+    def gray(self, key):
+        """
+        Function for retrieving the grayscale template accessible by the key.
+        """
+
+        self.ensure_loaded()
+        return self._gray[key]
+
+    def has(self, key):
+        """
+        Function for checking whether the template accessible by the key could
+        be loaded.
+        """
+
+        self.ensure_loaded()
+        return key in self._gray
+
+    def edges(self, key, canny_params):
+        """
+        Function for retrieving the edges (Canny) of the template accessible by
+        the key.
+        """
+
+        self.ensure_loaded()
+        canny_params = tuple(canny_params)
+
+        if (key, canny_params) not in self._edges:
+            self._edges[key, canny_params] = cv2.Canny(self._gray[key], *canny_params)
+            self._is_dirty = True
+        return self._edges[key, canny_params]
+
+    def scaled(self, key, scale, canny_params = None):
+        """
+        Function for retrieving the template accessible by the key resized by
+        the provided scale. If canny_params are provided, the edges of the
+        resized template are returned.
+        """
+
+        self.ensure_loaded()
+        scale = round(float(scale), 4)
+        canny_params = None if canny_params is None else tuple(canny_params)
+
+        if (key, scale, canny_params) not in self._scaled:
+            template = self._gray[key]
+            if scale != 1.0:
+                size = max(1, int(round(template.shape[1] * scale))), max(1, int(round(template.shape[0] * scale)))
+                template = cv2.resize(template, size, interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+            if canny_params is not None:
+                template = cv2.Canny(template, *canny_params)
+
+            self._scaled[key, scale, canny_params] = template
+            self._is_dirty = True
+        return self._scaled[key, scale, canny_params]
+
+    def ensure_loaded(self):
+        """
+        Function for loading the templates on first access.
+        """
+
+        if not self._is_loaded:
+            self.load()
+
+    def load(self, use_cache = True):
+        """
+        Function for loading the compiled templates. The cache file is used if it
+        matches the current version and templates, otherwise the templates are
+        compiled from the resource folder and the cache file is rewritten.
+        """
+
+        self._gray.clear()
+        self._edges.clear()
+        self._scaled.clear()
+
+        if not (use_cache and self.load_cache()):
+            self.compile()
+            self.save()
+
+        self._is_loaded = True
+
+    def compile(self):
+        """
+        Function for reading the templates from the resource folder and compiling
+        all of their variants.
+        """
+
+        l.info("Compiling templates...")
+
+        for key, path in self._template_paths.items():
+            try:
+                complete_path = self.get_path(path)
+                template = cv2.imread(complete_path, 0)
+
+                if template is None and key in self._optional_keys:
+                    l.debug(f"Optional template {path} is missing.")
+                    continue
+                if template is None:
+                    raise IOError("file could not be read")
+
+                l.debug(f"- {path}")
+                self._gray[key] = template
+            except Exception as e:
+                l.error(f"Exception while loading {path}: {e}")
+
+        for key, canny_params in self._edge_variants:
+            if key in self._gray:
+                self._edges[key, tuple(canny_params)] = cv2.Canny(self._gray[key], *canny_params)
+
+    def signature(self):
+        """
+        Function for creating the signature of the current templates. A cache
+        file with a different signature is outdated.
+        """
+
+        entries = [f"version={self._cache_version}", f"opencv={cv2.__version__}"]
+        for key, path in sorted(self._template_paths.items()):
+            try:
+                stat = os.stat(self.get_path(path))
+                entries.append(f"{key}={path}:{stat.st_size}:{stat.st_mtime_ns}")
+            except OSError:
+                entries.append(f"{key}={path}:missing")
+
+        return "\n".join(entries)
+
+    def load_cache(self):
+        """
+        Function for loading the compiled templates from the cache file. Returns
+        whether the cache could be used.
+        """
+
+        if not os.path.isfile(self._cache_path):
+            return False
+
+        try:
+            with np.load(self._cache_path, allow_pickle = False) as cache:
+                if str(cache["signature"]) != self.signature():
+                    l.info("Template cache is outdated.")
+                    return False
+
+                for name in cache.files:
+                    parts = name.split("__")
+
+                    if parts[0] == "gray":
+                        self._gray[parts[1]] = cache[name]
+                    elif parts[0] == "edges":
+                        self._edges[parts[1], self.parse_params(parts[2])] = cache[name]
+                    elif parts[0] == "scaled":
+                        self._scaled[parts[1], float(parts[2]), self.parse_params(parts[3])] = cache[name]
+        except Exception as e:
+            l.error(f"Exception while loading the template cache: {e}")
+            self._gray.clear()
+            self._edges.clear()
+            self._scaled.clear()
+            return False
+
+        l.info("Loaded templates from cache.")
+        self._is_dirty = False
+        return True
+
+    def save(self):
+        """
+        Function for writing all compiled templates to the cache file.
+        """
+
+        arrays = {"signature": np.array(self.signature())}
+        for key, template in self._gray.items():
+            arrays[f"gray__{key}"] = template
+        for (key, canny_params), template in self._edges.items():
+            arrays[f"edges__{key}__{self.format_params(canny_params)}"] = template
+        for (key, scale, canny_params), template in self._scaled.items():
+            arrays[f"scaled__{key}__{scale}__{self.format_params(canny_params)}"] = template
+
+        try:
+            np.savez(self._cache_path, **arrays)
+            self._is_dirty = False
+        except Exception as e:
+            l.error(f"Exception while saving the template cache: {e}")
+
+    def save_if_changed(self):
+        """
+        Function for writing the cache file if new variants were compiled since
+        it was last written.
+        """
+
+        if self._is_dirty:
+            self.save()
+
+    def format_params(self, canny_params):
+        """
+        Function for converting Canny parameters into a part of a name.
+        """
+
+        return "none" if canny_params is None else "_".join(map(str, canny_params))
+
+    def parse_params(self, text):
+        """
+        Function for converting a part of a name back into Canny parameters.
+        """
+
+        return None if text == "none" else tuple(map(int, text.split("_")))
@@ -0,0 +1,169 @@
+from CaptureBackend import *
+
+import ctypes
+import ctypes.wintypes as w
+import cv2
+import numpy as np
+import logging as l
+
+class _BitmapInfoHeader(ctypes.Structure):
+    _fields_ = [
+        ("biSize", w.DWORD), ("biWidth", w.LONG), ("biHeight", w.LONG), ("biPlanes", w.WORD), ("biBitCount", w.WORD),
+        ("biCompression", w.DWORD), ("biSizeImage", w.DWORD), ("biXPelsPerMeter", w.LONG), ("biYPelsPerMeter", w.LONG),
+        ("biClrUsed", w.DWORD), ("biClrImportant", w.DWORD)
+    ]
+
+class Win32Capture(CaptureBackend):
+    """
+    Capture backend for the Minesweeper game running on Windows. Only the area
+    of the window (or the requested part of it) is captured. The window is
+    not focused for each capture, it must be focused once beforehand.
+
+    The screen is copied (BitBlt) into a bitmap whose pixels are read
+    directly into a preallocated BGRA array and converted into the buffer.
+    Bitmaps and arrays are kept for each size, such that no image is created
+    per capture. The GDI functions are only loaded by the first capture. If
+    they are not available or fail, all following captures fall back to
+    PIL's ImageGrab.
+    """
+
+    _window = None
+    # Whether the GDI functions are used, False after they failed once.
+    _use_gdi = True
+
+    _user32 = None
+    _gdi32 = None
+    _screen_dc = None
+    _memory_dc = None
+    # {(height, width): (bitmap, BGRA array, bitmap info)}
+    _surfaces = {}
+
+    _srccopy = 0x00CC0020
+    _captureblt = 0x40000000
+    _dib_rgb_colors = 0
+
+    def __init__(self, window, bbox = None, use_gdi = True):
+        super().__init__(bbox)
+        self._window = window
+        self._use_gdi = use_gdi
+        self._user32 = None
+        self._gdi32 = None
+        self._screen_dc = None
+        self._memory_dc = None
+        self._surfaces = {}
+
+    def load_gdi(self):
+        """
+        Function for loading the GDI functions and declaring their types.
+        """
+
+        self._user32 = ctypes.windll.user32
+        self._gdi32 = ctypes.windll.gdi32
+        # Handles are pointers, the default int conversion truncates them.
+        self._user32.GetDC.restype = w.HDC
+        self._user32.GetDC.argtypes = [w.HWND]
+        self._user32.ReleaseDC.argtypes = [w.HWND, w.HDC]
+        self._gdi32.CreateCompatibleDC.restype = w.HDC
+        self._gdi32.CreateCompatibleDC.argtypes = [w.HDC]
+        self._gdi32.CreateCompatibleBitmap.restype = w.HBITMAP
+        self._gdi32.CreateCompatibleBitmap.argtypes = [w.HDC, ctypes.c_int, ctypes.c_int]
+        self._gdi32.SelectObject.restype = w.HGDIOBJ
+        self._gdi32.SelectObject.argtypes = [w.HDC, w.HGDIOBJ]
+        self._gdi32.BitBlt.argtypes = [w.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int, w.HDC, ctypes.c_int, ctypes.c_int, w.DWORD]
+        self._gdi32.GetDIBits.argtypes = [w.HDC, w.HBITMAP, w.UINT, w.UINT, ctypes.c_void_p, ctypes.c_void_p, w.UINT]
+        self._gdi32.DeleteObject.argtypes = [w.HGDIOBJ]
+        self._gdi32.DeleteDC.argtypes = [w.HDC]
+
+    def grab_into_buffer(self, bbox):
+        bounds = self._window.get_window_bounds()
+
+        # The bounding box is relative to the window.
+        if bbox is not None:
+            bounds = (bounds[0] + bbox[0], bounds[1] + bbox[1], bounds[0] + bbox[2], bounds[1] + bbox[3])
+
+        if self._use_gdi:
+            try:
+                return self.grab_gdi(bounds)
+            except (AttributeError, OSError) as e:
+                l.warning("Capturing with GDI failed ({}), using ImageGrab instead.".format(e))
+                self.close()
+                self._use_gdi = False
+
+        return self.grab_image_grab(bounds)
+
+    def grab_gdi(self, bounds):
+        """
+        Function for copying the provided screen area with GDI.
+        """
+
+        left, top, right, bottom = (int(value) for value in bounds)
+        width, height = right - left, bottom - top
+        bitmap, pixels, info = self.get_surface(height, width)
+
+        # The bitmap must not stay selected, neither for reading its pixels
+        # nor for deleting it.
+        previous = self._gdi32.SelectObject(self._memory_dc, bitmap)
+        is_copied = self._gdi32.BitBlt(self._memory_dc, 0, 0, width, height, self._screen_dc, left, top, self._srccopy | self._captureblt)
+        self._gdi32.SelectObject(self._memory_dc, previous)
+
+        if not is_copied:
+            raise OSError("The screen could not be copied.")
+        if self._gdi32.GetDIBits(self._memory_dc, bitmap, 0, height, pixels.ctypes.data, ctypes.byref(info), self._dib_rgb_colors) != height:
+            raise OSError("The pixels of the screen could not be read.")
+
+        buffer = self.get_buffer((height, width, 3))
+        cv2.cvtColor(pixels, cv2.COLOR_BGRA2RGB, dst = buffer)
+        return buffer
+
+    def grab_image_grab(self, bounds):
+        """
+        Function for capturing the provided screen area with PIL's ImageGrab 
+        (which creates a new image for each capture).
+        """
+
+        from PIL import ImageGrab
+
+        return self.store(ImageGrab.grab(bbox = tuple(int(value) for value in bounds)).convert("RGB"))
+
+    def get_surface(self, height, width):
+        """
+        Function for retrieving the bitmap, the array of its pixels and the
+        description of their format for the provided size.
+        """
+
+        if self._gdi32 is None:
+            self.load_gdi()
+        if self._screen_dc is None:
+            self._screen_dc = self._user32.GetDC(None)
+            self._memory_dc = self._gdi32.CreateCompatibleDC(self._screen_dc)
+
+        key = (height, width)
+        if key not in self._surfaces:
+            if len(self._surfaces) >= self._max_buffer_count:
+                self._gdi32.DeleteObject(self._surfaces.pop(next(iter(self._surfaces)))[0])
+
+            # 32 bits per pixel, top-down rows (negative height).
+            info = _BitmapInfoHeader()
+            info.biSize = ctypes.sizeof(_BitmapInfoHeader)
+            info.biWidth = width
+            info.biHeight = -height
+            info.biPlanes = 1
+            info.biBitCount = 32
+
+            bitmap = self._gdi32.CreateCompatibleBitmap(self._screen_dc, width, height)
+            self._surfaces[key] = (bitmap, np.empty((height, width, 4), np.uint8), info)
+        return self._surfaces[key]
+
+    def close(self):
+        super().close()
+
+        if self._gdi32 is not None:
+            for bitmap, _, _ in self._surfaces.values():
+                self._gdi32.DeleteObject(bitmap)
+        self._surfaces = {}
+
+        if self._screen_dc is not None:
+            self._gdi32.DeleteDC(self._memory_dc)
+            self._user32.ReleaseDC(None, self._screen_dc)
+            self._screen_dc = None
+            self._memory_dc = None
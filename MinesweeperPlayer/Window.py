@@ -1,8 +1,13 @@
-from PIL import ImageGrab
+from ActionType import *
 
-import win32gui, win32api, win32con
 import time as t
 
+# Only available on Windows. Without it the window is never open.
+try:
+    import win32gui, win32api, win32con
+except ImportError:
+    win32gui = win32api = win32con = None
+
 
 class Window:
     """
@@ -68,21 +73,6 @@ class Window:
 
         win32gui.SetForegroundWindow(self._hwnd)
 
-    def get_window_image(self):
-        """
-        Function for retrieving an image of the Minesweeper game's 
-        window in the PIL (Pillow) format.
-        """
-
-        bounds = self.get_window_bounds()
-
-        self.focus_window()
-        # Time needed for the window to appear on top.
-        t.sleep(0.001)
-    
-        image = ImageGrab.grab(bbox=(bounds))
-        return image
-
     def move_mouse(self, pos, is_relative = True, x_offset = -8, y_offset = -48):
         """
         Function for moving the mouse on the screen.
@@ -105,4 +95,38 @@ class Window:
 
         self.move_mouse(pos)
         win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, *pos, 0, 0)
-        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, *pos, 0, 0)
\ No newline at end of file
+        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, *pos, 0, 0)
+
+    def right_click_mouse(self, pos):
+        """
+        Function for performing a right click (flag) on the screen.
+        """
+
+        self.move_mouse(pos)
+        win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTDOWN, *pos, 0, 0)
+        win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTUP, *pos, 0, 0)
+
+    def chord_click_mouse(self, pos):
+        """
+        Function for pressing both mouse buttons at once (chord) on the screen.
+        """
+
+        self.move_mouse(pos)
+        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, *pos, 0, 0)
+        win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTDOWN, *pos, 0, 0)
+        win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, *pos, 0, 0)
+        win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTUP, *pos, 0, 0)
+
+    def perform_actions(self, actions):
+        """
+        Function for performing multiple actions one after another without
+        waiting in between.
+        """
+
+        for action in actions:
+            if action.type == ActionType.FLAG:
+                self.right_click_mouse(action.center_coordinates)
+            elif action.type == ActionType.CHORD:
+                self.chord_click_mouse(action.center_coordinates)
+            else:
+                self.click_mouse(action.center_coordinates)
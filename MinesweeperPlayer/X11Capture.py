@@ -0,0 +1,52 @@
+from CaptureBackend import *
+
+import cv2
+import numpy as np
+
+# Optional dependency, only needed when capturing on Linux.
+try:
+    import mss
+except ImportError:
+    mss = None
+
+class X11Capture(CaptureBackend):
+    """
+    Capture backend for Linux (X11). Uses the shared memory extension through
+    mss, which copies the screen contents without encoding them. The captured
+    area (left, top, right, bottom) is given in screen coordinates and defaults
+    to the primary monitor.
+    """
+
+    _screen = None
+    _area = None
+
+    def __init__(self, area = None, bbox = None):
+        super().__init__(bbox)
+
+        if mss is None:
+            raise ImportError("The X11 capture requires the 'mss' package.")
+
+        self._screen = mss.mss()
+        if area is None:
+            monitor = self._screen.monitors[1]
+            area = (monitor["left"], monitor["top"], monitor["left"] + monitor["width"], monitor["top"] + monitor["height"])
+        self._area = area
+
+    def grab_into_buffer(self, bbox):
+        left, top, right, bottom = self._area
+
+        # The bounding box is relative to the captured area.
+        if bbox is not None:
+            left, top, right, bottom = left + bbox[0], top + bbox[1], left + bbox[2], top + bbox[3]
+
+        region = {"left": int(left), "top": int(top), "width": int(right - left), "height": int(bottom - top)}
+        shot = np.frombuffer(self._screen.grab(region).raw, np.uint8).reshape(region["height"], region["width"], 4)
+
+        # Raw pixels are BGRA.
+        buffer = self.get_buffer((region["height"], region["width"], 3))
+        cv2.cvtColor(shot, cv2.COLOR_BGRA2RGB, dst = buffer)
+        return buffer
+
+    def close(self):
+        super().close()
+        self._screen.close()
@@ -0,0 +1,60 @@
+from Board import *
+from Lattice import *
+
+import itertools
+import numpy as np
+
+def create_position(random, rows, columns, mine_count, revealed_ratio):
+    """
+    Function for creating a random position: the mines are placed randomly
+    and each square without a mine is revealed with the provided ratio.
+    Returns the matrix of the mines and the board.
+    """
+
+    mines = np.zeros(rows * columns, np.bool_)
+    mines[random.choice(rows * columns, mine_count, replace = False)] = True
+    mines = mines.reshape(rows, columns)
+
+    padded = np.pad(mines, 1, "constant").astype(np.int8)
+    numbers = sum(padded[1 + y:1 + y + rows, 1 + x:1 + x + columns] for y in (-1, 0, 1) for x in (-1, 0, 1) if (y, x) != (0, 0))
+    is_revealed = ~mines & (random.rand(rows, columns) < revealed_ratio)
+    while True:
+        padded = np.pad(is_revealed & (numbers == 0), 1, "constant")
+        is_next_to_zero = np.logical_or.reduce([padded[1 + y:1 + y + rows, 1 + x:1 + x + columns] for y in (-1, 0, 1) for x in (-1, 0, 1)])
+        if not (is_next_to_zero & ~is_revealed).any():
+            break
+        is_revealed |= is_next_to_zero
+
+    states = np.where(is_revealed, numbers, Board.unchecked_value)
+    return mines, Board(states, Board.create_coordinates(Lattice((9, 9), (18, 18), rows, columns)))
+
+def enumerate_layouts(board, mine_count):
+    """
+    Function for enumerating all sets of mines (flat indices of unchecked
+    squares) that match the numbers of the board and the total number of
+    mines.
+    """
+
+    states = board.states.ravel()
+    geometry = board.geometry
+    unchecked = np.flatnonzero(states == Board.unchecked_value).tolist()
+    numbers = np.flatnonzero(states >= 0).tolist()
+
+    layouts = []
+    for combination in itertools.combinations(unchecked, mine_count):
+        layout = frozenset(combination)
+        if all(len(layout.intersection(geometry.neighbours(index))) == states[index] for index in numbers):
+            layouts.append(layout)
+    return layouts
+
+def get_mine_probabilities(layouts):
+    """
+    Function for calculating the share of the layouts each square is a mine
+    in. Returns {index: probability}.
+    """
+
+    counts = {}
+    for layout in layouts:
+        for index in layout:
+            counts[index] = counts.get(index, 0) + 1
+    return {index: count / len(layouts) for index, count in counts.items()}
@@ -0,0 +1,50 @@
+from Simulator import *
+from ClickPlanner import *
+
+import pytest
+import numpy as np
+
+def get_keys(actions):
+    return [(action.type, action.square.row_index, action.square.column_index) for action in actions]
+
+class CheckedClickPlanner(ClickPlanner):
+    """
+    Click planner checking each planned batch: all valid actions are kept
+    and flags stay in front of their chord.
+    """
+
+    batch_count = 0
+
+    def plan(self, actions, field, start = None):
+        planned = super().plan(actions, field, start)
+        keys = get_keys(planned)
+        assert sorted(keys) == sorted(set(get_keys(self.filter_actions(actions, field))))
+
+        for group in self.group_actions(self.filter_actions(actions, field)):
+            chord = get_keys(group)[-1]
+            for flag in get_keys(group)[:-1]:
+                assert keys.index(flag) < keys.index(chord)
+
+        self.batch_count += 1
+        return planned
+
+@pytest.mark.parametrize("mode", ["beginner", "intermediate", "expert"])
+def test_planned_batches_keep_all_actions(mode):
+    simulator = Simulator.from_mode(mode)
+    simulator._click_planner = CheckedClickPlanner()
+    results = simulator.run(5)
+    simulator.close()
+
+    assert simulator._click_planner.batch_count > 0
+    # Safe actions never lose the game.
+    assert results["mistakes"] == 0
+
+def test_large_batch_keeps_all_actions():
+    random = np.random.RandomState(3)
+    board = Board.from_lattice(Lattice((9, 9), (18, 18), 30, 30))
+    squares = random.choice(30 * 30, 600, replace = False)
+    actions = [Action(ActionType.REVEAL, board.square(*divmod(int(index), 30))) for index in squares]
+
+    planned = ClickPlanner().plan(actions + actions[:50], board, (0, 0))
+
+    assert sorted(get_keys(planned)) == sorted(get_keys(actions))
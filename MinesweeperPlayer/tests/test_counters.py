@@ -0,0 +1,48 @@
+from BoardRenderer import *
+from SyntheticCapture import *
+from Game import *
+
+import os
+import cv2
+import pytest
+import numpy as np
+
+_recording_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "play_large.gif")
+
+def read_recording(frame_indices):
+    """
+    Function for reading frames (RGB) of the recording of the real game.
+    """
+
+    video = cv2.VideoCapture(_recording_path)
+    frames = {}
+    for frame_index in range(max(frame_indices) + 1):
+        is_read, image = video.read()
+        assert is_read
+        if frame_index in frame_indices:
+            frames[frame_index] = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    video.release()
+    return [frames[frame_index] for frame_index in frame_indices]
+
+@pytest.mark.parametrize("rows, columns, mine_count, timer", [(9, 9, 10, 0), (16, 16, 40, 7), (16, 30, 99, 123), (24, 30, 217, 58)])
+def test_counters_of_synthetic_frames_are_read(rows, columns, mine_count, timer):
+    renderer = BoardRenderer(seed = rows)
+    renderer.set_noise(1.0)
+    values = np.full((rows, columns), BoardRenderer.unchecked_value, np.int8)
+
+    game = Game()
+    game._open_cv.set_show_template_matching_results(False)
+    game.update_field_dimensions(SyntheticCapture([renderer.render(values, counters = (mine_count, timer))]))
+
+    assert (game.mine_counter, game.timer) == (mine_count, timer)
+
+def test_counters_of_the_real_game_are_read():
+    first_frame, frame = read_recording([0, 103])
+
+    game = Game()
+    game._open_cv.set_show_template_matching_results(False)
+    game.update_field_dimensions(SyntheticCapture([first_frame]))
+    assert (game.mine_counter, game.timer) == (99, 0)
+
+    # Timer showing 11 (two equal digits).
+    assert game._counter_reader.read(frame) == (99, 11)
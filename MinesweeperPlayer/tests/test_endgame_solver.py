@@ -0,0 +1,75 @@
+from brute_force import *
+from FieldChange import *
+from KnowledgeBase import *
+from EndgameSolver import *
+
+import pytest
+import numpy as np
+
+def get_win_probability(layouts, revealed, squares, geometry, cache):
+    """
+    Function for calculating the probability of winning by trying every
+    click on each remaining layout. Clicking a square reveals the number of
+    mines around it.
+    """
+
+    if len(layouts) <= 1:
+        return 1.0
+
+    key = (layouts, revealed)
+    if not(key in cache):
+        cache[key] = max(get_click_probability(layouts, revealed, square, squares, geometry, cache) for square in squares if not(square in revealed))
+    return cache[key]
+
+def get_click_probability(layouts, revealed, square, squares, geometry, cache):
+    groups = {}
+    for layout in layouts:
+        if not(square in layout):
+            groups.setdefault(len(layout.intersection(geometry.neighbours(square))), []).append(layout)
+
+    return sum(len(group) * get_win_probability(frozenset(group), revealed | {square}, squares, geometry, cache) for group in groups.values()) / len(layouts)
+
+def test_best_square_matches_search():
+    random = np.random.RandomState(7)
+    solver = EndgameSolver()
+    checked_count = 0
+
+    while checked_count < 40:
+        rows, columns = random.randint(2, 4), random.randint(3, 5)
+        mine_count = random.randint(1, 5)
+        _, board = create_position(random, rows, columns, mine_count, 0.4)
+
+        knowledge_base = KnowledgeBase()
+        knowledge_base.apply_change(FieldChange.between(0, None, board))
+        squares = knowledge_base.unknown_squares().tolist()
+        # Known safe squares would be clicked before guessing.
+        if len(knowledge_base.safe_squares) > 0 or len(squares) < 2:
+            continue
+
+        layouts = frozenset(enumerate_layouts(board, mine_count))
+        cache = {}
+        probabilities = {square: get_click_probability(layouts, frozenset(), square, squares, board.geometry, cache) for square in squares}
+
+        result = solver.find_best_square(knowledge_base, mine_count)
+        assert result is not None
+        index, probability = result
+        assert probability == pytest.approx(max(probabilities.values()))
+        assert probabilities[index] == pytest.approx(probability)
+        checked_count += 1
+
+def test_assignments_match_enumeration():
+    random = np.random.RandomState(11)
+    solver = EndgameSolver()
+
+    for _ in range(40):
+        mine_count = random.randint(1, 6)
+        _, board = create_position(random, 4, 4, mine_count, 0.5)
+
+        knowledge_base = KnowledgeBase()
+        knowledge_base.apply_change(FieldChange.between(0, None, board))
+        squares = knowledge_base.unknown_squares().tolist()
+        assignments = solver.enumerate_assignments(knowledge_base, squares, mine_count - len(knowledge_base.mines))
+
+        # Squares known to be mines or safe are the same in all layouts.
+        expected = set(frozenset(layout - knowledge_base.mines) for layout in enumerate_layouts(board, mine_count))
+        assert set(frozenset(squares[position] for position in DeductionEngine.to_indices(assignment)) for assignment in assignments) == expected
@@ -0,0 +1,23 @@
+from BoardRenderer import *
+from SyntheticCapture import *
+from Game import *
+
+import numpy as np
+
+def test_flags_are_recognized():
+    renderer = BoardRenderer(seed = 5)
+    renderer.set_noise(1.0)
+    shading = np.random.RandomState(5).randint(0, 3, (16, 30))
+    values = renderer.random_values(16, 30, 99, revealed_ratio = 0.7, flagged_ratio = 0.5)
+    unchecked = np.full_like(values, BoardRenderer.unchecked_value)
+
+    capture = SyntheticCapture([renderer.render(unchecked, shading), renderer.render(values, shading)], loop = False)
+    game = Game()
+    game._open_cv.set_show_template_matching_results(False)
+    game.update_field_dimensions(capture)
+    game.update(capture)
+
+    assert (values == Board.flag_value).sum() > 0
+    assert np.array_equal(game.current_field_info.states, values)
+    # Flags are not revealed mines.
+    assert game.state == GameState.RUNNING
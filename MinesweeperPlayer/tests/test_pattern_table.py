@@ -0,0 +1,69 @@
+from BoardGeometry import *
+from DeductionEngine import *
+from PatternTable import *
+
+import pytest
+import numpy as np
+
+@pytest.fixture(scope = "module")
+def pattern_table(tmp_path_factory):
+    table = PatternTable(str(tmp_path_factory.mktemp("pattern_table") / "pattern_table.npz"))
+    table.load()
+    return table
+
+def create_pair(random, geometry, index_a, index_b):
+    """
+    Function for creating the constraints of two neighbouring numbers with a
+    random set of unknown squares around them. The remaining mines are the
+    ones of a random assignment of these.
+    """
+
+    unknown = [neighbour for neighbour in set(geometry.neighbours(index_a)) | set(geometry.neighbours(index_b)) if not(neighbour in (index_a, index_b)) and random.rand() < 0.6]
+    mines = set(square for square in unknown if random.rand() < 0.4)
+
+    constraints = {}
+    for index in (index_a, index_b):
+        squares = [square for square in unknown if square in geometry.neighbours(index)]
+        constraints[index] = [len(mines.intersection(squares)), DeductionEngine.to_mask(squares)]
+    return constraints
+
+def deduce_pair(constraints):
+    """
+    Function for deducing the mines and safe squares of the constraints by
+    trying all assignments of their unknown squares.
+    """
+
+    union = 0
+    for _, mask in constraints.values():
+        union |= mask
+    squares = DeductionEngine.to_indices(union)
+
+    mines, possible_mines = union, 0
+    for assignment in range(1 << len(squares)):
+        layout = DeductionEngine.to_mask(square for position, square in enumerate(squares) if (assignment >> position) & 1)
+        if all(DeductionEngine.count(layout & mask) == remaining for remaining, mask in constraints.values()):
+            mines &= layout
+            possible_mines |= layout
+    return mines, union & ~possible_mines
+
+@pytest.mark.parametrize("index_a, index_b", [(14, 15), (14, 20), (0, 1), (0, 6), (4, 5), (28, 29)])
+def test_pattern_table_matches_enumeration(pattern_table, index_a, index_b):
+    geometry = BoardGeometry.get(5, 6)
+    random = np.random.RandomState(index_a * 31 + index_b)
+
+    for _ in range(200):
+        constraints = create_pair(random, geometry, index_a, index_b)
+        mines, safe_squares = pattern_table.deduce(constraints, [index_a], geometry)
+        assert (mines, safe_squares) == deduce_pair(constraints)
+
+        # The table covers all deductions of the pair comparison.
+        engine_mines, engine_safe_squares = DeductionEngine().deduce(constraints, [index_a, index_b], lambda index, mask: [other for other in constraints if other != index])
+        assert engine_mines & ~mines == 0
+        assert engine_safe_squares & ~safe_squares == 0
+
+def test_pattern_table_file_is_reused(pattern_table):
+    table = PatternTable(pattern_table._path)
+    assert table.load_file()
+    assert np.array_equal(table._mines, pattern_table._mines)
+    assert np.array_equal(table._safe_squares, pattern_table._safe_squares)
+    assert np.array_equal(table._is_valid, pattern_table._is_valid)
@@ -0,0 +1,103 @@
+from brute_force import *
+from FieldChange import *
+from KnowledgeBase import *
+from ProbabilityEngine import *
+
+import pytest
+import numpy as np
+
+@pytest.mark.parametrize("rows, columns, revealed_ratio", [(4, 5, 0.5), (3, 6, 0.3), (5, 4, 0.7)])
+def test_probabilities_match_enumeration(rows, columns, revealed_ratio):
+    random = np.random.RandomState(rows * columns)
+    engine = ProbabilityEngine()
+
+    for _ in range(25):
+        mine_count = random.randint(2, 7)
+        _, board = create_position(random, rows, columns, mine_count, revealed_ratio)
+        expected = get_mine_probabilities(enumerate_layouts(board, mine_count))
+
+        knowledge_base = KnowledgeBase()
+        knowledge_base.apply_change(FieldChange.between(0, None, board))
+        probabilities = engine.calculate(knowledge_base, mine_count)
+
+        # Deduced squares are certain, all others are calculated.
+        for index in knowledge_base.mines:
+            assert expected.get(index, 0.0) == 1.0
+        for index in knowledge_base.safe_squares:
+            assert expected.get(index, 0.0) == 0.0
+        for index in knowledge_base.unknown_squares().tolist():
+            assert probabilities[index] == pytest.approx(expected.get(index, 0.0))
+
+def create_constraints(random, square_count):
+    """
+    Function for creating random constraints of a chain of squares (like the
+    frontier of a field): each one covers a few neighbouring squares and
+    matches a random placement of the mines.
+    """
+
+    mines = random.rand(square_count) < 0.3
+    local_constraints = []
+    for start in range(0, square_count - 1, 2):
+        positions = [position for position in range(start, min(square_count, start + random.randint(3, 4))) if random.rand() < 0.85]
+        if len(positions) > 0:
+            local_constraints.append((int(mines[positions].sum()), tuple(positions)))
+    return local_constraints
+
+def assert_same_distribution(result, expected):
+    ways, square_ways = result
+    expected_ways, expected_square_ways = expected
+    length = max(len(ways), len(expected_ways))
+    assert np.pad(ways, (0, length - len(ways)), "constant") == pytest.approx(np.pad(expected_ways, (0, length - len(expected_ways)), "constant"))
+    assert np.pad(square_ways, ((0, length - len(ways)), (0, 0)), "constant") == pytest.approx(np.pad(expected_square_ways, ((0, length - len(expected_ways)), (0, 0)), "constant"))
+
+class SplittingProbabilityEngine(ProbabilityEngine):
+    """
+    Engine splitting every component, such that all of them are enumerated
+    by the worker processes.
+    """
+
+    @staticmethod
+    def count_assignments(square_count, local_constraints, max_states, deadline = None):
+        return None
+
+def test_split_components_match_count():
+    random = np.random.RandomState(7)
+    split_count = 0
+
+    for _ in range(40):
+        square_count = random.randint(8, 24)
+        local_constraints = create_constraints(random, square_count)
+        expected = ProbabilityEngine.count_assignments(square_count, local_constraints, 10 ** 7)
+
+        result = ProbabilityEngine.enumerate_parts(square_count, local_constraints, 10 ** 7, ProbabilityEngine._max_split_depth, float("inf"))
+        if ProbabilityEngine.find_separator(square_count, local_constraints) is None:
+            assert result is None
+            continue
+
+        split_count += 1
+        assert_same_distribution(result, expected)
+    assert split_count >= 30
+
+def test_pooled_components_match_count():
+    random = np.random.RandomState(11)
+    engine = SplittingProbabilityEngine(worker_count = 2, deadline = 60.0)
+
+    try:
+        local_components = [(square_count, create_constraints(random, square_count)) for square_count in random.randint(8, 24, 16)]
+        local_components = [(square_count, local_constraints) for square_count, local_constraints in local_components if ProbabilityEngine.find_separator(square_count, local_constraints) is not None]
+        distributions = engine.enumerate_components(local_components)
+    finally:
+        engine.close()
+
+    assert len(local_components) >= 8
+    for (square_count, local_constraints), distribution in zip(local_components, distributions):
+        assert_same_distribution(distribution, ProbabilityEngine.count_assignments(square_count, local_constraints, 10 ** 7))
+
+def test_small_components_are_counted_after_the_deadline():
+    random = np.random.RandomState(13)
+    # The deadline passed before the enumeration starts.
+    engine = ProbabilityEngine(deadline = -1.0)
+
+    local_components = [(square_count, create_constraints(random, square_count)) for square_count in random.randint(4, ProbabilityEngine._max_exact_square_count + 1, 10)]
+    for (square_count, local_constraints), distribution in zip(local_components, engine.enumerate_components(local_components)):
+        assert_same_distribution(distribution, ProbabilityEngine.count_assignments(square_count, local_constraints, 10 ** 7))